@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+bench_child_urls.py - Microbenchmark of FMC._get_child_urls, the child
+reference discovery run on every response walked or migrated.  Access
+rule responses with many object references (networks, ports, zones,
+urls, applications, literals) are generated and their child urls found
+with the leaf's resolution table and iterative extractor alongside the
+recursive implementation they replaced.  Both must return the same
+child urls and child types.  The leaf is connected to a
+cmaple.fmc.mock_fmc_server stand-in, only the child url discovery is
+timed.
+
+Usage: python benchmarks/bench_child_urls.py [-rules 2000] [-references 50] [-repeat 3]
+    [-model_file json_models/api-docs-fmcwithll.json] [-output results.json]
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from collections import OrderedDict
+import cmaple.tree_helpers as tree_helpers
+
+logger = logging.getLogger(__name__)
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MODEL_FILE = os.path.join(_REPO_DIR, 'json_models', 'api-docs-fmcwithll.json')
+# Object references of an access rule, as (rule field, model type, object id kind)...
+_REFERENCE_FIELDS = (('sourceNetworks', 'Network', 1), ('destinationNetworks', 'NetworkGroup', 2),
+                     ('sourcePorts', 'ProtocolPortObject', 3), ('destinationPorts', 'PortObjectGroup', 4),
+                     ('sourceZones', 'SecurityZone', 5), ('destinationZones', 'SecurityZone', 6),
+                     ('urls', 'Url', 7), ('applications', 'Application', 8), ('vlanTags', 'VlanTag', 9))
+
+
+def get_object_id(kind, i):
+    return '005056A7-0A2B-%04x-0000-%012d' % (kind, i)
+
+
+def build_rule_response(path_root, policy_id, rule_number, references):
+    """Returns the response of an access rule holding about references object references.
+
+    """
+
+    rule_id = get_object_id(10, rule_number)
+    url = '%spolicy/accesspolicies/%s/accessrules/%s' % (path_root, policy_id, rule_id)
+    per_field = max(references // len(_REFERENCE_FIELDS), 1)
+    json_dict = OrderedDict([('id', rule_id), ('type', 'AccessRule'), ('name', 'rule_%s' % rule_number),
+                             ('action', 'ALLOW'), ('enabled', True),
+                             ('links', {'self': url})])
+    for field, model_type, kind in _REFERENCE_FIELDS:
+        objects = [{'type': model_type, 'id': get_object_id(kind, (rule_number + i) % 5000),
+                    'name': '%s_%s' % (model_type.lower(), i), 'overridable': False} for i in range(per_field)]
+        json_dict[field] = {'objects': objects}
+    json_dict['sourceNetworks']['literals'] = [{'type': 'Host', 'value': '10.0.%s.1' % (rule_number % 256)}]
+    json_dict['ipsPolicy'] = {'type': 'IntrusionPolicy', 'id': get_object_id(11, 0), 'name': 'Balanced'}
+    json_dict['variableSet'] = {'type': 'VariableSet', 'id': get_object_id(12, 0), 'name': 'Default-Set'}
+    json_dict['metadata'] = {'ruleIndex': rule_number, 'section': 'Mandatory', 'category': '--Undefined--',
+                             'accessPolicy': {'type': 'AccessPolicy', 'id': policy_id, 'name': 'policy'}}
+    return {'url': url, 'json_dict': json_dict}
+
+
+def recursive_child_urls(leaf, response_dict, parent_url):
+    """Returns the child urls and child types of response_dict as found by the recursive FMC._get_child_urls this
+    benchmark compares with.
+
+    """
+
+    def recurse_for_child_dicts(json_dict, parent_key, type_list):
+        if type(json_dict) is dict or type(json_dict) is OrderedDict:
+            if 'type' in json_dict and not parent_key == '':
+                parent_key += '~' + json_dict['type']
+            for key, val in json_dict.items():
+                if type(val) is dict or type(val) is OrderedDict:
+                    if 'type' in val:
+                        type_list.append({'key': key, 'parent_key': parent_key, 'dict': val})
+                    elif 'refType' in val:
+                        type_list.append({'key': key, 'parent_key': parent_key, 'dict': val})
+                    recurse_for_child_dicts(val, (parent_key + '~' if not parent_key == '' else '') + key, type_list)
+                elif type(val) is list:
+                    for val_member in val:
+                        val_dict = {key: val_member}
+                        # recurse_for_child_dicts(val_dict, (parent_key + '~' if not parent_key == '' else '') + key, type_list)
+                        recurse_for_child_dicts(val_dict, parent_key, type_list)
+        elif type(json_dict) is list:
+            for json_member in json_dict:
+                recurse_for_child_dicts(json_member, parent_key, type_list)
+
+    anomalous_composites = ['Device',
+                            'DeviceHAPair',
+                            ]
+    anomalous_types = ['PhysicalInterface',
+                       ]
+    response_self_link = None
+    response_self_id = None
+    url = response_dict['url']
+    logger.debug('getting child url for url %s' % url)
+    logger.debug('%s', tree_helpers.LazyPformat(response_dict))
+    child_urls = []
+    child_types = {}
+    if 'id' in response_dict['json_dict']:
+        response_self_id = response_dict['json_dict']['id']
+    else:
+        logger.warning('id node not found for url %s...attempting to recover from parent url' % (url))
+        # 0027E388-0C9C-0ed3-0000-034359739117
+        uuids = re.findall(r'[A-Za-z0-9]{8}-[A-Za-z0-9]{4}-[A-Za-z0-9]{4}-[A-Za-z0-9]{4}-[A-Za-z0-9]{12}', url)
+        if uuids:
+            response_self_id = uuids[-1]
+            logger.warning('Recovered uuid %s from url for id node value...' % response_self_id)
+        else:
+            logger.warning('Unable to recover uuid from url %s...' % url)
+    if 'type' in response_dict['json_dict']:
+        response_self_type = response_dict['json_dict']['type']
+        logger.debug('response_self_type = %s' % response_self_type)
+
+        if response_self_type in anomalous_composites:
+            logger.debug('found anomalous composite %s' % response_self_type)
+            child_urls = leaf._handle_anomalous_composites(response_dict, child_urls)
+            logger.debug(child_urls)
+    else:
+        logger.warning('type node not found for url %s...' % url)
+
+    temp_response_dict = response_dict['json_dict'].copy()
+    if 'metadata' in temp_response_dict:
+        temp_response_dict.pop('metadata')
+    type_list = []
+    recurse_for_child_dicts(temp_response_dict, '', type_list)
+
+    for type_dict in type_list:
+        child_url = ''
+        if type_dict['key'] == 'literals':
+            child_url = 'literal'
+            # continue
+
+        lower_first_func = lambda s: s[:1].lower() + s[1:] if s else ''
+        id_type = ''
+        if 'type' in type_dict['dict']:
+            id_type = type_dict['dict']['type']
+            if id_type in anomalous_types:
+                child_url = leaf._handle_anomalous_types(type_dict)
+        else:
+            id_type = 'missing_type_attribute'
+            logger.warning('type attribute missing for child dict %s...' % type_dict)
+
+        if child_url == '':
+            if not id_type in leaf._models_path_dict \
+                and not type_dict['key'] in leaf._models_path_dict \
+                and not lower_first_func(id_type) in leaf._models_path_dict \
+                and not id_type.lower() in leaf._models_path_dict \
+                    and not 'links' in type_dict['dict']:
+                logger.warning('no url found for child dict %s...' % type_dict)
+            else:
+                logger.debug('child dict = %s' % type_dict)
+                if 'links' in type_dict['dict']:
+                    if 'self' in type_dict['dict']['links']:
+                        child_url = type_dict['dict']['links']['self']
+                    else:
+                        logger.warning(
+                            'Child dictionary %s has a links node but self url is missing...' % type_dict)
+                elif not id_type == 'missing_type_attribute':
+                    if id_type in leaf._models_path_dict:
+                        child_url = leaf._models_path_dict[id_type]
+                    elif type_dict['key'] in leaf._models_path_dict:
+                        child_url = leaf._models_path_dict[type_dict['key']]
+                    elif lower_first_func(id_type) in leaf._models_path_dict:
+                        child_url = leaf._models_path_dict[lower_first_func(id_type)]
+                    else:
+                        child_url = leaf._models_path_dict[id_type.lower()]
+
+                    logger.debug('child_model_url = %s' % (child_url))
+                    if '{containerUUID}' in child_url:
+                        if not response_self_id:
+                            logger.warning(
+                                'Child type url %s needs a {containerUUID} but no parent id found...' % (child_url))
+                        else:
+                            child_url = child_url.replace('{containerUUID}', response_self_id)
+                    if '{objectId}' in child_url:
+                        if 'id' in type_dict['dict']:
+                            object_id = type_dict['dict']['id']
+                            child_url = child_url.replace('{objectId}', object_id)
+                        else:
+                            logger.warning('Child type url %s needs an {objectId} but no id found...' % (child_url))
+
+        if not child_url == '':
+            # Safeguard to prevent child url returning parent url - deployabledevice
+            if not child_url == re.sub('\?.+', '', response_dict['url']):
+                # Add the root path in if missing...
+                if leaf.path_root not in child_url and not child_url == 'literal':
+                    child_url = leaf.path_root + child_url
+                type_parent = type_dict['parent_key']
+                if type_parent == '':
+                    type_parent = id_type
+                else:
+                    type_parent = type_parent + '~' + id_type
+                if type_parent not in child_types:
+                    child_types[type_parent] = {'urls': [], 'type_dicts': []}
+                child_types[type_parent]['urls'].append(child_url)
+                type_dict['url'] = child_url
+                child_types[type_parent]['type_dicts'].append(type_dict)
+                if not child_url == 'literal':
+                    child_urls.append(child_url)
+            else:
+                logger.warning('Child url %s resolved to parent url' % child_url)
+        else:
+            logger.warning('no url found for child dict %s ' % type_dict)
+    return child_urls, child_types
+
+def time_call(func, repeat):
+    """Returns the result of func and the fastest of repeat timings in seconds.
+
+    """
+
+    best = None
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start_time
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Times FMC child url discovery.')
+    arg_parser.add_argument('-rules', type=int, default=2000, help='the number of access rule responses')
+    arg_parser.add_argument('-references', type=int, default=50, help='the object references per rule')
+    arg_parser.add_argument('-repeat', type=int, default=3, help='timings per measurement, the fastest is kept')
+    arg_parser.add_argument('-model_file', default=_MODEL_FILE, help='the FMC API model json file')
+    arg_parser.add_argument('-output', default=None, help='the JSON results file, default stdout only')
+    args = arg_parser.parse_args()
+
+    from cmaple.fmc.mock_fmc_server import FMCSnapshot, MockFMCServer
+    from cmaple.fmc.fmc import FMC
+
+    work_dir = tempfile.mkdtemp(prefix='cmaple_bench_')
+    mock_server = MockFMCServer(FMCSnapshot())
+    mock_server.start()
+    try:
+        leaf = FMC(name='child_urls', json_file_path=args.model_file, FMC_host=mock_server.host,
+                   FMC_port=mock_server.port, FMC_scheme=mock_server.scheme, FMC_username='benchmark',
+                   FMC_password='benchmark', leaf_dir=work_dir, model_cache_dir=work_dir, persist_responses=False,
+                   dump_metrics_at_exit=False)
+        policy_id = get_object_id(0, 0)
+        responses = [build_rule_response(leaf.path_root, policy_id, i, args.references) for i in range(args.rules)]
+        policy_url = '%spolicy/accesspolicies/%s' % (leaf.path_root, policy_id)
+
+        before, before_seconds = time_call(lambda: [recursive_child_urls(leaf, response_dict, policy_url)
+                                                    for response_dict in responses], args.repeat)
+        after, after_seconds = time_call(lambda: [leaf._get_child_urls(response_dict, policy_url)
+                                                  for response_dict in responses], args.repeat)
+        assert json.dumps(before) == json.dumps(after), 'child urls differ'
+    finally:
+        mock_server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    references = sum([len(child_urls) for child_urls, child_types in after])
+    results = OrderedDict([('rules', args.rules), ('references', references), ('repeat', args.repeat),
+                           ('recursive_seconds', before_seconds), ('seconds', after_seconds),
+                           ('recursive_us_per_reference', before_seconds / references * 1e6),
+                           ('us_per_reference', after_seconds / references * 1e6),
+                           ('speedup', before_seconds / after_seconds)])
+    print('%s rules, %s references: recursive %.3f s (%.2f us/reference), table %.3f s (%.2f us/reference), %.1fx' %
+          (results['rules'], references, before_seconds, results['recursive_us_per_reference'], after_seconds,
+           results['us_per_reference'], results['speedup']), file=sys.stderr)
+
+    results_json = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results_json)
+    print(results_json)
+
+
+if __name__ == '__main__':
+    main()
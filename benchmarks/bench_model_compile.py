@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+bench_model_compile.py - Benchmark of the cold FMC API model compile
+for the models in json_models/ and the model bundled in cmaple/fmc/.
+For each model it times the json load,
+fmc_helpers.get_all_reference_dicts (the single pass indexer) alongside
+the jsonpath scan implementation it replaced, writing the compiled model
+(see cmaple.fmc.model_cache) and loading it back with every section
+decoded.  Both implementations must build the same reference
+dictionaries.
+
+Usage: python benchmarks/bench_model_compile.py [-models json_models/api-docs-fmcwithll.json] [-repeat 3]
+    [-output results.json]
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import re
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import tempfile
+from collections import OrderedDict
+import cmaple.tree_helpers as tree_helpers
+import cmaple.fmc.fmc_helpers as fmc_helpers
+import cmaple.fmc.model_cache as model_cache
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The models in json_models/ and the one bundled with the FMC leaf...
+_MODEL_FILES = sorted(glob.glob(os.path.join(_REPO_DIR, 'json_models', '*.json'))) + \
+               [os.path.join(_REPO_DIR, 'cmaple', 'fmc', 'api-docs-fmcwithll.json')]
+
+
+class _ModelHolder(object):
+
+    def __init__(self, json_dict):
+        self._json_dict = json_dict
+
+
+def jsonpath_reference_dicts(json_dict):
+    """Returns the reference dictionaries built with the jsonpath scans get_all_reference_dicts used before the
+    single pass indexer, for comparison.
+
+    """
+
+    def add_paths_to_dict(path_parts, paths_dict, API_path_keywords_list):
+        if path_parts:
+            path_part = path_parts.pop(0)
+            if not path_part in paths_dict:
+                paths_dict[path_part] = {}
+                if not path_part in API_path_keywords_list and not path_part.startswith('{'):
+                    API_path_keywords_list.append(path_part)
+            add_paths_to_dict(path_parts, paths_dict[path_part], API_path_keywords_list)
+
+    paths_dict = {}
+    resource_path_dict = {}
+    operations_dict = {}
+    model_path_dict = {}
+    path_model_dict = {}
+    models_dict = {}
+    API_path_keywords_list = []
+    resource_tuple_list = tree_helpers.get_jsonpath_full_paths_and_values('$.features.*.[*]', json_dict)
+    for resource_dict_path, resource_dict in resource_tuple_list:
+        resource_key = re.sub(r'features.|\[[0-9]+\]|\.', '', resource_dict_path)
+        resource_path_dict[resource_key] = ''
+        for model_path, model_ID in tree_helpers.get_jsonpath_full_paths_and_values('$..models.*.id',
+                                                                                     resource_dict):
+            if not model_ID in models_dict:
+                properties_path = '.'.join(model_path.split('.')[:-1] + ['properties'])
+                models_dict[model_ID] = tree_helpers.get_jsonpath_values(properties_path, resource_dict)[0]
+                tree_helpers.get_jsonpath_full_paths_and_values('$..type', models_dict[model_ID])
+                # The whole model scan run for every model...
+                tree_helpers.get_jsonpath_full_paths_and_values('{}.{}{}'.format(
+                    resource_dict_path, re.sub(r'models.+', 'operations.', model_path), '.responseData..type'),
+                    json_dict)
+        for operation_list in tree_helpers.get_jsonpath_values('$..operations', resource_dict):
+            model_ID = None
+            for operation in operation_list:
+                if not operation is None:
+                    path = re.sub('^/', '', operation['path'])
+                    method = tree_helpers.get_jsonpath_values('$..method', operation)[0]
+                    if model_ID is None and operation['examples'] is not None:
+                        for example in operation['examples']:
+                            if not 'override' in example['url'] and 'responseData' in example and \
+                                    'type' in example['responseData']:
+                                model_ID = example['responseData']['type']
+                                break
+                    if not path in operations_dict:
+                        operations_dict[path] = {'methods': {}, 'operation_path': operation['path']}
+                    operations_dict[path]['methods'][method] = operation
+            if not model_ID:
+                model_ID = operation_list[-1]['type']['modelId']
+            path = re.sub('^/', '', operation_list[-1]['path'])
+            model_path_dict[model_ID] = path
+            path_model_dict[path] = model_ID
+    for path in operations_dict.keys():
+        path_parts = operations_dict[path]['operation_path'].split('/')
+        path_parts.pop(0)
+        if path_parts[0] in resource_path_dict:
+            add_paths_to_dict(path_parts, paths_dict, API_path_keywords_list)
+
+    return OrderedDict(sorted(resource_path_dict.items())), OrderedDict(sorted(operations_dict.items())), \
+           OrderedDict(sorted(model_path_dict.items())), OrderedDict(sorted(paths_dict.items())), \
+           API_path_keywords_list, sorted(operations_dict.keys()), path_model_dict, models_dict
+
+
+def time_call(func, repeat):
+    """Returns the result of func and the fastest of repeat timings in seconds.
+
+    """
+
+    best = None
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start_time
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+
+def bench_model(model_file, repeat, work_dir):
+    """Returns the timings of compiling model_file.
+
+    """
+
+    def load_json():
+        with open(model_file, 'r') as json_file:
+            return json.load(json_file)
+
+    json_dict, load_seconds = time_call(load_json, repeat)
+    before, before_seconds = time_call(lambda: jsonpath_reference_dicts(json_dict), repeat)
+    after, after_seconds = time_call(lambda: fmc_helpers.get_all_reference_dicts(_ModelHolder(json_dict)), repeat)
+    # Order sensitive comparison, the keyword list and hierarchy order matter to the leaf...
+    assert json.dumps(before) == json.dumps(after), 'reference dictionaries differ for %s' % model_file
+
+    sha256 = model_cache.get_file_sha256(model_file)
+    compiled_model_path = model_cache.get_compiled_model_path(model_file, sha256, work_dir)
+    sections = dict(zip(model_cache.MODEL_SECTIONS, after))
+    sections['_operations_dict'] = model_cache.compact_operations_dict(sections['_operations_dict'])
+    ignored, write_seconds = time_call(lambda: model_cache.write_compiled_model(compiled_model_path, sha256,
+                                                                                 sections), repeat)
+
+    def load_compiled():
+        compiled_model = model_cache.CompiledModel(compiled_model_path, sha256)
+        return [compiled_model.get(name) for name in model_cache.MODEL_SECTIONS]
+
+    ignored, compiled_load_seconds = time_call(load_compiled, repeat)
+    return OrderedDict([('model', os.path.relpath(os.path.abspath(model_file), _REPO_DIR)),
+                        ('model_bytes', os.path.getsize(model_file)), ('compiled_bytes', os.path.getsize(compiled_model_path)),
+                        ('API_paths', len(after[5])), ('models', len(after[7])),
+                        ('json_load_seconds', load_seconds), ('jsonpath_compile_seconds', before_seconds),
+                        ('compile_seconds', after_seconds), ('speedup', before_seconds / after_seconds),
+                        ('compiled_write_seconds', write_seconds), ('compiled_load_seconds', compiled_load_seconds)])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Times the cold FMC API model compile.')
+    arg_parser.add_argument('-models', nargs='+', default=_MODEL_FILES, help='the FMC API model json files')
+    arg_parser.add_argument('-repeat', type=int, default=3, help='timings per measurement, the fastest is kept')
+    arg_parser.add_argument('-output', default=None, help='the JSON results file, default stdout only')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='cmaple_bench_')
+    try:
+        results = []
+        print('%-40s %10s %10s %12s %10s %8s %10s %10s' % ('model', 'model KB', 'json s', 'jsonpath s', 'compile s',
+                                                         'speedup', 'cmodel KB', 'cmodel s'), file=sys.stderr)
+        for model_file in args.models:
+            result = bench_model(model_file, args.repeat, work_dir)
+            results.append(result)
+            print('%-40s %10.0f %10.3f %12.3f %10.3f %7.1fx %10.0f %10.3f' %
+                  (result['model'], result['model_bytes'] / 1e3, result['json_load_seconds'],
+                   result['jsonpath_compile_seconds'], result['compile_seconds'], result['speedup'],
+                   result['compiled_bytes'] / 1e3, result['compiled_load_seconds']), file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results_json = json.dumps({'repeat': args.repeat, 'models': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results_json)
+    print(results_json)
+
+
+if __name__ == '__main__':
+    main()
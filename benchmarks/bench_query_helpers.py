@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+bench_query_helpers.py - Microbenchmark of the per response overhead of
+tree_helpers.get_jsonpath_values and get_objectpath_values for the
+queries run on every response (next link, links and item ids).  The
+uncached implementations are timed alongside for comparison.
+
+Usage: python benchmarks/bench_query_helpers.py [-items 25 400] [-repeat 200]
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import argparse
+import timeit
+import objectpath
+from jsonpath_ng.ext import parse
+from requests.structures import CaseInsensitiveDict
+import cmaple.tree_helpers as tree_helpers
+
+_HOST = 'https://fmc.example.com/api/fmc_config/v1/domain/e276abec-e0f2-11e3-8169-6d9ed49b625f'
+
+
+def build_response_dict(item_count):
+    """Returns an FMC like networks page response_dict with item_count items.
+
+    """
+
+    items = []
+    for i in range(item_count):
+        item_id = '005056A7-0A2B-0ed3-0000-%012d' % i
+        items.append({'id': item_id, 'type': 'Network', 'name': 'net_%s' % i, 'value': '10.%s.%s.0/24' % (i // 256,
+                                                                                                        i % 256),
+                      'overridable': False, 'description': ' ',
+                      'links': {'self': '%s/object/networks/%s' % (_HOST, item_id)},
+                      'metadata': {'timestamp': 1540000000000 + i, 'lastUser': {'name': 'admin'},
+                                   'domain': {'name': 'Global', 'id': 'e276abec-e0f2-11e3-8169-6d9ed49b625f'}}})
+    url = '%s/object/networks?offset=0&limit=%s' % (_HOST, item_count)
+    json_dict = {'links': {'self': url}, 'items': items,
+                 'paging': {'offset': 0, 'limit': item_count, 'count': item_count * 10, 'pages': 10,
+                            'next': ['%s/object/networks?offset=%s&limit=%s' % (_HOST, item_count, item_count)]}}
+    headers = CaseInsensitiveDict({'Content-Type': 'application/json', 'Content-Length': '12345'})
+    return {'url': url, 'headers': headers, 'error': None, 'json_dict': json_dict, 'status_code': 200,
+            'null_response': False, 'filtered': False, 'cache_hit': False}
+
+
+def uncached_jsonpath_values(json_query, json_struct):
+    return [match.value for match in parse(json_query).find(json_struct)]
+
+
+def uncached_objectpath_values(json_query, json_struct):
+    return list(objectpath.Tree(json_struct).execute(json_query))
+
+
+def time_call(func, repeat):
+    """Returns the mean microseconds per call of func.
+
+    """
+
+    return timeit.timeit(func, number=repeat) / repeat * 1e6
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Times the jsonpath and objectpath helpers per response.')
+    arg_parser.add_argument('-items', type=int, nargs='+', default=[25, 400], help='items per page response')
+    arg_parser.add_argument('-repeat', type=int, default=200, help='calls timed per measurement')
+    args = arg_parser.parse_args()
+
+    cases = [('jsonpath', '$..next', 'response_dict', uncached_jsonpath_values, tree_helpers.get_jsonpath_values),
+             ('jsonpath', '$..links', 'json_dict', uncached_jsonpath_values, tree_helpers.get_jsonpath_values),
+             ('jsonpath', '$..items[*].id', 'json_dict', uncached_jsonpath_values,
+              tree_helpers.get_jsonpath_values),
+             ('jsonpath', '$.paging.count', 'json_dict', uncached_jsonpath_values, tree_helpers.get_jsonpath_values),
+             ('objectpath', '$..next', 'json_dict', uncached_objectpath_values, tree_helpers.get_objectpath_values),
+             ('objectpath', "$..items[@.name is 'net_3'].id", 'json_dict', uncached_objectpath_values,
+              tree_helpers.get_objectpath_values)]
+
+    print('%-6s %-10s %-32s %-14s %12s %12s %9s' % ('items', 'engine', 'query', 'input', 'before us', 'after us',
+                                                   'speedup'))
+    for item_count in args.items:
+        response_dict = build_response_dict(item_count)
+        for engine, json_query, struct_name, before_func, after_func in cases:
+            json_struct = response_dict if struct_name == 'response_dict' else response_dict['json_dict']
+            assert before_func(json_query, json_struct) == after_func(json_query, json_struct), json_query
+            before = time_call(lambda: before_func(json_query, json_struct), args.repeat)
+            after = time_call(lambda: after_func(json_query, json_struct), args.repeat)
+            print('%-6s %-10s %-32s %-14s %12.1f %12.1f %8.1fx' % (item_count, engine, json_query, struct_name,
+                                                                  before, after, before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+bench_request_overhead.py - Microbenchmark of the client side overhead of
+one GET through RestBase._process_json_request with and without
+production mode (see cmaple.production).  Requests are answered by an in
+memory session returning an FMC like page, so only cmaple's own per
+request work (tracing, logging, progress output, parsing and storing) is
+timed.  Each mode runs in its own interpreter as stripping the tracing
+wrappers cannot be undone.
+
+Usage: python benchmarks/bench_request_overhead.py [-items 25 400] [-requests 2000]
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from pprint import pformat
+from requests.structures import CaseInsensitiveDict
+
+_HOST = 'https://fmc.example.com/api/fmc_config/v1/domain/e276abec-e0f2-11e3-8169-6d9ed49b625f'
+
+
+def build_page(item_count):
+    """Returns the json text of an FMC like networks page with item_count items.
+
+    """
+
+    items = []
+    for i in range(item_count):
+        item_id = '005056A7-0A2B-0ed3-0000-%012d' % i
+        items.append({'id': item_id, 'type': 'Network', 'name': 'net_%s' % i, 'value': '10.%s.%s.0/24' % (i // 256,
+                                                                                                        i % 256),
+                      'links': {'self': '%s/object/networks/%s' % (_HOST, item_id)},
+                      'metadata': {'timestamp': 1540000000000 + i, 'lastUser': {'name': 'admin'}}})
+    json_dict = {'links': {'self': '%s/object/networks?offset=0&limit=%s' % (_HOST, item_count)}, 'items': items,
+                 'paging': {'offset': 0, 'limit': item_count, 'count': item_count, 'pages': 1}}
+    return json.dumps(json_dict)
+
+
+class FakeResponse(object):
+
+    def __init__(self, text):
+        self.status_code = 200
+        self.headers = CaseInsensitiveDict({'Content-Type': 'application/json', 'Content-Length': str(len(text))})
+        self.text = text
+        self.content = text.encode()
+
+    def close(self):
+        pass
+
+
+class FakeSession(object):
+    """Answers every GET with the same page.
+
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, url=None, **kwargs):
+        return FakeResponse(self.text)
+
+
+def run_mode(mode, item_count, request_count):
+    """Times request_count GETs in this interpreter and returns the results dictionary.
+
+    """
+
+    from cmaple.rest_base import RestBase
+    import cmaple.tree_helpers as tree_helpers
+    if mode == 'production':
+        import cmaple.production
+        cmaple.production.enable_production_mode(progress_interval=10)
+
+    class BenchLeaf(RestBase):
+
+        def __init__(self, leaf_dir):
+            self.verify = False
+            self.persist_responses = False
+            self.restore_responses = False
+            self.leaf_dir = leaf_dir
+            self.response_cache_ttl = 0
+            super().__init__()
+
+    leaf = BenchLeaf(tempfile.mkdtemp())
+    leaf._session = FakeSession(build_page(item_count))
+    urls = ['%s/object/networks/%s' % (_HOST, i) for i in range(request_count)]
+    responses_dict = {}
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        start = time.perf_counter()
+        for url in urls:
+            leaf._process_json_request(url=url, responses_dict=responses_dict, headers={}, method='get',
+                                       credentials_dict={}, verify=False)
+        elapsed = time.perf_counter() - start
+    # The cost of one eagerly formatted debug payload, as paid per response before the debug calls were made lazy...
+    response_dict = responses_dict[urls[-1]]
+    pformat_count = min(request_count, 200)
+    start = time.perf_counter()
+    for i in range(pformat_count):
+        pformat(response_dict)
+    pformat_elapsed = time.perf_counter() - start
+    return {'mode': mode, 'items': item_count, 'requests': request_count,
+            'us_per_request': elapsed / request_count * 1e6,
+            'us_per_eager_pformat': pformat_elapsed / pformat_count * 1e6,
+            'progress_bytes': len(stderr.getvalue())}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Times the per request overhead with and without production '
+                                                     'mode.')
+    arg_parser.add_argument('-items', type=int, nargs='+', default=[25, 400], help='items per page response')
+    arg_parser.add_argument('-requests', type=int, default=2000, help='requests timed per measurement')
+    arg_parser.add_argument('-mode', choices=['default', 'production'], help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.mode:
+        print(json.dumps([run_mode(args.mode, item_count, args.requests) for item_count in args.items]))
+        return
+
+    results = {}
+    for mode in ('default', 'production'):
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '-mode', mode, '-requests',
+                                          str(args.requests), '-items'] + [str(items) for items in args.items])
+        results[mode] = json.loads(output.decode())
+
+    print('%-6s %16s %16s %9s %18s %18s' % ('items', 'default us/req', 'production us/req', 'speedup',
+                                           'eager pformat us', 'progress bytes'))
+    for default, production in zip(results['default'], results['production']):
+        print('%-6s %16.1f %16.1f %8.1fx %18.1f %9s/%-8s' % (default['items'], default['us_per_request'],
+                                                             production['us_per_request'],
+                                                             default['us_per_request'] /
+                                                             production['us_per_request'],
+                                                             default['us_per_eager_pformat'],
+                                                             default['progress_bytes'],
+                                                             production['progress_bytes']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+bench_rest_leaves.py - Offline throughput benchmark suite for the REST
+leaves.  Each case starts a cmaple.fmc.mock_fmc_server stand-in serving a
+generated FMC snapshot, connects an FMC leaf to it and times one
+operation:
+
+    walk              walk_API_resource_gets over the whole API model
+    get_all_items     get_all_items on a 50k item collection
+    smart_get         smart_get_url_list over every access policy's rules
+    bulk_post         bulk_post of 10k network objects
+    csv_export        write_csv_template_from_response of 10k objects
+    restore           restore_responses of a persisted 20k response snapshot
+
+Each case runs in its own interpreter so peak RSS is per case.  The
+leaf's set up (token and model load) is not timed.  Results are written
+as JSON for tracking regressions between releases.
+
+Usage: python benchmarks/bench_rest_leaves.py [-cases walk bulk_post] [-scale 0.1] [-latency 0.01]
+    [-max_concurrency 8] [-output results.json]
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import datetime
+import subprocess
+import contextlib
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # Windows...
+    resource = None
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MODEL_FILE = os.path.join(_REPO_DIR, 'json_models', 'api-docs-fmcwithll.json')
+_DOMAIN_UUID = 'e276abec-e0f2-11e3-8169-6d9ed49b625f'
+_PATH_ROOT = 'https://fmc.example.com/api/fmc_config/v1/domain/%s/' % _DOMAIN_UUID
+_CASES = ('walk', 'get_all_items', 'smart_get', 'bulk_post', 'csv_export', 'restore')
+# Object counts at scale 1.0...
+_SIZES = {'walk_networks': 2000, 'walk_hosts': 1000, 'walk_groups': 200, 'walk_ports': 500, 'policies': 20,
+          'rules_per_policy': 100, 'get_all_items': 50000, 'bulk_post': 10000, 'csv_export': 10000,
+          'restore': 20000}
+
+
+def get_object_id(kind, i):
+    return '005056A7-0A2B-%04x-0000-%012d' % (kind, i)
+
+
+def network(i):
+    return {'id': get_object_id(1, i), 'type': 'Network', 'name': 'net_%s' % i, 'value': '10.%s.%s.0/24' %
+            (i // 256 % 256, i % 256), 'overridable': False, 'description': ' ',
+            'metadata': {'timestamp': 1540000000000 + i, 'lastUser': {'name': 'admin'},
+                         'domain': {'name': 'Global', 'id': _DOMAIN_UUID}}}
+
+
+def add_objects(snapshot, collection_path, objects):
+    for json_dict in objects:
+        url = '%s%s/%s' % (_PATH_ROOT, collection_path, json_dict['id'])
+        snapshot.add_response(url, dict(json_dict, links={'self': url}))
+
+
+def build_snapshot(case, sizes):
+    """Returns the FMCSnapshot served for case.
+
+    """
+
+    from cmaple.fmc.mock_fmc_server import FMCSnapshot
+
+    snapshot = FMCSnapshot()
+    snapshot.domains[_DOMAIN_UUID] = 'Global'
+    if case == 'walk':
+        add_objects(snapshot, 'object/networks', [network(i) for i in range(sizes['walk_networks'])])
+        add_objects(snapshot, 'object/hosts',
+                    [{'id': get_object_id(2, i), 'type': 'Host', 'name': 'host_%s' % i,
+                      'value': '192.168.%s.%s' % (i // 256 % 256, i % 256)} for i in range(sizes['walk_hosts'])])
+        add_objects(snapshot, 'object/protocolportobjects',
+                    [{'id': get_object_id(3, i), 'type': 'ProtocolPortObject', 'name': 'port_%s' % i,
+                      'protocol': 'TCP', 'port': str(1024 + i)} for i in range(sizes['walk_ports'])])
+        add_objects(snapshot, 'object/networkgroups',
+                    [{'id': get_object_id(4, i), 'type': 'NetworkGroup', 'name': 'group_%s' % i,
+                      'objects': [{'type': 'Network', 'id': get_object_id(1, j), 'name': 'net_%s' % j}
+                                  for j in range(i * 5, i * 5 + 5)]} for i in range(sizes['walk_groups'])])
+    if case in ('walk', 'smart_get'):
+        policies = [{'id': get_object_id(5, i), 'type': 'AccessPolicy', 'name': 'policy_%s' % i,
+                     'defaultAction': {'action': 'BLOCK'}} for i in range(sizes['policies'])]
+        add_objects(snapshot, 'policy/accesspolicies', policies)
+        for policy in policies:
+            add_objects(snapshot, 'policy/accesspolicies/%s/accessrules' % policy['id'],
+                        [{'id': get_object_id(6, i), 'type': 'AccessRule', 'name': 'rule_%s' % i, 'action': 'ALLOW',
+                          'enabled': True} for i in range(sizes['rules_per_policy'])])
+    if case == 'get_all_items':
+        add_objects(snapshot, 'object/networks', [network(i) for i in range(sizes['get_all_items'])])
+    if case == 'csv_export':
+        add_objects(snapshot, 'object/networks', [network(i) for i in range(sizes['csv_export'])])
+    return snapshot
+
+
+def get_peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere...
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_case(case, args):
+    """Runs case in this interpreter and returns its results dictionary.
+
+    """
+
+    from cmaple.fmc.mock_fmc_server import MockFMCServer
+    from cmaple.fmc.fmc import FMC
+    import cmaple.tree_helpers as tree_helpers
+    import cmaple.response_store as response_store
+
+    sizes = {key: max(int(value * args.scale), 1) for key, value in _SIZES.items()}
+    case_dir = tempfile.mkdtemp(prefix=case + '_', dir=args.work_dir)
+    results = {'case': case, 'requests': 0}
+    operation = None
+
+    if case == 'restore':
+        # Persist a snapshot of FMC like responses, then time restoring it...
+        store = response_store.get_response_store(case_dir)
+        for i in range(sizes['restore']):
+            url = '%sobject/networks/%s' % (_PATH_ROOT, get_object_id(1, i))
+            store.put(url, {'url': url, 'headers': {'Content-Type': 'application/json'}, 'error': None,
+                            'json_dict': dict(network(i), links={'self': url}), 'status_code': 200,
+                            'null_response': False, 'filtered': False, 'cache_hit': False}, counter=i)
+        store.flush()
+        response_store.close_response_stores()
+        results['items'] = sizes['restore']
+
+        def operation():
+            responses_dict = OrderedDict()
+            tree_helpers.restore_responses(case_dir, responses_dict)
+            return {'responses': len(responses_dict)}
+    else:
+        mock_server = MockFMCServer(build_snapshot(case, sizes), latency=args.latency,
+                                    requests_per_minute=args.requests_per_minute)
+        mock_server.start()
+        leaf = FMC(name=case, json_file_path=args.model_file, FMC_host=mock_server.host, FMC_port=mock_server.port,
+                   FMC_scheme=mock_server.scheme, FMC_username='benchmark', FMC_password='benchmark',
+                   leaf_dir=case_dir, persist_responses=False, requests_per_minute=None, backoff_timer=1,
+                   default_max_concurrency=args.max_concurrency, dump_metrics_at_exit=False)
+
+        if case == 'walk':
+            results['items'] = sizes['walk_networks'] + sizes['walk_hosts'] + sizes['walk_ports'] + \
+                               sizes['walk_groups'] + sizes['policies'] * (sizes['rules_per_policy'] + 1)
+
+            def operation():
+                responses_dict = OrderedDict()
+                leaf.walk_API_resource_gets(responses_dict=responses_dict)
+                return {'responses': len(responses_dict)}
+        elif case == 'get_all_items':
+            results['items'] = sizes['get_all_items']
+
+            def operation():
+                responses_dict = leaf.get_all_items(url='object/networks', responses_dict=OrderedDict())
+                return {'responses': len(responses_dict),
+                        'items_returned': sum([len(response_dict['json_dict'].get('items', []))
+                                               for response_dict in responses_dict.values()
+                                               if response_dict['json_dict']])}
+        elif case == 'smart_get':
+            results['items'] = sizes['policies']
+
+            def operation():
+                responses_dict = OrderedDict()
+                for i in range(sizes['policies']):
+                    leaf.smart_get_url_list("policy/accesspolicies/$..items[@.name is 'policy_%s'].id/accessrules" %
+                                            i, responses_dict=responses_dict)
+                return {'responses': len(responses_dict)}
+        elif case == 'bulk_post':
+            results['items'] = sizes['bulk_post']
+            post_list = [{'type': 'Network', 'name': 'bulk_net_%s' % i, 'value': '172.%s.%s.0/24' %
+                          (16 + i // 65536 % 16, i // 256 % 256)} for i in range(sizes['bulk_post'])]
+
+            def operation():
+                responses_dict = OrderedDict()
+                leaf.bulk_post(url='object/networks', post_list=post_list, responses_dict=responses_dict)
+                return {'responses': len(responses_dict), 'created': mock_server.get_stats()['created']}
+        elif case == 'csv_export':
+            results['items'] = sizes['csv_export']
+            with contextlib.redirect_stderr(io.StringIO()):
+                export_dict = leaf.get_all_items(url='object/networks?expanded=true', responses_dict=OrderedDict())
+
+            def operation():
+                csv_text = leaf.write_csv_template_from_response(response_dict=export_dict,
+                                                                 field_filter_regex='metadata')
+                return {'csv_bytes': len(str(csv_text))}
+
+        requests_before = mock_server.get_stats()['requests']
+
+    with contextlib.redirect_stderr(io.StringIO()):
+        start = time.perf_counter()
+        results.update(operation())
+        results['seconds'] = time.perf_counter() - start
+
+    if case != 'restore':
+        results['requests'] = mock_server.get_stats()['requests'] - requests_before
+        results['server'] = mock_server.get_stats()
+        mock_server.stop()
+    results['requests_per_second'] = results['requests'] / results['seconds'] if results['requests'] else None
+    results['items_per_second'] = results['items'] / results['seconds']
+    results['peak_rss_bytes'] = get_peak_rss_bytes()
+    shutil.rmtree(case_dir, ignore_errors=True)
+    return results
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=_REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Offline throughput benchmarks for the REST leaves.')
+    arg_parser.add_argument('-cases', nargs='+', choices=_CASES, default=list(_CASES), help='cases to run')
+    arg_parser.add_argument('-scale', type=float, default=1.0, help='multiplies every object count')
+    arg_parser.add_argument('-latency', type=float, default=0.0, help='seconds the stand-in adds to each response')
+    arg_parser.add_argument('-requests_per_minute', type=float, default=None,
+                            help='rate above which the stand-in answers with 429')
+    arg_parser.add_argument('-max_concurrency', type=int, default=1, help='the leaf default_max_concurrency')
+    arg_parser.add_argument('-model_file', default=_MODEL_FILE, help='the FMC API model json file')
+    arg_parser.add_argument('-output', default=None, help='the JSON results file, default stdout only')
+    arg_parser.add_argument('-work_dir', default=None, help=argparse.SUPPRESS)
+    arg_parser.add_argument('-case', choices=_CASES, default=None, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args)))
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='cmaple_bench_')
+    try:
+        # The leaf caches the parsed model next to the model file, keep that out of the source tree...
+        model_file = os.path.join(work_dir, os.path.basename(args.model_file))
+        shutil.copy(args.model_file, model_file)
+        # Benchmark this source tree, wherever the children run from...
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([_REPO_DIR] + [path for path in
+                                                                      [os.environ.get('PYTHONPATH')] if path]))
+        case_results = []
+        for case in args.cases:
+            command = [sys.executable, os.path.abspath(__file__), '-case', case, '-work_dir', work_dir,
+                       '-model_file', model_file, '-scale', str(args.scale), '-latency', str(args.latency),
+                       '-max_concurrency', str(args.max_concurrency)]
+            if args.requests_per_minute is not None:
+                command += ['-requests_per_minute', str(args.requests_per_minute)]
+            output = subprocess.check_output(command, cwd=work_dir, env=env)
+            case_results.append(json.loads(output.decode().strip().splitlines()[-1]))
+            result = case_results[-1]
+            print('%-14s %10.2f s %10s req/s %10.0f items/s %8.1f MB peak RSS' %
+                  (case, result['seconds'],
+                   '%.0f' % result['requests_per_second'] if result['requests_per_second'] else '-',
+                   result['items_per_second'], (result['peak_rss_bytes'] or 0) / 1e6), file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {'timestamp': datetime.datetime.utcnow().isoformat() + 'Z', 'git_commit': get_git_commit(),
+               'python': platform.python_version(), 'platform': platform.platform(),
+               'parameters': {'scale': args.scale, 'latency': args.latency,
+                              'requests_per_minute': args.requests_per_minute,
+                              'max_concurrency': args.max_concurrency},
+               'cases': case_results}
+    results_json = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results_json)
+    print(results_json)
+
+
+if __name__ == '__main__':
+    main()
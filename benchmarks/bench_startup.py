@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+bench_startup.py - Benchmark of the cmaple_cli.py startup for a simple
+operations file, which creates a tree and pretty prints a dictionary
+without adding a leaf.  Each run is a new interpreter started with
+python -X importtime, so the wall clock time, the total import time, the
+slowest imports and the heavy dependencies imported (which should only
+be imported once a leaf or a connection needs them) are reported.
+
+Usage: python benchmarks/bench_startup.py [-repeat 5] [-top 15] [-output results.json]
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from collections import OrderedDict
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CLI_PATH = os.path.join(_REPO_DIR, 'cmaple_cli.py')
+# Dependencies a simple operations file should not import...
+_HEAVY_MODULES = ('requests', 'urllib3', 'jsonpath_ng', 'objectpath', 'xmltodict', 'pytz', 'paramiko', 'fabric',
+                  'invoke', 'cmaple.rest_base', 'cmaple.fmc.fmc')
+_OPERATIONS = """[vars]
+tree_name=startup_tree
+
+[tree]
+logging_level=INFO
+RUN tree=CMapleTree(name={vars$tree_name},tree_dir=@maple_working_dir,logging_level={tree$logging_level})
+
+[print]
+RUN empty=get_empty_dict()
+RUN pretty=output.pretty_print(_object={print$RUN empty})
+"""
+# import time: self [us] | cumulative | imported package...
+_IMPORTTIME_REGEX = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """Returns the (cumulative microseconds, module) of the top level imports and the set of imported modules from
+    python -X importtime output.
+
+    """
+
+    top_level = []
+    modules = set()
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_REGEX.match(line)
+        if match is None:
+            continue
+        modules.add(match.group(4))
+        if len(match.group(3)) == 1:
+            top_level.append((int(match.group(2)), match.group(4)))
+    return top_level, modules
+
+
+def run_cli(work_dir, operations_file):
+    """Runs cmaple_cli.py with operations_file in work_dir, returns the wall clock seconds and the importtime output.
+
+    """
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([_REPO_DIR] + [path for path in [env.get('PYTHONPATH')] if path])
+    command = [sys.executable, '-X', 'importtime', _CLI_PATH, '-ocf', operations_file, '-mwd', work_dir]
+    start_time = time.perf_counter()
+    completed = subprocess.run(command, cwd=work_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    seconds = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError('cmaple_cli.py failed:\n%s' % completed.stderr[-2000:])
+    return seconds, completed.stderr
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Times the cmaple_cli.py startup.')
+    arg_parser.add_argument('-repeat', type=int, default=5, help='runs, the fastest is kept')
+    arg_parser.add_argument('-top', type=int, default=15, help='the number of slowest imports reported')
+    arg_parser.add_argument('-output', default=None, help='the JSON results file, default stdout only')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='cmaple_bench_')
+    try:
+        operations_file = os.path.join(work_dir, 'startup.operations')
+        with open(operations_file, 'w') as f:
+            f.write(_OPERATIONS)
+        best = None
+        for i in range(args.repeat):
+            seconds, stderr = run_cli(work_dir, operations_file)
+            if best is None or seconds < best[0]:
+                best = (seconds, stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    seconds, stderr = best
+    top_level, modules = parse_importtime(stderr)
+    results = OrderedDict([('repeat', args.repeat), ('wall_seconds', seconds),
+                           ('import_seconds', sum(microseconds for microseconds, module in top_level) / 1e6),
+                           ('modules_imported', len(modules)),
+                           ('heavy_modules_imported', sorted(module for module in _HEAVY_MODULES if module in modules)),
+                           ('slowest_imports', [OrderedDict([('module', module), ('seconds', microseconds / 1e6)])
+                                                for microseconds, module in sorted(top_level, reverse=True)[:args.top]])])
+    print('startup %.3f s, imports %.3f s, %s modules, heavy modules imported: %s' %
+          (results['wall_seconds'], results['import_seconds'], results['modules_imported'],
+           ', '.join(results['heavy_modules_imported']) or 'none'), file=sys.stderr)
+    for slowest_import in results['slowest_imports']:
+        print('%10.3f s  %s' % (slowest_import['seconds'], slowest_import['module']), file=sys.stderr)
+
+    results_json = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results_json)
+    print(results_json)
+
+
+if __name__ == '__main__':
+    main()
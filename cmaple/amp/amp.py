@@ -156,13 +156,13 @@ class AMP(RestBase):
                     self._request_wrapper(recursed=True, **kwargs)
                 if response_dict['status_code'] == 429 and not exclude_filtered:
                     # Pop the url from the responses_dict so we don't trigger a cache hit on the next request...
-                    self.responses_dict.pop(kwargs['url'])
+                    kwargs['responses_dict'].pop(response_dict['url'], None)
                     if i == (self.rpm_retries - 1):
                         logger.error('Requests per minute code 429 retry count exceeded.  Exiting...')
                         sys.exit()
                     logger.info(
-                        'AMP reports requests per minute exceeding 120.  Sleeping for self._backoff_timer seconds...')
-                    time.sleep(self.backoff_timer)
+                        'AMP reports requests per minute exceeding its limit.  Backing off...')
+                    self._rate_limit_backoff(response_dict)
                 else:
                     next_link = tree_helpers.get_jsonpath_values(self.next_link_query, response_dict)
 
@@ -176,7 +176,7 @@ class AMP(RestBase):
 
                     return response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url
         else:
-            return tree_helpers.process_json_request(**kwargs)
+            return self._process_json_request(**kwargs)
 
     @logged(logger)
     @traced(logger)
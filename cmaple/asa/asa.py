@@ -204,13 +204,13 @@ class ASA(RestBase):
                     self._request_wrapper(recursed=True, **kwargs)
                 if response_dict['status_code'] == 429 and not exclude_filtered:
                     # Pop the url from the responses_dict so we don't trigger a cache hit on the next request...
-                    self.responses_dict.pop(kwargs['url'])
+                    kwargs['responses_dict'].pop(response_dict['url'], None)
                     if i == (self.rpm_retries - 1):
                         logger.error('Requests per minute code 429 retry count exceeded.  Exiting...')
                         sys.exit()
                     logger.info(
-                        'ASA reports requests per minute exceeding 120.  Sleeping for self._backoff_timer seconds...')
-                    time.sleep(self.backoff_timer)
+                        'ASA reports requests per minute exceeding its limit.  Backing off...')
+                    self._rate_limit_backoff(response_dict)
                 else:
 
                     # Derive next_url
@@ -237,7 +237,29 @@ class ASA(RestBase):
                         print('next_url=', next_url)
                     return response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url
         else:
-            return tree_helpers.process_json_request(**kwargs)
+            return self._process_json_request(**kwargs)
+
+    @logged(logger)
+    @traced(logger)
+    def _get_paging_info(self, response_dict):
+
+        """Returns the (offset, limit, total) paging metadata from the ASA rangeInfo node.
+        This should only be called by internal methods.
+
+        *Parameters*
+
+        response_dict: dictionary
+            The response to read.
+        """
+
+        json_dict = response_dict['json_dict']
+        if not isinstance(json_dict, dict) or not isinstance(json_dict.get('rangeInfo'), dict):
+            return None
+        range_info = json_dict['rangeInfo']
+        try:
+            return int(range_info['offset']), int(range_info['limit']), int(range_info['total'])
+        except (KeyError, TypeError, ValueError):
+            return None
 
     @logged(logger)
     @traced(logger)
@@ -449,7 +471,7 @@ class ASA(RestBase):
                                   method='post', credentials_dict=self.credentials_dict, verify=self.verify,
                                   success_status_code=201)
 
-        logger.debug(pformat(response_dict))
+        logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
     def smart_get_url_list(self, url, responses_dict=None):
 
@@ -573,7 +595,7 @@ class ASA(RestBase):
                     if prev_url in urls_processed:
                         continue
                     urls_processed.append(prev_url)
-                    self._collect_responses(prev_url, response_dict, responses_dict)
+                    self._collect_responses(prev_url, response_dict, responses_dict, use_response_cache=True)
         return None  # No id found
 
     def _build_request_templates(self):
@@ -193,13 +193,13 @@ class BPS(RestBase):
                     self._request_wrapper(recursed=True, **kwargs)
                 if response_dict['status_code'] == 429 and not exclude_filtered:
                     # Pop the url from the responses_dict so we don't trigger a cache hit on the next request...
-                    self.responses_dict.pop(kwargs['url'])
+                    kwargs['responses_dict'].pop(response_dict['url'], None)
                     if i == (self.rpm_retries - 1):
                         logger.error('Requests per minute code 429 retry count exceeded.  Exiting...')
                         sys.exit()
                     logger.info(
-                        'BPS reports requests per minute exceeding 120.  Sleeping for self._backoff_timer seconds...')
-                    time.sleep(self.backoff_timer)
+                        'BPS reports requests per minute exceeding its limit.  Backing off...')
+                    self._rate_limit_backoff(response_dict)
                 else:
 
                     # Derive next_url
@@ -226,7 +226,7 @@ class BPS(RestBase):
                     #     print('next_url=', next_url)
                     return response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url
         else:
-            return tree_helpers.process_json_request(**kwargs)
+            return self._process_json_request(**kwargs)
 
     @logged(logger)
     @traced(logger)
@@ -380,7 +380,7 @@ class BPS(RestBase):
                                   method='post', credentials_dict=self.credentials_dict, verify=self.verify,
                                   success_status_code=201)
 
-        logger.debug(pformat(response_dict))
+        logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
     def smart_get_url_list(self, url, responses_dict=None):
 
@@ -457,10 +457,10 @@ class BPS(RestBase):
         self._auth_token_time = time.time()
         json_body = json.dumps(self.credentials_dict)
         response_dict, status, include_filtered, exclude_filtered, cache_hit = \
-            tree_helpers.process_json_request(url=self._auth_url, responses_dict=self.responses_dict,
-                                              method='post', headers=self._auth_headers, stop_on_error=True,
-                                              credentials_dict=self.credentials_dict, success_status_code=200,
-                                              verify=self.verify, json_body=json_body)
+            self._process_json_request(url=self._auth_url, responses_dict=self.responses_dict,
+                                       method='post', headers=self._auth_headers, stop_on_error=True,
+                                       credentials_dict=self.credentials_dict, success_status_code=200,
+                                       verify=self.verify, json_body=json_body)
 
         auth_headers = response_dict['headers']
         pprint(response_dict)
@@ -544,7 +544,7 @@ class BPS(RestBase):
                     if prev_url in urls_processed:
                         continue
                     urls_processed.append(prev_url)
-                    self._collect_responses(prev_url, response_dict, responses_dict)
+                    self._collect_responses(prev_url, response_dict, responses_dict, use_response_cache=True)
         return None  # No id found
 
     def _build_request_templates(self):
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+concurrency_controller.py implements the adaptive (AIMD) concurrency
+window used by the REST leaf walk engines and bulk operations.  The
+window starts small and grows while responses are healthy, is cut
+multiplicatively when the host answers with a 429 or a 5xx, a request
+fails or the smoothed latency rises well above the latency seen at low
+load.  max_concurrency is the ceiling of the window.
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import re
+import threading
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+# Define global variables...
+# Weight of the latest response in the smoothed latency...
+_LATENCY_SMOOTHING = 0.2
+# Rate the latency baseline follows a smoothed latency above it, so a host which becomes slower for good is not
+# treated as overloaded forever...
+_BASELINE_DRIFT = 0.01
+# Smoothed latency samples required before latency can cut the window...
+_LATENCY_WARMUP = 5
+
+
+# Not traced, record_response is called for every request...
+@logged(logger)
+class AIMDController(object):
+    """Thread safe additive increase, multiplicative decrease concurrency window.
+
+    Until the first congestion signal the window grows by one for every healthy response (slow start, doubling each
+    round trip).  After that it grows by increase per window of healthy responses.  A 429, a 5xx, a request error or a
+    smoothed latency above latency_tolerance times the baseline latency multiplies the window by decrease.  The window
+    is cut at most once per window of responses, so a burst of 429s from one round of requests counts as one signal.
+    """
+
+    def __init__(self, max_window=16, min_window=1, initial_window=1, increase=1.0, decrease=0.5,
+                 latency_tolerance=2.0, metrics=None):
+
+        """__init__ creates a controller with the window at initial_window.
+
+        *Parameters*
+
+        max_window: integer, keyword, default=16
+            The largest window, normally the caller's max_concurrency.
+        min_window: integer, keyword, default=1
+            The smallest window.
+        initial_window: integer, keyword, default=1
+            The starting window.
+        increase: number, keyword, default=1.0
+            The window increase per window of healthy responses after slow start.
+        decrease: number, keyword, default=0.5
+            The factor the window is multiplied by on a congestion signal.
+        latency_tolerance: number, keyword, default=2.0
+            The smoothed latency, as a multiple of the baseline latency, treated as a congestion signal.  None
+            disables latency signals.
+        metrics: request_metrics.RequestMetrics, keyword, default=None
+            If provided, the window is published as the concurrency_window gauge.
+        """
+
+        self.max_window = max(int(max_window), 1)
+        self.min_window = min(max(int(min_window), 1), self.max_window)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+        self.latency_tolerance = latency_tolerance
+        self.metrics = metrics
+        self._window = float(min(max(initial_window, self.min_window), self.max_window))
+        self._slow_start = True
+        self._latency = None
+        self._baseline = None
+        self._samples = 0
+        self._since_cut = 0
+        self._lock = threading.Lock()
+        self.stats = {'responses': 0, 'increases': 0, 'decreases': 0, 'throttled': 0, 'server_errors': 0,
+                      'request_errors': 0, 'latency_signals': 0}
+        self._publish()
+
+    @property
+    def window(self):
+        """The number of requests which may be in flight.
+
+        """
+
+        return int(self._window)
+
+    def set_max_window(self, max_window):
+        """Changes the ceiling of the window, e.g. when a caller passes a different max_concurrency.
+
+        """
+
+        with self._lock:
+            self.max_window = max(int(max_window), 1)
+            self.min_window = min(self.min_window, self.max_window)
+            self._window = min(self._window, float(self.max_window))
+        self._publish()
+
+    def record_response(self, status_code, seconds):
+        """Updates the window with the outcome of one request.  A status_code of None records a request which raised
+        an error.
+
+        """
+
+        with self._lock:
+            self.stats['responses'] += 1
+            self._since_cut += 1
+            congested = False
+            if status_code is None:
+                self.stats['request_errors'] += 1
+                congested = True
+            elif status_code == 429:
+                self.stats['throttled'] += 1
+                congested = True
+            elif status_code >= 500:
+                self.stats['server_errors'] += 1
+                congested = True
+            elif self._record_latency(seconds):
+                self.stats['latency_signals'] += 1
+                congested = True
+
+            window = self._window
+            if congested:
+                self._slow_start = False
+                if self._since_cut >= window:
+                    self._window = max(float(self.min_window), window * self.decrease)
+                    self._since_cut = 0
+                    self.stats['decreases'] += 1
+            elif window < self.max_window:
+                if self._slow_start:
+                    self._window = min(float(self.max_window), window + 1.0)
+                else:
+                    self._window = min(float(self.max_window), window + self.increase / window)
+                self.stats['increases'] += 1
+            changed = int(self._window) != int(window)
+        if changed:
+            logger.debug('Concurrency window changed from %s to %s' % (int(window), int(self._window)))
+            self._publish()
+
+    def _record_latency(self, seconds):
+        # Returns True if the smoothed latency is a congestion signal...
+        if self._latency is None:
+            self._latency = seconds
+        else:
+            self._latency += (seconds - self._latency) * _LATENCY_SMOOTHING
+        self._samples += 1
+        if self._baseline is None or self._latency < self._baseline:
+            self._baseline = self._latency
+        else:
+            self._baseline += (self._latency - self._baseline) * _BASELINE_DRIFT
+        if self.latency_tolerance is None or self._samples < _LATENCY_WARMUP:
+            return False
+        return self._latency > self._baseline * self.latency_tolerance
+
+    def _publish(self):
+        if self.metrics is not None:
+            self.metrics.set_gauge('concurrency_window', int(self._window))
+
+    def get_stats(self):
+        """Returns a copy of the controller counters with the current window and latencies.
+
+        """
+
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({'window': int(self._window), 'max_window': self.max_window, 'min_window': self.min_window,
+                          'slow_start': self._slow_start, 'latency_seconds': self._latency,
+                          'baseline_latency_seconds': self._baseline})
+        return stats
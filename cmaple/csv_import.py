@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+csv_import.py implements the streaming pipeline the REST leafs import
+csv templates with (see RestBase.post_csv_template).  Rows are read,
+expanded to post bodies, validated and serialized on a reader thread
+and handed to the posting thread in batches through a bounded queue, so
+parsing overlaps the requests and memory follows the batch size rather
+than the file size.  ImportProgress counts rows, records and throughput
+while the import runs.
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import re
+import json
+import time
+import queue
+import threading
+import cmaple.output_transforms as output_transforms
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+# Define global variables...
+# Marks the end of a prefetched iterable...
+_END = object()
+# Failures kept for the import statistics, further failures are only counted...
+_MAX_FAILURES = 1000
+
+
+# Not traced, the counters are updated for every batch...
+@logged(logger)
+class ImportProgress(object):
+    """Thread safe counters of a csv import: rows read, records rejected by validation, records posted and failed,
+    batches and throughput.
+
+    """
+
+    def __init__(self, progress_callback=None, max_failures=_MAX_FAILURES):
+
+        """__init__ creates the counters and starts the import clock.
+
+        *Parameters*
+
+        progress_callback: function, keyword, default=None
+            Called with the statistics (see get_stats) after each batch is posted.
+        max_failures: integer, keyword, default=1000
+            The number of failed rows kept with their errors.
+        """
+
+        self.progress_callback = progress_callback
+        self.max_failures = max_failures
+        self.failures = []
+        self.stats = {'rows_read': 0, 'records_invalid': 0, 'records_posted': 0, 'records_failed': 0, 'batches': 0}
+        self._start_time = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record_rows(self, rows):
+        """Counts rows read from the csv file.
+
+        """
+
+        with self._lock:
+            self.stats['rows_read'] += rows
+
+    def record_invalid(self, row_number, error):
+        """Counts a row rejected by validation.
+
+        """
+
+        with self._lock:
+            self.stats['records_invalid'] += 1
+            self._add_failure(row_number, None, error)
+
+    def record_batch(self, row_numbers, results):
+        """Counts a posted batch from the result dictionaries of its records (see tree_helpers.get_bulk_result) and
+        calls progress_callback.
+
+        """
+
+        with self._lock:
+            self.stats['batches'] += 1
+            for row_number, result in zip(row_numbers, results):
+                if result['status'] == 'failed':
+                    self.stats['records_failed'] += 1
+                    self._add_failure(row_number, result['status_code'], result['error'])
+                else:
+                    self.stats['records_posted'] += 1
+        stats = self.get_stats()
+        logger.debug('csv import: %s records posted, %s failed, %.1f records per second' %
+                     (stats['records_posted'], stats['records_failed'], stats['records_per_second']))
+        if self.progress_callback is not None:
+            self.progress_callback(stats)
+
+    def _add_failure(self, row_number, status_code, error):
+        if len(self.failures) < self.max_failures:
+            self.failures.append({'row': row_number, 'status_code': status_code, 'error': error})
+
+    def get_stats(self):
+        """Returns a copy of the counters with the elapsed seconds, the rows and records per second and the kept
+        failures.
+
+        """
+
+        with self._lock:
+            stats = dict(self.stats)
+            stats['failures'] = list(self.failures)
+        seconds = time.perf_counter() - self._start_time
+        stats['seconds'] = seconds
+        stats['rows_per_second'] = stats['rows_read'] / seconds if seconds else 0.0
+        stats['records_per_second'] = (stats['records_posted'] + stats['records_failed']) / seconds if seconds else 0.0
+        return stats
+
+
+@logged(logger)
+@traced(logger)
+def iter_csv_batches(file_path, batch_size=1000, validate_function=None, progress=None):
+    """Yields the records of a csv template as lists of up to batch_size (row number, post body json) tuples.  Rows
+    are expanded with output_transforms.expand_flattened_json.  Rows with no values, and rows validate_function
+    returns an error for, are counted as invalid and skipped.
+
+    *Parameters*
+
+    file_path: string
+        The full path to the file containing the csv records.
+    batch_size: integer, keyword, default=1000
+        The number of records in a batch.
+    validate_function: function, keyword, default=None
+        Called with each expanded post body, returns None if it is valid or an error string.
+    progress: ImportProgress, keyword, default=None
+        Counts rows read and invalid records.
+    """
+
+    batch_size = max(int(batch_size), 1)
+    batch = []
+    rows = 0
+    for row_number, flatlined in output_transforms.iter_csv_records(file_path):
+        rows += 1
+        error = None
+        if not any(flatlined.values()):
+            error = 'The row has no values.'
+        else:
+            post_dict = output_transforms.expand_flattened_json(flatlined)
+            if validate_function is not None:
+                error = validate_function(post_dict)
+        if error:
+            if progress is not None:
+                progress.record_invalid(row_number, error)
+            continue
+        batch.append((row_number, json.dumps(post_dict)))
+        if len(batch) >= batch_size:
+            if progress is not None:
+                progress.record_rows(rows)
+            rows = 0
+            yield batch
+            batch = []
+    if progress is not None:
+        progress.record_rows(rows)
+    if batch:
+        yield batch
+
+
+@logged(logger)
+@traced(logger)
+def prefetch(iterable, max_queued=2):
+    """Yields the items of iterable, produced on a reader thread up to max_queued items ahead of the caller.  An
+    exception raised by iterable is raised in the caller.  The reader stops when the caller stops iterating.
+
+    *Parameters*
+
+    iterable: iterable
+        The items to produce.
+    max_queued: integer, keyword, default=2
+        The number of produced items waiting for the caller.
+    """
+
+    items = queue.Queue(maxsize=max(int(max_queued), 1))
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as err:
+            put((_END, err))
+            return
+        put((_END, None))
+
+    reader = threading.Thread(target=produce, name='cmaple_prefetch', daemon=True)
+    reader.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        reader.join()
@@ -282,34 +282,20 @@ class FDM(RestBase):
 
         def get_item_id(url, name, type, response_dict):
             logger.debug('In get_item_id with url %s' % url)
-            logger.debug(pformat(response_dict))
-            item_id = None
-            if type in name_to_id_mappings and name in name_to_id_mappings[type]:
-                item_id = name_to_id_mappings[type][name]
-            else:
-                if not type in name_to_id_mappings:
-                    # Strip off any parameters before sending url to self.get_all_items...
-                    url = re.sub('\?.+','',url)
-                    item_responses = self.get_all_items(url=url, responses_dict={})
-                    name_to_id_mappings[type] = {}
-                    name_to_id_mappings[type]['item_responses'] = item_responses
-                response_urls = list(name_to_id_mappings[type]['item_responses'].keys())
-                for response_url in response_urls:
-                    if 'items' in name_to_id_mappings[type]['item_responses'][response_url]['json_dict']:
-                        for item in name_to_id_mappings[type]['item_responses'][response_url]['json_dict']['items']:
-                            if item['name'] == name:
-                                item_id = item['id']
-                            name_to_id_mappings[type][name] = item['id']
-                    else:
-                        logger.warning('No enumeration items returned for url %s.')
-                        name_to_id_mappings[type][name] = 'unsupported'
+            if not type in listed_types:
+                # List the target objects of this type once, the leaf indexes them as they are stored...
+                # Strip off any parameters before sending url to self.get_all_items...
+                url = re.sub('\?.+','',url)
+                self.get_all_items(url=url, responses_dict={})
+                listed_types.add(type)
+            item_id = self.find_id_by_name(type, name)
             logger.debug('Exiting from get_item_id with item_id %s' % item_id)
             return item_id
 
         def post_json_wrapper(response_dict, object_type):
 
             logger.debug('In post_json_wrapper for object_type %s' % object_type)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             source_id = response_dict['json_dict']['id']
             source_type = response_dict['json_dict']['type']
@@ -324,10 +310,10 @@ class FDM(RestBase):
             else:
                 new_json = prep_migration_json(url, response_dict, object_type)
                 logger.debug('Posting new_json for url %s and source_type %s' % (url, source_type))
-                logger.debug(pformat(new_json))
+                logger.debug('%s', tree_helpers.LazyPformat(new_json))
                 posted_response = self.post_json_request(migration_url, new_json)
                 logger.debug('Received response for url %s' % migration_url)
-                logger.debug(pformat(posted_response))
+                logger.debug('%s', tree_helpers.LazyPformat(posted_response))
                 status = ''
                 new_item_id = ''
                 if not posted_response['status_code'] == 201:
@@ -357,7 +343,7 @@ class FDM(RestBase):
                                                  % new_json['type'])
                                     new_json['id'] = new_item_id
                                     logger.debug('adding existing item id %s to new_json' % new_item_id)
-                                    logger.debug(pformat(new_json))
+                                    logger.debug('%s', tree_helpers.LazyPformat(new_json))
                                     put_response = self.put_json_request(migration_url + '/' + new_item_id, new_json)
                                     if not put_response['status_code'] == 200:
                                         error_text = put_response['error']
@@ -375,7 +361,7 @@ class FDM(RestBase):
                     status = 'success'
                     new_item_id = posted_response['json_dict']['id']
             logger.debug('Existing post_json_wrapper with status %s and new_item_id %s' % (status, new_item_id))
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             id_mappings[source_id] = new_item_id
             response_dict['processed'] = True
@@ -384,7 +370,7 @@ class FDM(RestBase):
         def post_container(url, response_dict):
 
             logger.debug('Posting container object for url %s' % url)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             posted_response = post_json_wrapper(response_dict, 'container')
 
@@ -401,14 +387,14 @@ class FDM(RestBase):
         def post_end_object(url, response_dict):
 
             logger.debug('Posting end object for url %s' % url)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             id = response_dict['json_dict']['id']
             type = response_dict['json_dict']['type']
             name = response_dict['json_dict']['name']
-            if type in name_to_id_mappings and name in name_to_id_mappings[type]:
+            if type in listed_types and self.find_id_by_name(type, name) is not None:
                 logger.info('post_end_object: end_object type %s with name %s already exists on target fdm...' % (type, name))
-                id_mappings[id] = name_to_id_mappings[type][name]
+                id_mappings[id] = self.find_id_by_name(type, name)
                 return True
 
             posted_response = post_json_wrapper(response_dict, 'end_object')
@@ -417,14 +403,14 @@ class FDM(RestBase):
 
         def post_composite_object(url, response_dict):
             logger.debug('Posting composite object for url %s' % url)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             posted_response = post_json_wrapper(response_dict, 'composite_object')
             return True
 
         def prepare_url_for_migration(url, response_dict, id_mapping):
             logger.debug('preparing url %s for migration' % url)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             type = response_dict['json_dict']['type']
             #Handle exceptions to url construct here...
@@ -493,7 +479,7 @@ class FDM(RestBase):
                 pprint(response_dict)
             print('after type check')
             pprint(response_dict)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
             if 'type' in response_dict['json_dict']:
                 if response_dict['json_dict']['type'] in exclude_types:
                     logger.warning('type %s matched exclude pattern.  Skipping...' % response_dict['json_dict']['type'])
@@ -545,8 +531,15 @@ class FDM(RestBase):
         exclude_types = []
 
         id_mappings = {}
-        name_to_id_mappings = {}
-        tree_helpers.restore_responses(source_config_path, self.source_responses_dict)
+        # Types whose target objects have been listed (and indexed) by get_item_id...
+        listed_types = set()
+        if self.lazy_restore:
+            # Migration marks and edits source responses, keep those changes when responses are evicted...
+            self.source_responses_dict = tree_helpers.restore_lazy_responses(source_config_path,
+                                                                             max_cached=self.lazy_restore_cache_size,
+                                                                             writeback=True)
+        else:
+            tree_helpers.restore_responses(source_config_path, self.source_responses_dict)
         source_responses_urls = list(self.source_responses_dict.keys())
         recurse_migrate_config(self.source_responses_dict)
 
@@ -565,10 +558,12 @@ class FDM(RestBase):
             Used to pass through arguments to wrapped methods.
         """
 
-        time_diff = time.time() - self._auth_token_time
-        if time_diff > 1700:
-            logger.info('Refreshing authentication token...')
-            self._get_token()
+        # Only one thread refreshes the token, the others wait and then reuse it...
+        with self._auth_lock:
+            time_diff = time.time() - self._auth_token_time
+            if time_diff > 1700:
+                logger.info('Refreshing authentication token...')
+                self._get_token()
 
         if not recursed:
 
@@ -577,13 +572,13 @@ class FDM(RestBase):
                     self._request_wrapper(recursed=True, **kwargs)
                 if response_dict['status_code'] == 429 and not exclude_filtered:
                     # Pop the url from the responses_dict so we don't trigger a cache hit on the next request...
-                    self.responses_dict.pop(kwargs['url'])
+                    kwargs['responses_dict'].pop(response_dict['url'], None)
                     if i == (self.rpm_retries - 1):
                         logger.error('Requests per minute code 429 retry count exceeded.  Exiting...')
                         sys.exit()
                     logger.info(
-                        'fdm reports requests per minute exceeding 120.  Sleeping for self._backoff_timer seconds...')
-                    time.sleep(self.backoff_timer)
+                        'fdm reports requests per minute exceeding its limit.  Backing off...')
+                    self._rate_limit_backoff(response_dict, method=kwargs['method'])
                 else:
 
                     next_link = tree_helpers.get_jsonpath_values(self.next_link_query, response_dict)
@@ -602,7 +597,7 @@ class FDM(RestBase):
 
                     return response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url
         else:
-            return tree_helpers.process_json_request(**kwargs)
+            return self._process_json_request(**kwargs)
 
     @logged(logger)
     @traced(logger)
@@ -679,7 +674,7 @@ class FDM(RestBase):
         """
 
         logger.debug('parent url = %s' % parent_url)
-        logger.debug('\n' + pformat(response_dict))
+        logger.debug('\n%s', tree_helpers.LazyPformat(response_dict))
         # Workaround for FDM due to some FDM objects not containing a reference to contained collections
         # e.g. the main access policy for FDM does not contain a "accessrules" reference to obtain the rules
         # This function will determine if any sub urls exist and create child urls for them
@@ -730,7 +725,7 @@ class FDM(RestBase):
         response_self_id = None
         url = response_dict['url']
         logger.debug('getting child url for url %s' % url)
-        logger.debug(pformat(response_dict))
+        logger.debug('%s', tree_helpers.LazyPformat(response_dict))
         child_urls = []
         child_types = {}
         if 'id' in response_dict['json_dict']:
@@ -838,13 +833,13 @@ class FDM(RestBase):
             logger.debug('Getting unreferenced child urls for url %s' % url)
             child_urls = get_unreferenced_child_urls(url, child_urls)
 
-        logger.debug('child_urls = \n%s' % pformat(child_urls))
+        logger.debug('child_urls = \n%s', tree_helpers.LazyPformat(child_urls))
         return child_urls, child_types
 
     #Begin class specific methods
     ################################################################################################################
     def walk_API_resource_gets(self, include_filter_regex=None, exclude_filter_regex=None, responses_dict=None,
-                               use_cache=True, stop_on_error=False, get_item_limit=None):
+                               use_cache=True, stop_on_error=False, get_item_limit=None, max_concurrency=None):
 
         """Recursively walks the API resource paths.
 
@@ -868,11 +863,29 @@ class FDM(RestBase):
         responses_dict: dictionary, keyword, default=None
             Allows the caller to override the default behavior to store responses in the self.responses_dict.  Useful
             if caller would like to keep the responses isolated.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of GET requests in flight.  Values above 1 select the concurrent breadth first walk.
+            Defaults to the leaf's default_max_concurrency.
         """
 
         if responses_dict is None:
             responses_dict = self.responses_dict
 
+        max_concurrency = int(sd(locals(), 'max_concurrency', self))
+        if max_concurrency > 1:
+            urls = []
+            for root_path, resource_paths in self._paths_hierarchy.items():
+                for resource_path, resource_dict in resource_paths.items():
+                    urls.append(root_path + '/' + resource_path)
+            logger.debug('walk_API_resource_gets calling walk_API_child_gets_concurrent with %s urls...' % len(urls))
+            self._walk_API_child_gets_concurrent(urls, include_filter_regex=include_filter_regex,
+                                                 exclude_filter_regex=exclude_filter_regex,
+                                                 use_cache=use_cache, stop_on_error=stop_on_error,
+                                                 responses_dict=responses_dict,
+                                                 get_item_limit=sd(locals(), 'get_item_limit', self),
+                                                 max_concurrency=max_concurrency)
+            return self.responses_dict
+
         for root_path, resource_paths in self._paths_hierarchy.items():
             for resource_path, resource_dict in resource_paths.items():
                 url = root_path + '/' + resource_path
@@ -962,7 +975,7 @@ class FDM(RestBase):
                                   method='post', credentials_dict=self.credentials_dict, verify=self.verify,
                                   success_status_code=201)
 
-        logger.debug(pformat(response_dict))
+        logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
     def smart_get_url_list(self, url, responses_dict=None):
 
@@ -1086,7 +1099,7 @@ class FDM(RestBase):
                     if prev_url in urls_processed:
                         continue
                     urls_processed.append(prev_url)
-                    self._collect_responses(prev_url, response_dict, responses_dict)
+                    self._collect_responses(prev_url, response_dict, responses_dict, use_response_cache=True)
         return None  # No id found
 
     def _build_request_templates(self):
@@ -1117,15 +1130,15 @@ class FDM(RestBase):
         self._auth_token_time = time.time()
 
         response_dict, status, include_filtered, exclude_filtered, cache_hit = \
-            tree_helpers.process_json_request(url=self._auth_url, responses_dict=self.responses_dict,
-                                              method='post', headers=self._auth_headers, stop_on_error=True,
-                                              credentials_dict=self.credentials_dict, success_status_code=200,
-                                              verify=self.verify, json_body=json.dumps(self._auth_body))
+            self._process_json_request(url=self._auth_url, responses_dict=self.responses_dict,
+                                       method='post', headers=self._auth_headers, stop_on_error=True,
+                                       credentials_dict=self.credentials_dict, success_status_code=200,
+                                       verify=self.verify, json_body=json.dumps(self._auth_body))
 
         # Authorization: Bearer
-        logger.debug(pformat(response_dict))
+        logger.debug('%s', tree_helpers.LazyPformat(response_dict))
         auth_headers = response_dict['json_dict']
-        logger.debug(pformat(auth_headers))
+        logger.debug('%s', tree_helpers.LazyPformat(auth_headers))
         if 'access_token' in auth_headers:
             self._auth_token = auth_headers['access_token']
             self._refresh_token = auth_headers['refresh_token']
@@ -175,7 +175,7 @@ def get_all_reference_dicts(fdm_instance):
     # Populate type_model, model_type and wrapper
     for model, model_dict in models_dict.items():
         logger.debug('model = %s' % model)
-        logger.debug(pformat(model_dict))
+        logger.debug('%s', tree_helpers.LazyPformat(model_dict))
         if 'properties' in model_dict and 'type' in model_dict['properties'] \
                 and 'default' in model_dict['properties']['type']:
             model_type = model_dict['properties']['type']['default']
@@ -224,7 +224,8 @@ def get_all_reference_dicts(fdm_instance):
 
         # Populate path_model_dict, model_path_dict, type_path_dict, path_type_dict
         if 'get' in json_dict['paths'][API_path]:
-            logger.debug('Attempting to get schema for API_path %s\n' % pformat(json_dict['paths'][API_path]))
+            logger.debug('Attempting to get schema for API_path %s\n',
+                         tree_helpers.LazyPformat(json_dict['paths'][API_path]))
             get_schema = get_schema_ref(json_dict['paths'][API_path]['get']['responses']['200']['schema'])
             if get_schema is None:
                 logger.warning('No schema $ref found for this API_Path...')
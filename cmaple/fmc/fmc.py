@@ -34,25 +34,45 @@ import re
 import cmaple.tree_helpers as tree_helpers
 from cmaple.tree_helpers import set_default as sd
 import cmaple.fmc.fmc_helpers as fmc_helpers
+import cmaple.fmc.model_cache as model_cache
 import cmaple.input_validations as input_validations
 import cmaple.output_transforms as output_transforms
+import cmaple.request_metrics as request_metrics
 import json
+import urllib.parse
 import urllib3
 from pprint import pprint, pformat
 import logging
 from autologging import logged, traced
 from autologging import TRACE
 import time
+import threading
 from objectpath import *
 from collections import OrderedDict
-import _pickle
 
 #Define global variables...
 _API_AUTH_PATH = '/api/fmc_platform/{API_version}/auth/generatetoken'
+_DEFAULT_PORTS = {'https': 443, 'http': 80}
+# The FMC rejects request bodies larger than this...
+_BULK_MAX_BYTES = 2048000
+# Bulk deletes select their objects with an ids filter in the url, keep it well under common url length limits...
+_BULK_DELETE_MAX_FILTER_BYTES = 6000
+# Marks a child reference resolution not yet in the child url table...
+_NOT_RESOLVED = object()
+# Bulk statuses rejecting one or more records of a chunk, the chunk is split to isolate them...
+_BULK_RECORD_REJECTED_STATUS_CODES = (400, 422)
+# Request entity too large, the chunk is split without failing its records...
+_BULK_TOO_LARGE_STATUS_CODE = 413
 
 # Create a logger tree.fmc...
 logger = logging.getLogger(re.sub('\.[^.]+$','',__name__))
 
+
+def _strip_bulk_id(result):
+    # Bulk PUT and DELETE results are keyed by the object id...
+    return {key: value for key, value in result.items() if key != 'id'}
+
+
 @logged(logger)
 @traced(logger)
 class FMC(RestBase):
@@ -84,6 +104,9 @@ class FMC(RestBase):
             The ip address or fqdn of the FMC
         FMC_port: integer, keyword, default=443
             The TCP/IP FMC management port
+        FMC_scheme: string, keyword, default='https'
+            The url scheme.  'http' is only useful against a local stand-in such as
+            cmaple.fmc.mock_fmc_server.
         FMC_username: string, keyword, default=None
             The username for FMC
         FMC_password: string, keyword, default=None
@@ -102,6 +125,11 @@ class FMC(RestBase):
             The number of times to retry in response to a 429 error.
         backoff_timer: integer, keyword, default=30
             The interval to wait between retry attempts
+        requests_per_minute: number, keyword, default=110
+            The request rate the leaf paces to.  FMC allows 120 requests per minute per user; the token bucket is
+            shared by all FMC leafs using the same host and username.
+        rate_limit_burst: integer, keyword, default=10
+            The number of requests which may be sent back to back.
         persist_responses: boolean, keyword, default=True
             If True, responses will be pickle persisted by url into the leaf's working directory.
         restore_responses: boolean, keyword, default=False
@@ -109,13 +137,25 @@ class FMC(RestBase):
         leaf_dir: string, keyword, default=None
             Provided by CMapleTree when this leaf type is instantiated.  Contains the directory where working files
             for the leaf instance are stored.
+        smart_filter_pushdown: boolean, keyword, default=True
+            If True, smart_get_url_list and smart_get_object_id list a collection followed by a name or value
+            predicate with an FMC filter query (and expanded=true for fields missing from plain listings) instead
+            of listing every item.  The predicate is still applied to the items returned.
+        smart_filter_pushdown_paths: list, keyword, default=None
+            Additional (collection path regex, {item field: FMC filter key}) tuples, checked before
+            fmc_helpers.SMART_FILTER_PUSHDOWN_PATHS.
+        model_cache_dir: string, keyword, default=None
+            The directory the compiled API model is written to and read from (see cmaple.fmc.model_cache).
+            Defaults to the per user cache directory (see cmaple.fmc.model_cache.get_default_cache_dir).
         """
 
         kwarg_defaults = {'json_file_path':None, 'FMC_host':None, 'FMC_port':None, 'FMC_username':None,
                           'FMC_password':None, 'FMC_domain':'Global', 'API_path_delimiter':'/', 'API_version':'v1',
                           'verify':False, 'default_get_item_limit':400, 'rpm_retries':5, 'backoff_timer':30,
                           'persist_responses':True, 'restore_responses':False, 'leaf_dir': None,
-                          'connect_device': True}
+                          'connect_device': True, 'requests_per_minute': 110, 'rate_limit_burst': 10,
+                          'FMC_scheme': 'https', 'smart_filter_pushdown': True, 'smart_filter_pushdown_paths': None,
+                          'model_cache_dir': None}
 
         for key, val in kwargs.items():
             kwarg_defaults[key] = val
@@ -135,8 +175,8 @@ class FMC(RestBase):
         
         # Add class specific attributes
         self.domain_ID_dict = {}
-        self._url_host = 'https://' + self.FMC_host
-        if self.FMC_port and not int(self.FMC_port) == int(443):
+        self._url_host = self.FMC_scheme + '://' + self.FMC_host
+        if self.FMC_port and not int(self.FMC_port) == _DEFAULT_PORTS.get(self.FMC_scheme):
             self._url_host += ':' + str(self.FMC_port)
         self._auth_url = self._url_host + _API_AUTH_PATH.replace('{API_version}', self.API_version)
         self.request_headers = {'Content-Type': 'application/json'}
@@ -159,6 +199,9 @@ class FMC(RestBase):
                                                    self.FMC_domain_ID)
         # This cache will be used by _get_child_urls to store responses to handle anomaly cases
         self.anomalous_response_cache = {}
+        # Path templates of collections which rejected a smart listing filter...
+        self._unsupported_filter_paths = set()
+        self._bulk_path_regexes = None
 
         # Load the model and build the reference dictionaries...
         self._get_json_dict(self.json_file_path)
@@ -272,7 +315,8 @@ class FMC(RestBase):
                         if re.match('.+?/' + id, child_url):
                             logger.debug('id %s found in child_url %s' % (id, child_url))
                             child_response = self.source_responses_dict[child_url]
-                            logger.debug('Child response_dict from source = \n\t%s' % pformat(child_response))
+                            logger.debug('Child response_dict from source = \n\t%s',
+                                         tree_helpers.LazyPformat(child_response))
                             child_json = {}
                             tree_helpers.deep_update(child_json, child_response['json_dict'])
                             child_json.pop('id')
@@ -287,36 +331,20 @@ class FMC(RestBase):
 
         def get_item_id(url, name, type, response_dict):
             logger.debug('In get_item_id with url %s' % url)
-            logger.debug(pformat(response_dict))
-            item_id = None
-            if type in name_to_id_mappings and name in name_to_id_mappings[type]:
-                item_id = name_to_id_mappings[type][name]
-            else:
-                if not type in name_to_id_mappings:
-                    # Strip off any parameters before sending url to self.get_all_items...
-                    url = re.sub('\?.+','',url)
-                    item_responses = self.get_all_items(url=url, responses_dict={})
-                    name_to_id_mappings[type] = {}
-                    name_to_id_mappings[type]['item_responses'] = item_responses
-                response_urls = list(name_to_id_mappings[type]['item_responses'].keys())
-                for response_url in response_urls:
-                    json_dict_value = name_to_id_mappings[type]['item_responses'][response_url]['json_dict']
-                    if json_dict_value and \
-                            'items' in name_to_id_mappings[type]['item_responses'][response_url]['json_dict']:
-                        for item in name_to_id_mappings[type]['item_responses'][response_url]['json_dict']['items']:
-                            if item['name'] == name:
-                                item_id = item['id']
-                            name_to_id_mappings[type][name] = item['id']
-                    else:
-                        logger.warning('No enumeration items returned for url %s.')
-                        name_to_id_mappings[type][name] = 'unsupported'
+            if not type in listed_types:
+                # List the target objects of this type once, the leaf indexes them as they are stored...
+                # Strip off any parameters before sending url to self.get_all_items...
+                url = re.sub('\?.+','',url)
+                self.get_all_items(url=url, responses_dict={})
+                listed_types.add(type)
+            item_id = self.find_id_by_name(type, name)
             logger.debug('Exiting from get_item_id with item_id %s' % item_id)
             return item_id
 
         def post_json_wrapper(response_dict, object_type):
 
             logger.debug('In post_json_wrapper for object_type %s' % object_type)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             source_id = response_dict['json_dict']['id']
             source_type = response_dict['json_dict']['type']
@@ -331,10 +359,10 @@ class FMC(RestBase):
             else:
                 new_json = prep_migration_json(url, response_dict, object_type)
                 logger.debug('Posting new_json for url %s and source_type %s' % (url, source_type))
-                logger.debug(pformat(new_json))
+                logger.debug('%s', tree_helpers.LazyPformat(new_json))
                 posted_response = self.post_json_request(migration_url, new_json)
                 logger.debug('Received response for url %s' % migration_url)
-                logger.debug(pformat(posted_response))
+                logger.debug('%s', tree_helpers.LazyPformat(posted_response))
                 status = ''
                 new_item_id = ''
                 if not posted_response['status_code'] == 201:
@@ -364,7 +392,7 @@ class FMC(RestBase):
                                                  % new_json['type'])
                                     new_json['id'] = new_item_id
                                     logger.debug('adding existing item id %s to new_json' % new_item_id)
-                                    logger.debug(pformat(new_json))
+                                    logger.debug('%s', tree_helpers.LazyPformat(new_json))
                                     put_response = self.put_json_request(migration_url + '/' + new_item_id, new_json)
                                     if not put_response['status_code'] == 200:
                                         error_text = put_response['error']
@@ -382,7 +410,7 @@ class FMC(RestBase):
                     status = 'success'
                     new_item_id = posted_response['json_dict']['id']
             logger.debug('Existing post_json_wrapper with status %s and new_item_id %s' % (status, new_item_id))
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             id_mappings[source_id] = new_item_id
             response_dict['processed'] = True
@@ -391,7 +419,7 @@ class FMC(RestBase):
         def post_container(url, response_dict):
 
             logger.debug('Posting container object for url %s' % url)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             posted_response = post_json_wrapper(response_dict, 'container')
 
@@ -408,14 +436,14 @@ class FMC(RestBase):
         def post_end_object(url, response_dict):
 
             logger.debug('Posting end object for url %s' % url)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             id = response_dict['json_dict']['id']
             type = response_dict['json_dict']['type']
             name = response_dict['json_dict']['name']
-            if type in name_to_id_mappings and name in name_to_id_mappings[type]:
+            if type in listed_types and self.find_id_by_name(type, name) is not None:
                 logger.info('post_end_object: end_object type %s with name %s already exists on target FMC...' % (type, name))
-                id_mappings[id] = name_to_id_mappings[type][name]
+                id_mappings[id] = self.find_id_by_name(type, name)
                 return True
 
             posted_response = post_json_wrapper(response_dict, 'end_object')
@@ -424,14 +452,14 @@ class FMC(RestBase):
 
         def post_composite_object(url, response_dict):
             logger.debug('Posting composite object for url %s' % url)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             posted_response = post_json_wrapper(response_dict, 'composite_object')
             return True
 
         def prepare_url_for_migration(url, response_dict, id_mapping):
             logger.debug('preparing url %s for migration' % url)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             type = response_dict['json_dict']['type']
             #Handle exceptions to url construct here...
@@ -475,7 +503,7 @@ class FMC(RestBase):
             # url = re.sub(r'https://[^/]+', 'https://' + self.FMC_host, url)
 
             # Replace the path root with ours
-            url = re.sub(r'https://.+?domain/[^/]+/', self.path_root, url)
+            url = re.sub(r'https?://.+?domain/[^/]+/', self.path_root, url)
             # get the id
             id = response_dict['json_dict']['id']
             # Strip the id's
@@ -508,7 +536,7 @@ class FMC(RestBase):
             #     pprint(response_dict)
             # print('after type check')
             # pprint(response_dict)
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
             if 'type' in response_dict['json_dict']:
                 if response_dict['json_dict']['type'] in exclude_types:
                     logger.warning('type %s matched exclude pattern.  Skipping...' % response_dict['json_dict']['type'])
@@ -561,8 +589,15 @@ class FMC(RestBase):
         # exclude_types = []
 
         id_mappings = {}
-        name_to_id_mappings = {}
-        tree_helpers.restore_responses(source_config_path, self.source_responses_dict)
+        # Types whose target objects have been listed (and indexed) by get_item_id...
+        listed_types = set()
+        if self.lazy_restore:
+            # Migration marks and edits source responses, keep those changes when responses are evicted...
+            self.source_responses_dict = tree_helpers.restore_lazy_responses(source_config_path,
+                                                                             max_cached=self.lazy_restore_cache_size,
+                                                                             writeback=True)
+        else:
+            tree_helpers.restore_responses(source_config_path, self.source_responses_dict)
 
         # pprint(self.source_responses_dict)
 
@@ -584,17 +619,19 @@ class FMC(RestBase):
             Used to pass through arguments to wrapped methods.
         """
 
-        time_diff = time.time() - self._auth_token_time
-        if time_diff > 1500:  # 1500 = 25 minutes...
-            logger.info('Refreshing authentication token...')
-            if self._refresh_token_count < 3:
-                self._refresh_token_count += 1
-            else:
-                logger.info('Token has been refreshed the maximum of 3 times, requesting new token...')
-                self._refresh_token_count = 0
-                self._auth_headers.pop('X-auth-access-token')
-                self._auth_headers.pop('X-auth-refresh-token')
-            self._get_token_and_domains()
+        # Only one thread refreshes the token, the others wait and then reuse it...
+        with self._auth_lock:
+            time_diff = time.time() - self._auth_token_time
+            if time_diff > 1500:  # 1500 = 25 minutes...
+                logger.info('Refreshing authentication token...')
+                if self._refresh_token_count < 3:
+                    self._refresh_token_count += 1
+                else:
+                    logger.info('Token has been refreshed the maximum of 3 times, requesting new token...')
+                    self._refresh_token_count = 0
+                    self._auth_headers.pop('X-auth-access-token')
+                    self._auth_headers.pop('X-auth-refresh-token')
+                self._get_token_and_domains()
 
         if not recursed:
 
@@ -603,13 +640,13 @@ class FMC(RestBase):
                     self._request_wrapper(recursed=True, **kwargs)
                 if response_dict['status_code'] == 429 and not exclude_filtered:
                     # Pop the url from the responses_dict so we don't trigger a cache hit on the next request...
-                    self.responses_dict.pop(kwargs['url'])
+                    kwargs['responses_dict'].pop(response_dict['url'], None)
                     if i == (self.rpm_retries - 1):
                         logger.error('Requests per minute code 429 retry count exceeded.  Exiting...')
                         sys.exit()
                     logger.info(
-                        'FMC reports requests per minute exceeding 120.  Sleeping for self._backoff_timer seconds...')
-                    time.sleep(self.backoff_timer)
+                        'FMC reports requests per minute exceeding its limit.  Backing off...')
+                    self._rate_limit_backoff(response_dict, method=kwargs['method'])
                 else:
 
                     next_link = tree_helpers.get_jsonpath_values(self.next_link_query, response_dict)
@@ -624,7 +661,7 @@ class FMC(RestBase):
 
                     return response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url
         else:
-            return tree_helpers.process_json_request(**kwargs)
+            return self._process_json_request(**kwargs)
 
     @logged(logger)
     @traced(logger)
@@ -653,7 +690,7 @@ class FMC(RestBase):
                 logger.debug('type %s is not in anomalous_response_cache...' % type)
                 responses_dict = self.GET_API_path(url='devices/devicerecords', responses_dict={})
                 logger.debug('from GET_API_path, responses_dict==================')
-                logger.debug(pformat(responses_dict))
+                logger.debug('%s', tree_helpers.LazyPformat(responses_dict))
                 device_ids = tree_helpers.get_objectpath_values("$..items[@.type is 'Device'].id", responses_dict)
                 for device_id in device_ids:
                     responses_dict = self.GET_API_path(url='devices/devicerecords/%s' % device_id,
@@ -664,31 +701,18 @@ class FMC(RestBase):
                                                        responses_dict=responses_dict)
                 self.anomalous_response_cache[type] = responses_dict
                 logger.debug('anomalous response cache for type %s ===============')
-                logger.debug(pformat(self.anomalous_response_cache[type]))
-            device_ids = tree_helpers.get_objectpath_values("$..items[@.type is 'Device'].id",
-                                                            self.anomalous_response_cache[type])
-            logger.debug('device_ids =', device_ids)
-
-            for device_id in device_ids:
-                logger.debug('processing  device_id =', device_id)
-                device_interface_url = '{}{}{}'.format(self.path_root, 'devices/devicerecords/', device_id)
-                device_interfaces = None
-                interface_ids = []
-                for url, val in self.anomalous_response_cache[type].items():
-                    if device_interface_url in url:
-                        device_interfaces = val
-                        interface_ids.extend(tree_helpers.get_objectpath_values(
-                            "$..items[@.type is 'PhysicalInterface'].id", device_interfaces))
-                        interface_ids.extend(tree_helpers.get_objectpath_values(
-                            "$..items[@.type is 'SubInterface'].id", device_interfaces))
-                for interface_id in interface_ids:
-                    logger.debug('processing interface id %s for match with id %s' % (interface_id, id))
-                    if interface_id == id:
-                        child_url = \
-                            '{}{}{}/{}{}'.format(self.path_root, 'devices/devicerecords/', device_id,
-                                                 'physicalinterfaces/', interface_id)
-                        logger.debug('found a match, child_url = %s' % child_url)
-                        break
+                logger.debug('%s', tree_helpers.LazyPformat(self.anomalous_response_cache[type]))
+            # The device record and interface responses are indexed, find the device the interface belongs to...
+            interface_url = self.find_url_by_id(id)
+            if interface_url is not None and \
+                    self.response_index.get_type_by_id(id) in ('PhysicalInterface', 'SubInterface'):
+                device_url = self.response_index.get_parent_url(interface_url)
+                device_id = re.sub(r'^.+/', '', device_url)
+                if self.response_index.get_type_by_id(device_id) == 'Device':
+                    child_url = \
+                        '{}{}{}/{}{}'.format(self.path_root, 'devices/devicerecords/', device_id,
+                                             'physicalinterfaces/', id)
+                    logger.debug('found a match, child_url = %s' % child_url)
 
         self.persist_responses = persist_responses
         return child_url
@@ -762,26 +786,6 @@ class FMC(RestBase):
             The parent url of this response.  Used to prevent circular object references.
         """
 
-        def recurse_for_child_dicts(json_dict, parent_key, type_list):
-            if type(json_dict) is dict or type(json_dict) is OrderedDict:
-                if 'type' in json_dict and not parent_key == '':
-                    parent_key += '~' + json_dict['type']
-                for key, val in json_dict.items():
-                    if type(val) is dict or type(val) is OrderedDict:
-                        if 'type' in val:
-                            type_list.append({'key': key, 'parent_key': parent_key, 'dict': val})
-                        elif 'refType' in val:
-                            type_list.append({'key': key, 'parent_key': parent_key, 'dict': val})
-                        recurse_for_child_dicts(val, (parent_key + '~' if not parent_key == '' else '') + key, type_list)
-                    elif type(val) is list:
-                        for val_member in val:
-                            val_dict = {key: val_member}
-                            # recurse_for_child_dicts(val_dict, (parent_key + '~' if not parent_key == '' else '') + key, type_list)
-                            recurse_for_child_dicts(val_dict, parent_key, type_list)
-            elif type(json_dict) is list:
-                for json_member in json_dict:
-                    recurse_for_child_dicts(json_member, parent_key, type_list)
-
         anomalous_composites = ['Device',
                                 'DeviceHAPair',
                                 ]
@@ -791,7 +795,7 @@ class FMC(RestBase):
         response_self_id = None
         url = response_dict['url']
         logger.debug('getting child url for url %s' % url)
-        logger.debug(pformat(response_dict))
+        logger.debug('%s', tree_helpers.LazyPformat(response_dict))
         child_urls = []
         child_types = {}
         if 'id' in response_dict['json_dict']:
@@ -819,19 +823,20 @@ class FMC(RestBase):
         temp_response_dict = response_dict['json_dict'].copy()
         if 'metadata' in temp_response_dict:
             temp_response_dict.pop('metadata')
-        type_list = []
-        recurse_for_child_dicts(temp_response_dict, '', type_list)
+        type_list = fmc_helpers.get_child_type_dicts(temp_response_dict)
+        # Safeguard to prevent child url returning parent url - deployabledevice
+        parent_base_url = re.sub('\?.+', '', url)
+        child_url_table = self._child_url_table
 
         for type_dict in type_list:
             child_url = ''
+            child_dict = type_dict['dict']
             if type_dict['key'] == 'literals':
                 child_url = 'literal'
                 # continue
 
-            lower_first_func = lambda s: s[:1].lower() + s[1:] if s else ''
-            id_type = ''
-            if 'type' in type_dict['dict']:
-                id_type = type_dict['dict']['type']
+            if 'type' in child_dict:
+                id_type = child_dict['type']
                 if id_type in anomalous_types:
                     child_url = self._handle_anomalous_types(type_dict)
             else:
@@ -839,47 +844,35 @@ class FMC(RestBase):
                 logger.warning('type attribute missing for child dict %s...' % type_dict)
 
             if child_url == '':
-                if not id_type in self._models_path_dict \
-                    and not type_dict['key'] in self._models_path_dict \
-                    and not lower_first_func(id_type) in self._models_path_dict \
-                    and not id_type.lower() in self._models_path_dict \
-                        and not 'links' in type_dict['dict']:
+                resolution = child_url_table.get((id_type, type_dict['key']), _NOT_RESOLVED)
+                if resolution is _NOT_RESOLVED:
+                    resolution = self._get_child_url_resolution(id_type, type_dict['key'])
+                if resolution is None and not 'links' in child_dict:
                     logger.warning('no url found for child dict %s...' % type_dict)
                 else:
-                    logger.debug('child dict = %s' % type_dict)
-                    if 'links' in type_dict['dict']:
-                        if 'self' in type_dict['dict']['links']:
-                            child_url = type_dict['dict']['links']['self']
+                    logger.debug('child dict = %s', type_dict)
+                    if 'links' in child_dict:
+                        if 'self' in child_dict['links']:
+                            child_url = child_dict['links']['self']
                         else:
                             logger.warning(
                                 'Child dictionary %s has a links node but self url is missing...' % type_dict)
                     elif not id_type == 'missing_type_attribute':
-                        if id_type in self._models_path_dict:
-                            child_url = self._models_path_dict[id_type]
-                        elif type_dict['key'] in self._models_path_dict:
-                            child_url = self._models_path_dict[type_dict['key']]
-                        elif lower_first_func(id_type) in self._models_path_dict:
-                            child_url = self._models_path_dict[lower_first_func(id_type)]
-                        else:
-                            child_url = self._models_path_dict[id_type.lower()]
-
-                        logger.debug('child_model_url = %s' % (child_url))
-                        if '{containerUUID}' in child_url:
+                        child_url, needs_container_UUID, needs_object_id = resolution
+                        if needs_container_UUID:
                             if not response_self_id:
                                 logger.warning(
                                     'Child type url %s needs a {containerUUID} but no parent id found...' % (child_url))
                             else:
                                 child_url = child_url.replace('{containerUUID}', response_self_id)
-                        if '{objectId}' in child_url:
-                            if 'id' in type_dict['dict']:
-                                object_id = type_dict['dict']['id']
-                                child_url = child_url.replace('{objectId}', object_id)
+                        if needs_object_id:
+                            if 'id' in child_dict:
+                                child_url = child_url.replace('{objectId}', child_dict['id'])
                             else:
                                 logger.warning('Child type url %s needs an {objectId} but no id found...' % (child_url))
 
             if not child_url == '':
-                # Safeguard to prevent child url returning parent url - deployabledevice
-                if not child_url == re.sub('\?.+', '', response_dict['url']):
+                if not child_url == parent_base_url:
                     # Add the root path in if missing...
                     if self.path_root not in child_url and not child_url == 'literal':
                         child_url = self.path_root + child_url
@@ -901,10 +894,33 @@ class FMC(RestBase):
                 logger.warning('no url found for child dict %s ' % type_dict)
         return child_urls, child_types
 
+    @logged(logger)
+    @traced(logger)
+    def _get_child_url_resolution(self, id_type, key):
+        """Returns the model url of a child reference of type id_type found under key, as (url template, needs a
+        {containerUUID}, needs an {objectId}), or None if the model has no url for it.  The model paths are tried by
+        type, key, type with a lower case first letter and lower case type.  The resolution is added to
+        self._child_url_table, which _get_child_urls reads first.
+        This should only be called by internal methods.
+        """
+
+        resolution = None
+        model_IDs = [id_type, key]
+        if isinstance(id_type, str):
+            model_IDs += [id_type[:1].lower() + id_type[1:], id_type.lower()]
+        for model_ID in model_IDs:
+            if model_ID in self._models_path_dict:
+                child_url_template = self._models_path_dict[model_ID]
+                resolution = (child_url_template, '{containerUUID}' in child_url_template,
+                              '{objectId}' in child_url_template)
+                break
+        self._child_url_table[(id_type, key)] = resolution
+        return resolution
+
     #Begin class specific methods
     ################################################################################################################
     def walk_API_resource_gets(self, include_filter_regex=None, exclude_filter_regex=None, responses_dict=None,
-                               use_cache=True, stop_on_error=False, get_item_limit=None):
+                               use_cache=True, stop_on_error=False, get_item_limit=None, max_concurrency=None):
 
         """Recursively walks the API resource paths.
 
@@ -928,11 +944,29 @@ class FMC(RestBase):
         responses_dict: dictionary, keyword, default=None
             Allows the caller to override the default behavior to store responses in the self.responses_dict.  Useful
             if caller would like to keep the responses isolated.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of GET requests in flight.  Values above 1 select the concurrent breadth first walk.
+            Defaults to the leaf's default_max_concurrency.
         """
 
         if responses_dict is None:
             responses_dict = self.responses_dict
 
+        max_concurrency = int(sd(locals(), 'max_concurrency', self))
+        if max_concurrency > 1:
+            urls = []
+            for root_path, resource_paths in self._paths_hierarchy.items():
+                for resource_path, resource_dict in resource_paths.items():
+                    urls.append(root_path + '/' + resource_path)
+            logger.debug('walk_API_resource_gets calling walk_API_child_gets_concurrent with %s urls...' % len(urls))
+            self._walk_API_child_gets_concurrent(urls, include_filter_regex=include_filter_regex,
+                                                 exclude_filter_regex=exclude_filter_regex,
+                                                 use_cache=use_cache, stop_on_error=stop_on_error,
+                                                 responses_dict=responses_dict,
+                                                 get_item_limit=sd(locals(), 'get_item_limit', self),
+                                                 max_concurrency=max_concurrency)
+            return self.responses_dict
+
         for root_path, resource_paths in self._paths_hierarchy.items():
             for resource_path, resource_dict in resource_paths.items():
                 url = root_path + '/' + resource_path
@@ -944,6 +978,40 @@ class FMC(RestBase):
 
         return self.responses_dict
 
+    def refresh_API_resource_gets(self, include_filter_regex=None, exclude_filter_regex=None, responses_dict=None,
+                                  stop_on_error=False, get_item_limit=None, max_concurrency=None):
+
+        """Incrementally refreshes the responses of a previous walk_API_resource_gets, typically restored with
+        restore_responses=True.
+
+        Instead of re-walking every object, each collection in the previous walk is listed with expanded=true and
+        only added and changed objects (by metadata timestamp and lastUser) are requested again.  Deleted objects are
+        removed from responses_dict and from the leaf's persisted responses.
+
+        Returns a Python dictionary summarizing the refresh with keys 'collections' (the number listed), 'added',
+        'changed', 'deleted' (lists of object urls), 'failed' (collections which could not be listed) and
+        'refreshed_collections'.
+
+        *Parameters*
+
+        include_filter_regex: string, keyword, default=None
+            A regex string defining which urls to include in the refresh.
+        exclude_filter_regex: string, keyword, default=None
+            A regex string defining which urls to exclude from the refresh.
+        responses_dict: dictionary, keyword, default=None
+            The responses to refresh.  Defaults to self.responses_dict.
+        stop_on_error: boolean, keyword, default=False
+            If set to True, the re-walk will halt when a non positive status code response is received.
+        get_item_limit: integer, keyword, default=400
+            Specifies the number of items to return for each GET request.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of GET requests in flight.  Defaults to the leaf's default_max_concurrency.
+        """
+
+        return self._refresh_API_gets(responses_dict=responses_dict, include_filter_regex=include_filter_regex,
+                                      exclude_filter_regex=exclude_filter_regex, stop_on_error=stop_on_error,
+                                      get_item_limit=get_item_limit, max_concurrency=max_concurrency)
+
     def get_all_API_paths_list(self):
 
         """Returns a list of all valid API paths for the FMC host.
@@ -970,16 +1038,12 @@ class FMC(RestBase):
 
     def _get_json_dict(self, json_file_path=''):
 
-        """Reads the current json FMC API model into a Python dictionary and build all required reference
-        dictionaries.
-
-        Returns a Python dictionary object containing json model.
+        """Loads the reference dictionaries derived from the current json FMC API model.
 
-        Processing the json model file takes up to one minute.  Therefore, this method will check to see if the model
-        has changed since the last run.  It it is the same it will restore the json model dictionary and all derived
-        reference dictionaries from pickled files.
-        
-        Pickles all newly created Python dictionaries if required.
+        Processing the json model file takes up to one minute.  Therefore, the reference dictionaries are compiled
+        once per model content into a memory mapped compiled model file (see cmaple.fmc.model_cache), keyed by the
+        sha256 of the model file.  Leafs of one process using the same model share the loaded compiled model, and
+        the operations and models dictionaries are only decoded when first used.
 
         *Parameters*
 
@@ -990,64 +1054,40 @@ class FMC(RestBase):
             This file provides the API model to MAPLE:FMC which is used for many of the operations to derive urls, etc.
         """
 
-        last_model_specs = {'last_model_file_size':None, 'last_model_mod_date': None}
-        last_model_file = '{}.{}'.format(self.json_file_path, 'last.pickle')
-        last_model_file_size = os.path.getsize(self.json_file_path)
-        last_model_mod_date = os.path.getmtime(self.json_file_path)
         self._json_dict = None
-        if os.path.exists(last_model_file):
-            with open(last_model_file, 'rb') as f:
-                last_model_specs = _pickle.load(f)
-            if last_model_file_size == last_model_specs['last_model_file_size'] and \
-                    last_model_mod_date == last_model_specs['last_model_mod_date']:
-                last_model_pickle = '{}.{}'.format(self.json_file_path, 'pickle')
-                if os.path.exists(last_model_pickle):
-                    with open(last_model_pickle, 'rb') as f:
-                        self._json_dict = _pickle.load(f)
-
-        if self._json_dict is None:
-            # Made it this far so we need to load file from disk
-            last_model_specs['last_model_file_size'] = last_model_file_size
-            last_model_specs['last_model_mod_date'] = last_model_mod_date
-            with open(last_model_file, 'wb') as f:
-                _pickle.dump(last_model_specs, f)
-            self._json_dict = json.load(open(self.json_file_path, 'r'))
-
-        reference_dicts_file = '{}.{}'.format(self.json_file_path, 'reference_pickle')
-        reference_dicts = {}
-        self._models_path_dict = None
-        if os.path.exists(reference_dicts_file):
-            with open(reference_dicts_file, 'rb') as f:
-                reference_dicts = _pickle.load(f)
-            if last_model_file_size == reference_dicts['last_model_file_size'] and \
-                    last_model_mod_date == reference_dicts['last_model_mod_date']:
-                self._resources_path_dict = reference_dicts['_resources_path_dict']
-                self._operations_dict = reference_dicts['_operations_dict']
-                self._models_path_dict = reference_dicts['_models_path_dict']
-                self._paths_hierarchy = reference_dicts['_paths_hierarchy']
-                self._API_path_keywords_list = reference_dicts['_API_path_keywords_list']
-                self._all_API_paths_list = reference_dicts['_all_API_paths_list']
-                self._path_models_dict = reference_dicts['_path_models_dict']
-                self._models_dict = reference_dicts['_models_dict']
-        if self._models_path_dict is None:
-            self._resources_path_dict, self._operations_dict, self._models_path_dict, \
-            self._paths_hierarchy, self._API_path_keywords_list, self._all_API_paths_list, \
-            self._path_models_dict, self._models_dict = fmc_helpers.get_all_reference_dicts(self)
-
-            reference_dicts['_resources_path_dict'] = self._resources_path_dict
-            reference_dicts['_operations_dict'] = self._operations_dict
-            reference_dicts['_models_path_dict'] = self._models_path_dict
-            reference_dicts['_paths_hierarchy'] = self._paths_hierarchy
-            reference_dicts['_API_path_keywords_list'] = self._API_path_keywords_list
-            reference_dicts['_all_API_paths_list'] = self._all_API_paths_list
-            reference_dicts['_path_models_dict'] = self._path_models_dict
-            reference_dicts['_models_dict'] = self._models_dict
-
-            reference_dicts['last_model_file_size'] = last_model_file_size
-            reference_dicts['last_model_mod_date'] = last_model_mod_date
-
-            with open(reference_dicts_file, 'wb') as f:
-                _pickle.dump(reference_dicts, f)
+        self._model = model_cache.load_model(self.json_file_path, self._compile_reference_dicts,
+                                             cache_dir=self.model_cache_dir)
+        self._resources_path_dict = self._model.get('_resources_path_dict')
+        self._models_path_dict = self._model.get('_models_path_dict')
+        self._paths_hierarchy = self._model.get('_paths_hierarchy')
+        self._API_path_keywords_list = self._model.get('_API_path_keywords_list')
+        self._all_API_paths_list = self._model.get('_all_API_paths_list')
+        self._path_models_dict = self._model.get('_path_models_dict')
+        # Child url resolutions by (type, key), built by _get_child_url_resolution as references are met...
+        self._child_url_table = {}
+
+    def _compile_reference_dicts(self):
+        """Reads the json model file and builds the reference dictionaries.  Called by model_cache.load_model when
+        no compiled model matches the model file.
+
+        Returns - The reference dictionaries by name, see model_cache.MODEL_SECTIONS.
+        """
+
+        with open(self.json_file_path, 'r') as json_file:
+            self._json_dict = json.load(json_file)
+        try:
+            return dict(zip(model_cache.MODEL_SECTIONS, fmc_helpers.get_all_reference_dicts(self)))
+        finally:
+            # Only needed to compile, the compiled model holds everything the leaf uses...
+            self._json_dict = None
+
+    @property
+    def _operations_dict(self):
+        return self._model.get('_operations_dict')
+
+    @property
+    def _models_dict(self):
+        return self._model.get('_models_dict')
 
     def get_all_models_dict(self):
         """Returns the model dictionary created from the model input file.
@@ -1132,57 +1172,337 @@ class FMC(RestBase):
                           file_path=None,
                           bulk=False,
                           bulk_limit=1000,
-                          strip_nested_dicts=True
+                          strip_nested_dicts=True,
+                          max_concurrency=None,
+                          validate_function=None,
+                          progress_callback=None
                           ):
 
         """Reads a csv file containing flatlined records (flattened with output_transforms.flatten_json(json_dict) and
-        posts all records with a bulk post.  Target API must support bulk post for the given url.
+        posts all records, with bulk posts if bulk is True.  Target API must support bulk post for the given url.
+
+        The file is streamed (see RestBase.post_csv_template): records are read, expanded, validated and serialized
+        on a reader thread while the previous batch is posted.  With bulk, a batch holds enough records for
+        max_concurrency bulk posts of bulk_limit records, posted as in bulk_post.
 
-        Returns - No return value.
+        Returns - The import statistics: rows read, records invalid, posted and failed, batches, seconds, rows and
+        records per second and the failed rows with their errors.
 
         *Parameters*
 
         url: string, keyword, default=None
             The target url to post records.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.
         file_path: string, keyword, default=None
             The full path to the file containing the csv records.
+        bulk: boolean, keyword, default=False
+            If True, records are posted with bulk posts.
+        bulk_limit: integer, keyword, default=1000
+            The maximum number of records in one bulk post, and the batch size without bulk.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of requests in flight.  Defaults to the leaf's default_max_concurrency.
+        validate_function: function, keyword, default=None
+            Called with each expanded record, returns None if it is valid or an error string.  Invalid records are
+            not posted.
+        progress_callback: function, keyword, default=None
+            Called with the import statistics after each batch.
         """
 
+        if not bulk:
+            return RestBase.post_csv_template(self, url=url, file_path=file_path, responses_dict=responses_dict,
+                                              batch_size=bulk_limit, max_concurrency=max_concurrency,
+                                              validate_function=validate_function,
+                                              progress_callback=progress_callback)
+
         if responses_dict is None:
             responses_dict = self.responses_dict
 
-        post_list = output_transforms.csv_to_post_list(file_path)
-        if bulk:
-            self.bulk_post(url=url, post_list=post_list, responses_dict=responses_dict, bulk_limit=bulk_limit)
-        else:
-            for post_body in post_list:
-                self.post_json_request(url, post_body, responses_dict=responses_dict)
-        return responses_dict
+        if self.path_root not in url:
+            url = self.path_root + url
+        max_concurrency = int(sd(locals(), 'max_concurrency', self))
+
+        def post_batch(json_bodies):
+            return self._send_bulk_chunks('post', url, json_bodies, 201, 'created', responses_dict, bulk_limit,
+                                          max_concurrency, _BULK_MAX_BYTES, 15)
+
+        return self._stream_csv_post(url, file_path, post_batch, bulk_limit * max_concurrency, validate_function,
+                                     progress_callback)
 
     def bulk_post(self,
                   url=None,
                   post_list=None,
                   responses_dict=None,
                   bulk_limit=1000,
+                  max_concurrency=None,
+                  max_bulk_bytes=_BULK_MAX_BYTES,
+                  target_chunk_seconds=15
                   ):
 
+        """Posts post_list to url with concurrent bulk posts.  Target API must support bulk post for the given url.
+
+        Records are serialized once.  A chunk holds up to the current chunk size of records and max_bulk_bytes of
+        json.  The chunk size starts at bulk_limit, is halved when a chunk takes longer than target_chunk_seconds and
+        doubled, up to bulk_limit, when chunks take less than half of it.  Up to max_concurrency chunks are in
+        flight, limited by the adaptive concurrency window and paced by the leaf's rate limiter.
+
+        A chunk rejected by the FMC (a 4xx other than a 429, which is retried) is split in halves and each half posted
+        again until the rejected records are isolated, so one bad record only fails itself.  Chunks failing with any
+        other error are not split.
+
+        Returns - A list with a result dictionary for each record of post_list, in order.  Each result holds the
+        status ('created' or 'failed'), the status_code, the id of the created object and the error text.
+
+        *Parameters*
+
+        url: string, keyword, default=None
+            The target url to post records.
+        post_list: list, keyword, default=None
+            The records to post.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.  The
+            last bulk response is stored.
+        bulk_limit: integer, keyword, default=1000
+            The maximum number of records in one bulk post.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of bulk posts in flight.  Defaults to the leaf's default_max_concurrency.
+        max_bulk_bytes: integer, keyword, default=2048000
+            The maximum size of the json body of one bulk post.
+        target_chunk_seconds: number, keyword, default=15
+            The bulk post duration the chunk size is adjusted to.
         """
+
+        if responses_dict is None:
+            responses_dict = self.responses_dict
+
+        if self.path_root not in url:
+            url = self.path_root + url
+        encoded_records = [json.dumps(post_dict) for post_dict in post_list]
+        results = self._send_bulk_chunks('post', url, encoded_records, 201, 'created', responses_dict, bulk_limit,
+                                         sd(locals(), 'max_concurrency', self), max_bulk_bytes, target_chunk_seconds)
+        failed = len([result for result in results if result['status'] != 'created'])
+        if failed:
+            logger.warning('bulk_post: %s of %s records failed for url %s' % (failed, len(results), url))
+        logger.info('bulk_post: posted %s records to url %s' % (len(results) - failed, url))
+        return results
+
+    def bulk_put(self,
+                 url=None,
+                 put_list=None,
+                 responses_dict=None,
+                 max_concurrency=None,
+                 bulk_limit=1000,
+                 max_bulk_bytes=_BULK_MAX_BYTES,
+                 target_chunk_seconds=15
+                 ):
+
+        """Updates the objects in put_list.  When the API model documents a bulk PUT for url (e.g. the access rules
+        and prefilter rules of a policy) the objects are sent in bulk PUTs, chunked, split on rejection and run
+        concurrently as in bulk_post.  Otherwise each object is updated with its own PUT, see RestBase.bulk_put.
+
+        Returns - An OrderedDict of result dictionaries by object id, in put_list order.  Each result holds the
+        status ('updated' or 'failed'), the status_code and the error text.
+
+        *Parameters*
+
+        url: string, keyword, default=None
+            The url of the collection holding the objects, e.g. policy/accesspolicies/<id>/accessrules.
+        put_list: list, keyword, default=None
+            The object dictionaries to PUT.  Each must hold the id of the object it updates.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of requests in flight.  Defaults to the leaf's default_max_concurrency.
+        bulk_limit: integer, keyword, default=1000
+            The maximum number of objects in one bulk PUT.
+        max_bulk_bytes: integer, keyword, default=2048000
+            The maximum size of the json body of one bulk PUT.
+        target_chunk_seconds: number, keyword, default=15
+            The bulk PUT duration the chunk size is adjusted to.
         """
 
-        def post(post_body):
-            self.post_json_request(url, post_body, responses_dict=responses_dict)
+        if responses_dict is None:
+            responses_dict = self.responses_dict
+
+        if self.path_root not in url:
+            url = self.path_root + url
+        if not self._supports_bulk(url, 'put'):
+            return RestBase.bulk_put(self, url=url, put_list=put_list, responses_dict=responses_dict,
+                                     max_concurrency=max_concurrency)
+        for put_dict in put_list:
+            if not put_dict.get('id'):
+                raise ValueError('bulk_put: every record of put_list must have an id, found %s...' % put_dict)
+        encoded_records = [json.dumps(put_dict) for put_dict in put_list]
+        results = self._send_bulk_chunks('put', url, encoded_records, 200, 'updated', responses_dict, bulk_limit,
+                                         sd(locals(), 'max_concurrency', self), max_bulk_bytes, target_chunk_seconds)
+        return tree_helpers.get_bulk_results_by_id([str(put_dict['id']) for put_dict in put_list],
+                                                   [_strip_bulk_id(result) for result in results], 'bulk_put', url)
+
+    def bulk_delete(self,
+                    url=None,
+                    id_list=None,
+                    responses_dict=None,
+                    max_concurrency=None,
+                    bulk_limit=1000,
+                    target_chunk_seconds=15
+                    ):
+
+        """Deletes the objects in id_list.  When the API model documents a bulk DELETE for url (e.g. the access
+        rules and prefilter rules of a policy) the objects are deleted with bulk DELETEs selecting them with an
+        ids filter, chunked, split on rejection and run concurrently as in bulk_post.  Otherwise each object is
+        deleted with its own DELETE, see RestBase.bulk_delete.
+
+        Returns - An OrderedDict of result dictionaries by object id, in id_list order.  Each result holds the
+        status ('deleted' or 'failed'), the status_code and the error text.
+
+        *Parameters*
+
+        url: string, keyword, default=None
+            The url of the collection holding the objects, e.g. policy/accesspolicies/<id>/accessrules.
+        id_list: list, keyword, default=None
+            The ids of the objects to DELETE.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of requests in flight.  Defaults to the leaf's default_max_concurrency.
+        bulk_limit: integer, keyword, default=1000
+            The maximum number of objects in one bulk DELETE.  Chunks are also limited by the length of the ids
+            filter.
+        target_chunk_seconds: number, keyword, default=15
+            The bulk DELETE duration the chunk size is adjusted to.
+        """
 
         if responses_dict is None:
             responses_dict = self.responses_dict
 
-        url = url + '?bulk=true'
-        n = bulk_limit
-        post_lists = [post_list[i * n:(i + 1) * n] for i in range((len(post_list) + n - 1) // n)]
-        for post_body in post_lists:
-            post(post_body)
+        if self.path_root not in url:
+            url = self.path_root + url
+        if not self._supports_bulk(url, 'delete'):
+            return RestBase.bulk_delete(self, url=url, id_list=id_list, responses_dict=responses_dict,
+                                        max_concurrency=max_concurrency)
+        id_list = [str(object_id) for object_id in id_list]
+        results = self._send_bulk_chunks('delete', url, id_list, 200, 'deleted', responses_dict, bulk_limit,
+                                         sd(locals(), 'max_concurrency', self), _BULK_DELETE_MAX_FILTER_BYTES,
+                                         target_chunk_seconds)
+        for object_id, result in zip(id_list, results):
+            if result['status'] == 'deleted':
+                self.response_index.remove_url(url.rstrip('/') + '/' + object_id)
+        return tree_helpers.get_bulk_results_by_id(id_list, [_strip_bulk_id(result) for result in results],
+                                                   'bulk_delete', url)
+
+    def _supports_bulk(self, url, method):
+        """Returns True if the API model documents a bulk=true request of method for url.
 
-        logger.debug(pformat(responses_dict))
-        return responses_dict
+        *Parameters*
+
+        url: string
+            The collection url.
+        method: string
+            The request method.
+        """
+
+        if self._bulk_path_regexes is None:
+            self._bulk_path_regexes = fmc_helpers.get_bulk_path_regexes(self._operations_dict)
+        path = re.sub(r'\?.*$', '', url).replace(self.path_root, '').strip('/')
+        for path_regex in self._bulk_path_regexes.get(method.upper(), []):
+            if path_regex.match(path):
+                return True
+        return False
+
+    def _send_bulk_chunks(self, method, url, encoded_records, success_status_code, success_status, responses_dict,
+                          bulk_limit, max_concurrency, max_bulk_bytes, target_chunk_seconds):
+        """Sends encoded_records to url in concurrent bulk=true requests of method.  Used by bulk_post, bulk_put and
+        bulk_delete.
+
+        Records are json strings for POST and PUT, sent as the json list body, and ids for DELETE, sent as an ids
+        filter.  A chunk holds up to the current chunk size of records and max_bulk_bytes of body or filter.  The
+        chunk size starts at bulk_limit, is halved when a chunk takes longer than target_chunk_seconds and doubled,
+        up to bulk_limit, when chunks take less than half of it.  A chunk whose records are rejected by the FMC (400
+        or 422) is split in halves and each half sent again until the rejected records are isolated.  A chunk too
+        large for the FMC (413) is split in halves and the chunk size halved, without failing its records.  Any other
+        failure (e.g. 401, 403, 404 or 405) fails the whole chunk at once, every record would get the same answer.
+        Each chunk's response is stored in responses_dict under the request url with the chunk's record range
+        appended (&records=first-last).
+
+        Returns - A list with a result dictionary for each record, in order.  Each result holds the status
+        (success_status or 'failed'), the status_code, the id returned for the record and the error text.
+        """
+
+        bulk_url = url + '?bulk=true'
+        results = [None] * len(encoded_records)
+        bulk_limit = max(int(bulk_limit), 1)
+        sizing = {'chunk_size': bulk_limit}
+        sizing_lock = threading.Lock()
+
+        def get_chunks():
+            # Sized when each chunk is taken, after the results of the chunks before it...
+            start = 0
+            while start < len(encoded_records):
+                end = start
+                body_size = 2
+                limit = min(start + sizing['chunk_size'], len(encoded_records))
+                while end < limit and (end == start or body_size + len(encoded_records[end]) + 1 <= max_bulk_bytes):
+                    body_size += len(encoded_records[end]) + 1
+                    end += 1
+                yield list(range(start, end))
+                start = end
+
+        def send_chunk(indexes, split=False):
+            records = [encoded_records[index] for index in indexes]
+            if method == 'delete':
+                request_url = bulk_url + '&filter=ids:' + ','.join(records)
+                json_body = ''
+            else:
+                request_url = bulk_url
+                json_body = '[' + ','.join(records) + ']'
+            start_time = time.perf_counter()
+            # Each chunk gets its own responses dictionary, chunks in flight may share the request url...
+            response_dict = self._request_wrapper(recursed=False, url=request_url, json_body=json_body,
+                                                  responses_dict={}, headers=self.request_headers, method=method,
+                                                  credentials_dict=self.credentials_dict, verify=self.verify,
+                                                  success_status_code=success_status_code)[0]
+            seconds = time.perf_counter() - start_time
+            # Keyed per chunk, post and put chunks share the request url...
+            responses_dict['%s&records=%s-%s' % (request_url, indexes[0], indexes[-1])] = response_dict
+            status_code = response_dict['status_code']
+            if status_code == success_status_code:
+                items = []
+                if isinstance(response_dict['json_dict'], dict):
+                    items = response_dict['json_dict'].get('items') or []
+                for position, index in enumerate(indexes):
+                    item = items[position] if position < len(items) and isinstance(items[position], dict) else {}
+                    results[index] = {'status': success_status, 'status_code': status_code, 'id': item.get('id'),
+                                      'error': None}
+                if not split:
+                    with sizing_lock:
+                        if seconds > target_chunk_seconds:
+                            sizing['chunk_size'] = max(len(indexes) // 2, 1)
+                        elif seconds < target_chunk_seconds / 2 and len(indexes) >= sizing['chunk_size']:
+                            sizing['chunk_size'] = min(sizing['chunk_size'] * 2, bulk_limit)
+            elif status_code == _BULK_TOO_LARGE_STATUS_CODE and len(indexes) > 1:
+                logger.debug('Bulk %s: chunk of %s records too large, splitting...' % (method, len(indexes)))
+                half = len(indexes) // 2
+                with sizing_lock:
+                    sizing['chunk_size'] = max(min(sizing['chunk_size'], half), 1)
+                send_chunk(indexes[:half], split=True)
+                send_chunk(indexes[half:], split=True)
+            elif status_code in _BULK_RECORD_REJECTED_STATUS_CODES and len(indexes) > 1:
+                logger.debug('Bulk %s: chunk of %s records rejected, splitting...' % (method, len(indexes)))
+                half = len(indexes) // 2
+                send_chunk(indexes[:half], split=True)
+                send_chunk(indexes[half:], split=True)
+            else:
+                for index in indexes:
+                    results[index] = {'status': 'failed', 'status_code': status_code, 'id': None,
+                                      'error': response_dict['error']}
+
+        max_concurrency = int(max_concurrency)
+        if max_concurrency > 1:
+            self._map_concurrent(send_chunk, get_chunks(), max_concurrency)
+        else:
+            for indexes in get_chunks():
+                send_chunk(indexes)
+        return results
 
     # def post_csv_template_bulk(self, url=None, file_path=None):
     #
@@ -1243,7 +1563,7 @@ class FMC(RestBase):
                 url_path += path_part
                 continue
             elif path_part.startswith('$'):
-                objectpath_results = tree_helpers.get_objectpath_values(path_part, response_dict)
+                objectpath_results = self._get_smart_path_values(path_part, response_dict)
                 if objectpath_results:
                     prev_urls = response_dict.keys()
                     response_dict = {}
@@ -1266,12 +1586,13 @@ class FMC(RestBase):
                     prev_urls.append(url_path)
                 response_dict = {}
                 urls_processed = []
+                next_path_part = path_parts[0] if path_parts else None
                 for prev_url in prev_urls:
                     prev_url = re.sub(r'\?.+$', '', prev_url)
                     if prev_url in urls_processed:
                         continue
                     urls_processed.append(prev_url)
-                    self._collect_responses(prev_url, response_dict, responses_dict)
+                    self._collect_smart_listing(prev_url, next_path_part, response_dict, responses_dict)
         return response_dict
 
     def smart_get_object_id(self, url, responses_dict=None):
@@ -1308,7 +1629,7 @@ class FMC(RestBase):
                 url_path += path_part
                 continue
             elif path_part.startswith('$'):
-                objectpath_results = tree_helpers.get_objectpath_values(path_part, response_dict)
+                objectpath_results = self._get_smart_path_values(path_part, response_dict)
                 if objectpath_results:
                     if len(objectpath_results) == 1:
                         return objectpath_results[0]
@@ -1325,14 +1646,84 @@ class FMC(RestBase):
                     prev_urls.append(url_path)
                 response_dict = {}
                 urls_processed = []
+                next_path_part = path_parts[0] if path_parts else None
                 for prev_url in prev_urls:
                     prev_url = re.sub(r'\?.+$', '', prev_url)
                     if prev_url in urls_processed:
                         continue
                     urls_processed.append(prev_url)
-                    self._collect_responses(prev_url, response_dict, responses_dict)
+                    self._collect_smart_listing(prev_url, next_path_part, response_dict, responses_dict,
+                                                use_response_cache=True)
         return None  # No id found
 
+    def _get_smart_path_values(self, path_part, response_dict):
+        """Returns the values selected by the smart path part path_part from the json_dict of each response in
+        response_dict, so $.items[...] queries apply to every listing page.  This should only be called by internal
+        methods.
+
+        """
+
+        values = []
+        for response in response_dict.values():
+            if response.get('json_dict'):
+                values.extend(tree_helpers.get_objectpath_values(path_part, response['json_dict']) or [])
+        return values
+
+    def _collect_smart_listing(self, url, next_path_part, response_dict, responses_dict, use_response_cache=False):
+        """Collects the responses for url for the smart methods.  This should only be called by internal methods.
+
+        When next_path_part selects items of the collection at url by name or value, the collection is listed with
+        the query planned by fmc_helpers.get_smart_listing_query, so the FMC returns only the candidate items.  If
+        the FMC rejects the filter, the collection is listed again without it and filtered client side, as are
+        later listings of collections with the same path template.
+
+        Returns - response_dict updated with the responses.
+
+        *Parameters*
+
+        url: string
+            The url of the path to GET, without a query.
+        next_path_part: string
+            The smart path part following url, None if url is the last part.
+        response_dict: dictionary
+            A dictionary reference updated by this method to include all responses.
+        responses_dict: dictionary
+            The dictionary all responses are stored in.
+        use_response_cache: boolean, keyword, default=False
+            If set to True, pages found in the leaf's response cache are not requested again.
+        """
+
+        query = OrderedDict()
+        path_template = request_metrics.get_path_template(url)
+        if self.smart_filter_pushdown and next_path_part and next_path_part.startswith('$'):
+            pushdown_paths = list(self.smart_filter_pushdown_paths or []) + fmc_helpers.SMART_FILTER_PUSHDOWN_PATHS
+            query = fmc_helpers.get_smart_listing_query(url.replace(self.path_root, ''), next_path_part,
+                                                        pushdown_paths=pushdown_paths)
+            if path_template in self._unsupported_filter_paths:
+                query.pop('filter', None)
+        if not query:
+            return self._collect_responses(url, response_dict, responses_dict, use_response_cache=use_response_cache)
+
+        def get_query_url(query):
+            if not query:
+                return url
+            return url + '?' + '&'.join(['%s=%s' % (name, urllib.parse.quote(value, safe=':'))
+                                         for name, value in query.items()])
+
+        logger.debug('smart listing of %s with query %s' % (url, query))
+        listing_dict = OrderedDict()
+        self._collect_responses(get_query_url(query), listing_dict, responses_dict,
+                                use_response_cache=use_response_cache)
+        if 'filter' in query and any([listing['status_code'] != 200 for listing in listing_dict.values()]):
+            logger.warning('%s rejected filter %s, filtering client side...' % (url, query['filter']))
+            self._unsupported_filter_paths.add(path_template)
+            query.pop('filter')
+            listing_dict = OrderedDict()
+            self._collect_responses(get_query_url(query), listing_dict, responses_dict,
+                                    use_response_cache=use_response_cache)
+        response_dict.update(listing_dict)
+        return response_dict
+
     def _build_request_templates(self):
         """
         Under construction...
@@ -1359,10 +1750,10 @@ class FMC(RestBase):
         # Get a security token valid for 30 minutes.  Record the time to check for validity
         self._auth_token_time = time.time()
         response_dict, status, include_filtered, exclude_filtered, cache_hit = \
-            tree_helpers.process_json_request(url=self._auth_url, responses_dict=self.responses_dict,
-                                              method='post', headers=self._auth_headers, stop_on_error=True,
-                                              credentials_dict=self.credentials_dict, success_status_code=204,
-                                              verify=self.verify)
+            self._process_json_request(url=self._auth_url, responses_dict=self.responses_dict,
+                                       method='post', headers=self._auth_headers, stop_on_error=True,
+                                       credentials_dict=self.credentials_dict, success_status_code=204,
+                                       verify=self.verify)
 
         auth_headers = response_dict['headers']
         self._auth_token = auth_headers.get('X-auth-access-token', default=None)
@@ -1502,10 +1893,150 @@ class FMC(RestBase):
         
         pass
     
-    def _refresh_API_gets(self):
+    def _get_object_version(self, json_dict):
+        """Returns the (metadata timestamp, lastUser name) of an FMC object, or None if the object does not expose a
+        timestamp.  This should only be called by internal methods.
+
         """
-        Under construction...
+
+        metadata = json_dict.get('metadata')
+        if type(metadata) is not dict or 'timestamp' not in metadata:
+            return None
+        last_user = metadata.get('lastUser')
+        if type(last_user) is dict:
+            last_user = last_user.get('name')
+        return metadata['timestamp'], last_user
+
+    def _get_collection_versions(self, collection_url, get_item_limit=None):
+        """Lists collection_url with expanded=true.  The expanded pages are discarded.  This should only be called
+        by internal methods.
+
+        Returns - A dictionary of object id to _get_object_version, or None if the listing failed.
+
         """
-        # Walk the existing responses and refreshes the data (accounts for oob changes, etc.)
 
-        pass
+        versions = {}
+        url = collection_url + '?expanded=true'
+        while url is not None:
+            response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url = \
+                self._request_wrapper(recursed=False, url=url, responses_dict={},
+                                      headers=self.request_headers,
+                                      method='get', credentials_dict=self.credentials_dict,
+                                      verify=self.verify, success_status_code=200,
+                                      use_cache=False, stop_on_error=False,
+                                      API_path_keywords_list=self._API_path_keywords_list,
+                                      get_item_limit=sd(locals(), 'get_item_limit', self))
+            if not status:
+                return None
+            for item in self._get_page_items(response_dict):
+                if type(item) is dict and 'id' in item:
+                    versions[str(item['id'])] = self._get_object_version(item)
+            url = next_url
+        return versions
+
+    def _refresh_API_gets(self, responses_dict=None, include_filter_regex=None, exclude_filter_regex=None,
+                          stop_on_error=False, get_item_limit=None, max_concurrency=None):
+        """Incrementally refreshes the responses of a previous walk.  This should only be called by internal
+        methods, see refresh_API_resource_gets.
+
+        Each collection listed in the previous walk is listed again with expanded=true and its objects are compared
+        by id and metadata timestamp/lastUser.  Collections with added, changed or deleted objects have their list
+        pages and changed objects re-walked; unchanged objects are served from the cache.  Objects without a
+        timestamp are treated as changed.  Deleted objects and everything below them are removed.
+
+        """
+
+        if responses_dict is None:
+            responses_dict = self.responses_dict
+
+        # Group the previous walk by collection url...
+        collections = OrderedDict()
+        for url in list(responses_dict.keys()):
+            json_dict = responses_dict[url].get('json_dict')
+            if type(json_dict) is not dict and type(json_dict) is not OrderedDict:
+                continue
+            if 'id' in json_dict and url.endswith('/' + str(json_dict['id'])):
+                collection_url = url[:-len(str(json_dict['id'])) - 1]
+                collection = collections.setdefault(collection_url, {'pages': [], 'objects': {}})
+                collection['objects'][str(json_dict['id'])] = (url, self._get_object_version(json_dict))
+            elif 'items' in json_dict or 'paging' in json_dict:
+                collection = collections.setdefault(re.sub(r'\?.*$', '', url), {'pages': [], 'objects': {}})
+                collection['pages'].append(url)
+
+        collection_urls = []
+        for collection_url, collection in collections.items():
+            if not collection['pages']:
+                continue
+            if exclude_filter_regex and re.search(exclude_filter_regex, collection_url):
+                continue
+            if include_filter_regex and not re.search(include_filter_regex, collection_url):
+                continue
+            collection_urls.append(collection_url)
+
+        logger.info('Listing %s collections for changes...' % len(collection_urls))
+        max_concurrency = int(sd(locals(), 'max_concurrency', self))
+        get_item_limit = sd(locals(), 'get_item_limit', self)
+        list_collection = lambda collection_url: self._get_collection_versions(collection_url,
+                                                                             get_item_limit=get_item_limit)
+        if max_concurrency > 1:
+            current_versions = self._map_concurrent(list_collection, collection_urls, max_concurrency)
+        else:
+            current_versions = [list_collection(collection_url) for collection_url in collection_urls]
+
+        refresh_summary = {'collections': len(collection_urls), 'added': [], 'changed': [], 'deleted': [],
+                           'failed': []}
+        refresh_collections = {}
+        for collection_url, versions in zip(collection_urls, current_versions):
+            if versions is None:
+                refresh_summary['failed'].append(collection_url)
+                continue
+            objects = collections[collection_url]['objects']
+            added = [collection_url + '/' + id for id in versions if id not in objects]
+            deleted = [objects[id][0] for id in objects if id not in versions]
+            changed = [objects[id][0] for id in versions
+                       if id in objects and (versions[id] is None or versions[id] != objects[id][1])]
+            refresh_summary['added'].extend(added)
+            refresh_summary['deleted'].extend(deleted)
+            refresh_summary['changed'].extend(changed)
+            if added or deleted or changed:
+                refresh_collections[collection_url] = changed
+
+        # Drop deleted objects and their descendants, including collections below them...
+        deleted_urls = set(refresh_summary['deleted'])
+        deleted_prefixes = tuple([url + '/' for url in deleted_urls])
+        removed_urls = [url for url in responses_dict.keys()
+                        if url in deleted_urls or (deleted_prefixes and url.startswith(deleted_prefixes))]
+        for url in removed_urls:
+            responses_dict.pop(url, None)
+        for url in deleted_urls:
+            self.response_index.remove_url(url)
+        if removed_urls and self.persist_responses:
+            tree_helpers.remove_persisted_responses(self.leaf_dir, removed_urls)
+
+        refresh_urls = []
+        for collection_url, changed in refresh_collections.items():
+            if deleted_prefixes and collection_url.startswith(deleted_prefixes):
+                continue
+            for url in collections[collection_url]['pages'] + changed:
+                responses_dict.pop(url, None)
+            self._invalidate_response_cache(collection_url)
+            refresh_urls.append(collection_url)
+
+        logger.info('Refresh found %s added, %s changed and %s deleted objects, re-walking %s collections...' %
+                    (len(refresh_summary['added']), len(refresh_summary['changed']), len(refresh_summary['deleted']),
+                     len(refresh_urls)))
+        if max_concurrency > 1:
+            self._walk_API_child_gets_concurrent(refresh_urls, include_filter_regex=include_filter_regex,
+                                                 exclude_filter_regex=exclude_filter_regex,
+                                                 use_cache=True, stop_on_error=stop_on_error,
+                                                 responses_dict=responses_dict, get_item_limit=get_item_limit,
+                                                 max_concurrency=max_concurrency)
+        else:
+            for url in refresh_urls:
+                self._recurse_API_child_gets(url, include_filter_regex=include_filter_regex,
+                                             exclude_filter_regex=exclude_filter_regex,
+                                             use_cache=True, stop_on_error=stop_on_error,
+                                             responses_dict=responses_dict, get_item_limit=get_item_limit)
+        refresh_summary['refreshed_collections'] = refresh_urls
+
+        return refresh_summary
@@ -43,6 +43,18 @@ import csv
 # Create a logger for cmaple.fmc.fmc_helpers...
 logger = logging.getLogger(re.sub('\.[^.]+$','',__name__))
 
+# Collections known to accept a filter query, as (path regex, {item field: FMC filter key}).  The regexes match the
+# collection path below the domain...
+SMART_FILTER_PUSHDOWN_PATHS = [(r'^object/[^/]+$', {'name': 'nameOrValue', 'value': 'nameOrValue'}),
+                               (r'^policy/accesspolicies$', {'name': 'name'})]
+# Item fields present in collection listings without expanded=true...
+_SUMMARY_FIELDS = ('id', 'name', 'type', 'links')
+# A smart path predicate selecting ids by one field, e.g. $.items[@.name is 'access_1'].id...
+_SMART_PREDICATE_REGEX = re.compile(r'''^\$\.\.?items\[\s*@\.(\w+)\s+(?:is|==)\s+(['"])((?:(?!\2).)*)\2\s*\]\.id$''')
+# The types get_child_type_dicts descends...
+_CHILD_DICT_TYPES = (dict, OrderedDict)
+_CHILD_CONTAINER_TYPES = (dict, OrderedDict, list)
+
 
 @logged(logger)
 @traced(logger)
@@ -178,111 +190,108 @@ def build_response_pivot(responses_dict, csvfile):
     return csvfile
 
 
+def _iter_descendant_values(node, key):
+    # Pre-order walk yielding node[key] for every dictionary below node holding key, the order jsonpath $..key
+    # returns them in...
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if key in node:
+                yield node[key]
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _get_operations_model_ID(operation_list):
+    # The type of the first example response of the operations, else the model of the last operation...
+    for operation in operation_list:
+        if operation is None:
+            continue
+        for example in operation['examples'] or []:
+            if not 'override' in example['url'] and 'responseData' in example and 'type' in example['responseData']:
+                return example['responseData']['type']
+    return operation_list[-1]['type']['modelId']
+
+
 @logged(logger)
 @traced(logger)
 def get_all_reference_dicts(FMC_instance):
+    """Builds the reference dictionaries of the json API model in FMC_instance._json_dict with one pass over each
+    resource of the model.
 
-    def add_paths_to_dict(path_parts, paths_dict, API_path_keywords_list):
-        if path_parts:
-            path_part = path_parts.pop(0)
-            if not path_part in paths_dict:
-                paths_dict[path_part] = {}
-                if not path_part in API_path_keywords_list and not path_part.startswith('{'):
-                    API_path_keywords_list.append(path_part)
-            paths_dict = OrderedDict(sorted(paths_dict.items()))
-            add_paths_to_dict(path_parts,paths_dict[path_part],API_path_keywords_list)
-        else:
-            return
+    Returns - A tuple of the resources path dictionary, the operations dictionary (operations by path and method),
+    the model path dictionary (path by model id), the paths hierarchy, the API path keywords list, the sorted list
+    of all API paths, the path model dictionary (model id by path) and the models dictionary (properties by model
+    id).
+
+    *Parameters*
+
+    FMC_instance: FMC
+        The leaf holding the json model in _json_dict.
+    """
 
-    paths_dict = {}
     resource_path_dict = {}
     operations_dict = {}
     model_path_dict = {}
     path_model_dict = {}
     models_dict = {}
+    for resource_key, resource_dicts in FMC_instance._json_dict['features'].items():
+        for resource_dict in resource_dicts:
+            resource_path_dict[resource_key] = ''
+            models_found = []
+            operations_found = []
+            stack = [resource_dict]
+            # One pre-order walk collects the values of every models and operations key...
+            while stack:
+                node = stack.pop()
+                if isinstance(node, dict):
+                    if 'models' in node:
+                        models_found.append(node['models'])
+                    if 'operations' in node:
+                        operations_found.append(node['operations'])
+                    stack.extend(reversed(list(node.values())))
+                elif isinstance(node, list):
+                    stack.extend(reversed(node))
+            for models in models_found:
+                if not isinstance(models, dict):
+                    continue
+                for model in models.values():
+                    if isinstance(model, dict) and 'id' in model and not model['id'] in models_dict:
+                        models_dict[model['id']] = model['properties']
+            for operation_list in operations_found:
+                for operation in operation_list:
+                    if not operation is None:
+                        path = re.sub('^/', '', operation['path'])
+                        method = operation['method'] if 'method' in operation else \
+                            next(_iter_descendant_values(operation, 'method'))
+                        if not path in operations_dict:
+                            operations_dict[path] = {'methods': {}, 'operation_path': operation['path']}
+                        operations_dict[path]['methods'][method] = operation
+                model_ID = _get_operations_model_ID(operation_list)
+                path = re.sub('^/', '', operation_list[-1]['path'])
+                model_path_dict[model_ID] = path
+                path_model_dict[path] = model_ID
+
+    paths_dict = {}
     API_path_keywords_list = []
-    all_API_paths_list = []
-    # Get the base paths
-    resource_tuple_list = tree_helpers.get_jsonpath_full_paths_and_values('$.features.*.[*]',FMC_instance._json_dict)
-    for i in range(0,len(resource_tuple_list)):
-        resource_dict_path = resource_tuple_list[i][0]
-        resource_key = re.sub(r'features.|\[[0-9]+\]|\.','',resource_tuple_list[i][0])
-        resource_dict = resource_tuple_list[i][1]
-        base_path = resource_dict['basePath']
-        API_version = resource_dict['apiVersion']
-        # resource_root = FMC_instance._url_host + '/api' + base_path + '/' + API_version + '/domain/' + FMC_instance.FMC_domain_ID + '/'
-        resource_path_dict[resource_key] = ''
-        models_list = tree_helpers.get_jsonpath_full_paths_and_values('$..models.*.id',resource_dict)
-        for model in models_list:
-            if not model is None:
-                model_path = model[0]
-                model_ID = model[1]
-                if not model_ID in models_dict:
-                    properties_path = model_path
-                    properties_path_list = properties_path.split('.')
-                    properties_path_list.pop()
-                    properties_path_list.append('properties')
-                    properties_path = '.'.join(properties_path_list)
-                    models_dict[model_ID] = tree_helpers.get_jsonpath_values(properties_path,resource_dict)[0]
-                    model_properties_type_list = \
-                        tree_helpers.get_jsonpath_full_paths_and_values('$..type', models_dict[model_ID])
-                    model_response_type_path = '{}.{}{}'.format(resource_dict_path,
-                                                              re.sub(r'models.+', 'operations.', model_path),
-                                                              '.responseData..type')
-                    logger.debug('model =', resource_dict_path, model_path, properties_path,
-                                 model_response_type_path, model_ID)
-                    model_response_type_list = \
-                        tree_helpers.get_jsonpath_full_paths_and_values(model_response_type_path,
-                                                                        FMC_instance._json_dict)
-                    if model_ID != 'AccessRule':
-                        continue
-                    for model_type in model_properties_type_list:
-                        if model_type[1] == 'object' and not re.findall(r'metadata|links|objects|items', model_type[0]):
-                            model_type_path_parts = model_type[0].split('.')
-                            model_type_name = model_type_path_parts[-2]
-                            logger.debug('type_name =', model_type_name)
-                            for response_type in model_response_type_list:
-                                if '{}{}{}'.format('.',model_type_name,'.') in response_type[0]:
-                                    logger.debug(response_type[0])
-        operations_list = tree_helpers.get_jsonpath_values('$..operations',resource_dict)
-        for operation_list in operations_list:
-            model_ID = None
-            for operation in operation_list:
-                if not operation is None:
-                    path = re.sub('^/','',operation['path'])
-                    method = tree_helpers.get_jsonpath_values('$..method',operation)[0]
-                    if model_ID is None:
-                        print(path, method, file=sys.stderr)
-                        if operation['examples'] is not None:
-                            for example in operation['examples']:
-                                if not 'override' in example['url']:
-                                    if 'responseData' in example:
-                                        if 'type' in example['responseData']:
-                                            model_ID = example['responseData']['type']
-                                            break
-                    if not path in operations_dict:
-                        operations_dict[path] = {'methods': {}, 'operation_path': operation['path']}
-                    operations_dict[path]['methods'][method] = operation
-            if not model_ID:
-                model_ID = operation_list[-1]['type']['modelId']
-            # model_path_dict[model_ID] = path
-            path = operation_list[-1]['path']
-            path = re.sub('^/', '', path)
-            model_path_dict[model_ID] = path
-            path_model_dict[path] = model_ID
-    for path in operations_dict.keys():
-        operation_path = operations_dict[path]['operation_path']
-        all_API_paths_list.append(path)
-        path_parts = operation_path.split('/')
+    API_path_keywords = set()
+    for path, path_operations in operations_dict.items():
+        path_parts = path_operations['operation_path'].split('/')
         path_parts.pop(0) # Get rid of the first '/'
-        resource_path = path_parts[0]
-        if resource_path in resource_path_dict:
-            base_path = resource_path_dict[resource_path]
-        else:
+        if not path_parts[0] in resource_path_dict:
             continue
-        add_paths_to_dict(path_parts,paths_dict,API_path_keywords_list)
+        paths_level = paths_dict
+        for path_part in path_parts:
+            if not path_part in paths_level:
+                paths_level[path_part] = {}
+                if not path_part in API_path_keywords and not path_part.startswith('{'):
+                    API_path_keywords.add(path_part)
+                    API_path_keywords_list.append(path_part)
+            paths_level = paths_level[path_part]
 
-    all_API_paths_list.sort()
+    all_API_paths_list = sorted(operations_dict.keys())
     return OrderedDict(sorted(resource_path_dict.items())), OrderedDict(sorted(operations_dict.items())), \
            OrderedDict(sorted(model_path_dict.items())), OrderedDict(sorted(paths_dict.items())), \
            API_path_keywords_list, all_API_paths_list, path_model_dict, models_dict
@@ -325,3 +334,128 @@ def get_domain_dict(headers):
     for domain_dict in domain_list:
         domains_dict[domain_dict['name']] = domain_dict['uuid']
     return domains_dict
+
+
+@logged(logger)
+@traced(logger)
+def parse_smart_predicate(path_part):
+    """Returns the (field, value) tuple of a smart path part selecting items by one field, e.g. ('name', 'rule_1')
+    for $.items[@.name is 'rule_1'].id, or None for any other path part.
+
+    """
+
+    match = _SMART_PREDICATE_REGEX.match(path_part)
+    if match is None:
+        return None
+    return match.group(1), match.group(3)
+
+
+@logged(logger)
+@traced(logger)
+def get_smart_listing_query(collection_path, path_part, pushdown_paths=None):
+    """Returns the query parameters to list collection_path with when its items will be selected by path_part.
+
+    A predicate on a field a pushdown_paths entry maps to an FMC filter key becomes filter=<key>:<value>.  The
+    server side filter only narrows the listing, path_part is still evaluated on the items returned.  A predicate on
+    a field missing from plain listings adds expanded=true so the field can be filtered client side.
+
+    Returns - An OrderedDict of query parameters, empty if path_part is not a simple predicate.
+
+    *Parameters*
+
+    collection_path: string
+        The collection path below the domain, e.g. policy/accesspolicies.
+    path_part: string
+        The smart path part following the collection.
+    pushdown_paths: list, keyword, default=None
+        (path regex, {item field: FMC filter key}) tuples.  Defaults to SMART_FILTER_PUSHDOWN_PATHS.
+    """
+
+    query = OrderedDict()
+    predicate = parse_smart_predicate(path_part)
+    if predicate is None:
+        return query
+    field, value = predicate
+    if pushdown_paths is None:
+        pushdown_paths = SMART_FILTER_PUSHDOWN_PATHS
+    for path_regex, filter_keys in pushdown_paths:
+        if re.search(path_regex, collection_path):
+            # ; separates FMC filter terms, values containing it can only be filtered client side...
+            if field in filter_keys and ';' not in value:
+                query['filter'] = '%s:%s' % (filter_keys[field], value)
+            break
+    if field not in _SUMMARY_FIELDS:
+        query['expanded'] = 'true'
+    return query
+
+
+@logged(logger)
+@traced(logger)
+def get_child_type_dicts(json_dict):
+    """Returns the references to other objects in a response, the dictionaries below json_dict holding a type or a
+    refType, in document order.
+
+    Returns - A list of dictionaries {'key': the key holding the reference, 'parent_key': the '~' separated keys and
+    types leading to it, 'dict': the reference}.  A list member is keyed by the key of its list.
+
+    *Parameters*
+
+    json_dict: dictionary
+        The json_dict of a response.
+    """
+
+    type_list = []
+    # Entries are (value, key, parent_key), value being a dictionary or list found under key in a dictionary whose
+    # parent key is parent_key.  The key is None for json_dict and the members of a top level list...
+    stack = [(json_dict, None, '')] if type(json_dict) in _CHILD_CONTAINER_TYPES else []
+    pop = stack.pop
+    append = type_list.append
+    while stack:
+        value, key, parent_key = pop()
+        if type(value) is list:
+            if key == 'type' and not parent_key == '':
+                children = [(member, key, parent_key + '~' + member) for member in value]
+                children = [child for child in children if type(child[0]) in _CHILD_CONTAINER_TYPES]
+            else:
+                children = [(member, key, parent_key) for member in value if type(member) in _CHILD_CONTAINER_TYPES]
+        else:
+            if key is not None and ('type' in value or 'refType' in value):
+                append({'key': key, 'parent_key': parent_key, 'dict': value})
+            items = [(child_key, child) for child_key, child in value.items() if type(child) in _CHILD_CONTAINER_TYPES]
+            # Most references hold no dictionaries or lists, their parent key is only built when needed...
+            if not items:
+                continue
+            if key is not None:
+                parent_key = (parent_key + '~' if not parent_key == '' else '') + key
+            if 'type' in value and not parent_key == '':
+                parent_key += '~' + value['type']
+            children = [(child, child_key, parent_key) for child_key, child in items]
+        children.reverse()
+        stack.extend(children)
+    return type_list
+
+
+@logged(logger)
+@traced(logger)
+def get_bulk_path_regexes(operations_dict):
+    """Returns the compiled path regexes of the operations the API model documents with a bulk query parameter.
+
+    Returns - A dictionary of lists of regexes by upper case method, e.g. {'PUT': [...], 'DELETE': [...]}.  A regex
+    matches a request path below the domain, e.g. policy/accesspolicies/<id>/accessrules.
+
+    *Parameters*
+
+    operations_dict: dictionary
+        The operations dictionary returned by get_all_reference_dicts.
+    """
+
+    bulk_path_regexes = {}
+    for path, path_operations in operations_dict.items():
+        for method, operation in path_operations['methods'].items():
+            parameters = operation.get('parameters') or []
+            if not [parameter for parameter in parameters if isinstance(parameter, dict) and
+                    parameter.get('name') == 'bulk' and parameter.get('paramType') == 'query']:
+                continue
+            path_regex = '/'.join(['[^/]+' if part.startswith('{') else re.escape(part) for part in path.split('/')])
+            bulk_path_regexes.setdefault(method.upper(), []).append(re.compile('^%s$' % path_regex))
+    return bulk_path_regexes
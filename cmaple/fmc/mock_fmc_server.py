@@ -0,0 +1,584 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+mock_fmc_server.py implements a local HTTP stand-in for an FMC, serving a
+snapshot of a real FMC.  The snapshot is either a leaf directory holding
+persisted responses (see response_store.py) or a cassette recorded with
+the RestBase 'record' transport (see transport.py).
+
+The stand-in rebuilds the collections and objects of the snapshot and
+serves them with FMC style offset/limit paging, expanded=true listings,
+name and nameOrValue listing filters, token authentication and POST,
+PUT and DELETE (including bulk=true, with an ids filter for DELETE).  It
+can return 429s above a requests per minute limit and add a fixed and a
+random latency to every response, so walks, bulk operations and
+migrations can be benchmarked without an FMC:
+
+    python -m cmaple.fmc.mock_fmc_server <leaf_dir or cassette> [-port 8443] [-requests_per_minute 120]
+        [-latency 0.05] [-latency_jitter 0.02]
+
+Point an FMC leaf at it with FMC_host='127.0.0.1', FMC_port=<port> and
+FMC_scheme='http' (or start it with -certfile/-keyfile for https).
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import re
+import sys
+import ssl
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+import urllib.parse
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cmaple.tree_helpers as tree_helpers
+import cmaple.transport as transport
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+# Define global variables...
+_DEFAULT_DOMAIN_UUID = 'e276abec-e0f2-11e3-8169-6d9ed49b625f'
+_DEFAULT_LIMIT = 25
+_MAX_LIMIT = 1000
+# Links of objects created on the stand-in are stored under this origin and rewritten when served...
+_MOCK_ORIGIN = 'http://mock-fmc.invalid'
+_AUTH_PATH_REGEX = re.compile(r'/api/fmc_platform/[^/]+/auth/(generatetoken|refreshtoken)$')
+_DOMAIN_REGEX = re.compile(r'/domain/([^/]+)')
+_SUMMARY_KEYS = ('links', 'id', 'type', 'name')
+
+
+def _error_body(description):
+    return {'error': {'category': 'FRAMEWORK', 'messages': [{'description': description}], 'severity': 'ERROR'}}
+
+
+# Not traced, add_response is called for every response of the snapshot...
+@logged(logger)
+class FMCSnapshot(object):
+    """The collections and objects served by the stand-in.
+
+    Collections are ordered dictionaries of items by id, built from the page responses of the snapshot.  Objects
+    are the json dictionaries of the object responses by path.
+    """
+
+    def __init__(self):
+
+        """__init__ creates an empty snapshot.
+
+        """
+
+        self.collections = OrderedDict()
+        self.objects = {}
+        self._collection_names = {}
+        self.raw_responses = {}
+        self.domains = OrderedDict()
+        self.origins = set([_MOCK_ORIGIN])
+        self.auth_headers = None
+        self.lock = threading.RLock()
+
+    @classmethod
+    def load(cls, snapshot_path):
+        """Returns the snapshot read from a cassette file or a leaf directory of persisted responses.
+
+        """
+
+        snapshot = cls()
+        if os.path.isdir(snapshot_path):
+            responses_dict = OrderedDict()
+            tree_helpers.restore_responses(snapshot_path, responses_dict)
+            for url, response_dict in responses_dict.items():
+                if response_dict.get('status_code') == 200 and response_dict.get('json_dict'):
+                    snapshot.add_response(url, response_dict['json_dict'])
+        else:
+            for interaction in transport.read_cassette(snapshot_path):
+                snapshot.add_interaction(interaction)
+        logger.info('Loaded %s collections and %s objects from %s' % (len(snapshot.collections),
+                                                                      len(snapshot.objects), snapshot_path))
+        return snapshot
+
+    def add_interaction(self, interaction):
+        """Adds a recorded interaction.  GETs are added with add_response and also kept for exact replay of paths
+        which are neither collections nor objects.
+
+        """
+
+        if _AUTH_PATH_REGEX.search(urllib.parse.urlsplit(interaction['url']).path):
+            if interaction['status_code'] == 204:
+                self.auth_headers = interaction['headers']
+            return
+        if interaction['method'] != 'get' or interaction['status_code'] != 200:
+            return
+        self.raw_responses[transport.get_interaction_key('get', interaction['url'])] = interaction['body']
+        try:
+            json_dict = json.loads(interaction['body'])
+        except ValueError:
+            return
+        self.add_response(interaction['url'], json_dict)
+
+    def add_response(self, url, json_dict):
+        """Adds the json_dict returned for url.
+
+        """
+
+        parts = urllib.parse.urlsplit(url)
+        self.origins.add('%s://%s' % (parts.scheme, parts.netloc))
+        path = parts.path.rstrip('/')
+        domain_match = _DOMAIN_REGEX.search(path)
+        if domain_match and domain_match.group(1) not in self.domains:
+            self.domains[domain_match.group(1)] = 'Global' if not self.domains else 'Global/Domain%s' % \
+                                                                                   len(self.domains)
+        if not isinstance(json_dict, dict):
+            return
+        if 'items' in json_dict or 'paging' in json_dict:
+            self._collection_names.pop(path, None)
+            collection = self.collections.setdefault(path, OrderedDict())
+            for item in json_dict.get('items', []):
+                item_id = item.get('id') if isinstance(item, dict) else None
+                if item_id and (item_id not in collection or len(item) > len(collection[item_id])):
+                    collection[item_id] = item
+        else:
+            self.objects[path] = json_dict
+            parent_path, last_part = path.rsplit('/', 1)
+            if json_dict.get('id') == last_part:
+                self._collection_names.pop(parent_path, None)
+                collection = self.collections.setdefault(parent_path, OrderedDict())
+                if last_part not in collection:
+                    collection[last_part] = {key: json_dict[key] for key in _SUMMARY_KEYS if key in json_dict}
+
+    def get_collection_names(self, path):
+        """Returns the set of (type, name) tuples of the items in the collection at path.  The set is cached, callers
+        adding or removing items update it or call forget_collection_names.
+
+        """
+
+        names = self._collection_names.get(path)
+        if names is None:
+            names = self._collection_names[path] = set([(item.get('type'), item.get('name'))
+                                                        for item in self.collections.get(path, {}).values()])
+        return names
+
+    def forget_collection_names(self, path):
+        self._collection_names.pop(path, None)
+
+    def get_domains_header(self):
+        """Returns the DOMAINS header value of a token response.
+
+        """
+
+        domains = self.domains or OrderedDict([(_DEFAULT_DOMAIN_UUID, 'Global')])
+        return json.dumps([{'name': name, 'uuid': domain_uuid} for domain_uuid, name in domains.items()])
+
+
+@logged(logger)
+class MockFMCServer(object):
+    """Serves an FMCSnapshot over HTTP from a background thread.
+
+    """
+
+    def __init__(self, snapshot, host='127.0.0.1', port=0, requests_per_minute=None, latency=0.0,
+                 latency_jitter=0.0, retry_after=True, certfile=None, keyfile=None):
+
+        """__init__ binds the server socket.
+
+        *Parameters*
+
+        snapshot: FMCSnapshot
+            The snapshot to serve.  Writes change the snapshot.
+        host: string, keyword, default='127.0.0.1'
+            The address to listen on.
+        port: integer, keyword, default=0
+            The port to listen on.  0 picks a free port, see base_url.
+        requests_per_minute: number, keyword, default=None
+            Requests above this rate over the last 60 seconds are answered with a 429.  None disables the limit.
+        latency: number, keyword, default=0.0
+            Seconds added to every response.
+        latency_jitter: number, keyword, default=0.0
+            Up to this many random seconds are added to every response.
+        retry_after: boolean, keyword, default=True
+            If True, 429 responses carry a Retry-After header with the seconds until a request is allowed.
+        certfile: string, keyword, default=None
+            A PEM certificate.  If set, the server speaks https.
+        keyfile: string, keyword, default=None
+            The PEM private key for certfile.
+        """
+
+        self.snapshot = snapshot
+        self.requests_per_minute = requests_per_minute
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.retry_after = retry_after
+        self.stats = {'requests': 0, 'throttled': 0, 'created': 0, 'updated': 0, 'deleted': 0, 'not_found': 0}
+        self._request_times = deque()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        handler_class = type('MockFMCRequestHandler', (_MockFMCRequestHandler,), {'mock_server': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler_class)
+        self.httpd.daemon_threads = True
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+            self.scheme = 'https'
+        self.host, self.port = self.httpd.server_address[:2]
+        self.base_url = '%s://%s:%s' % (self.scheme, self.host, self.port)
+
+    def start(self):
+        """Starts serving from a daemon thread.
+
+        Returns - The base url of the server.
+        """
+
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info('Mock FMC serving at %s' % self.base_url)
+        return self.base_url
+
+    def stop(self):
+        """Stops the server.
+
+        """
+
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count_request(self):
+        """Counts a request and returns None, or the Retry-After seconds if the request exceeds
+        requests_per_minute.
+
+        """
+
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            if self.requests_per_minute is None:
+                return None
+            now = time.monotonic()
+            while self._request_times and self._request_times[0] <= now - 60:
+                self._request_times.popleft()
+            if len(self._request_times) >= self.requests_per_minute:
+                self.stats['throttled'] += 1
+                return max(int(math.ceil(self._request_times[0] + 60 - now)), 1)
+            self._request_times.append(now)
+            return None
+
+    def count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def get_stats(self):
+        """Returns a copy of the request counters.
+
+        """
+
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def to_text(self, json_value):
+        """Returns json_value as json text with the snapshot origins replaced by base_url.
+
+        """
+
+        text = json.dumps(json_value)
+        for origin in self.snapshot.origins:
+            if origin in text:
+                text = text.replace(origin, self.base_url)
+        return text
+
+
+class _MockFMCRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, avoid the delayed ACK stall on keep-alive connections...
+    disable_nagle_algorithm = True
+    mock_server = None
+
+    def log_message(self, format, *args):
+        logger.debug('%s %s' % (self.address_string(), format % args))
+
+    def _send(self, status_code, body=None, headers=None):
+        text = self.mock_server.to_text(body) if body is not None and not isinstance(body, str) else (body or '')
+        data = text.encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _handle(self, method):
+        server = self.mock_server
+        body = self._read_body() if method in ('post', 'put') else None
+        latency = server.latency + (random.uniform(0, server.latency_jitter) if server.latency_jitter else 0.0)
+        if latency:
+            time.sleep(latency)
+        retry_after = server.count_request()
+        if retry_after is not None:
+            headers = {'Retry-After': str(retry_after)} if server.retry_after else None
+            self._send(429, _error_body('Too many requests'), headers)
+            return
+        parts = urllib.parse.urlsplit(self.path)
+        path = parts.path.rstrip('/')
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        with server.snapshot.lock:
+            if _AUTH_PATH_REGEX.search(path):
+                self._send(204, headers=self._get_auth_headers())
+            elif method == 'get':
+                self._get(path, parts.query, query)
+            elif method == 'post':
+                self._post(path, query, body)
+            elif method == 'put':
+                self._put(path, query, body)
+            else:
+                self._delete(path, query)
+
+    def _get_auth_headers(self):
+        snapshot = self.mock_server.snapshot
+        headers = {'X-auth-access-token': str(uuid.uuid4()), 'X-auth-refresh-token': str(uuid.uuid4())}
+        domains_header = snapshot.get_domains_header()
+        if snapshot.auth_headers and 'DOMAINS' in snapshot.auth_headers:
+            domains_header = snapshot.auth_headers['DOMAINS']
+        headers['DOMAINS'] = domains_header
+        headers['DOMAIN_UUID'] = json.loads(domains_header)[0]['uuid']
+        return headers
+
+    def _get(self, path, query_string, query):
+        snapshot = self.mock_server.snapshot
+        if path in snapshot.objects:
+            self._send(200, snapshot.objects[path])
+        elif path in snapshot.collections:
+            self._send(200, self._get_page(path, query_string, query))
+        else:
+            raw_key = transport.get_interaction_key('get', self.path)
+            if raw_key in snapshot.raw_responses:
+                self._send(200, self.mock_server.to_text(json.loads(snapshot.raw_responses[raw_key])))
+            else:
+                self.mock_server.count('not_found')
+                self._send(404, _error_body('The requested resource %s was not found.' % path))
+
+    def _get_page(self, path, query_string, query):
+        snapshot = self.mock_server.snapshot
+        items = list(snapshot.collections[path].values())
+        if query.get('filter'):
+            items = self._filter_items(path, items, query['filter'])
+        offset = int(query.get('offset', 0))
+        limit = min(int(query.get('limit', _DEFAULT_LIMIT)), _MAX_LIMIT)
+        expanded = query.get('expanded') == 'true'
+        self_url = _MOCK_ORIGIN + path + ('?' + query_string if query_string else '')
+        if not items:
+            return {'links': {'self': self_url}, 'paging': {'offset': 0, 'limit': 0, 'count': 0, 'pages': 0}}
+        page_items = []
+        for item in items[offset:offset + limit]:
+            item_path = '%s/%s' % (path, item['id'])
+            if expanded:
+                page_item = snapshot.objects.get(item_path, item)
+            else:
+                page_item = {key: item[key] for key in _SUMMARY_KEYS if key in item}
+            if 'links' not in page_item:
+                page_item = dict(page_item, links={'self': _MOCK_ORIGIN + item_path})
+            page_items.append(page_item)
+        paging = {'offset': offset, 'limit': limit, 'count': len(items), 'pages': int(math.ceil(len(items) / limit))}
+        if offset + limit < len(items):
+            next_query = dict(query, offset=str(offset + limit), limit=str(limit))
+            paging['next'] = [_MOCK_ORIGIN + path + '?' + urllib.parse.urlencode(next_query)]
+        return {'links': {'self': self_url}, 'items': page_items, 'paging': paging}
+
+    def _filter_items(self, path, items, filter_value):
+        # name:<name> matches names exactly, nameOrValue:<text> matches names and values containing text, other
+        # filter terms are ignored...
+        snapshot = self.mock_server.snapshot
+        for term in filter_value.strip('"').split(';'):
+            key, _, value = term.partition(':')
+            if key == 'name':
+                items = [item for item in items if item.get('name') == value]
+            elif key == 'nameOrValue':
+                value = value.lower()
+                filtered_items = []
+                for item in items:
+                    json_dict = snapshot.objects.get('%s/%s' % (path, item['id']), item)
+                    if value in str(item.get('name', '')).lower() or value in str(json_dict.get('value', '')).lower():
+                        filtered_items.append(item)
+                items = filtered_items
+        return items
+
+    def _create(self, path, json_dict):
+        snapshot = self.mock_server.snapshot
+        collection = snapshot.collections.setdefault(path, OrderedDict())
+        names = snapshot.get_collection_names(path)
+        name = json_dict.get('name')
+        if name is not None and (json_dict.get('type'), name) in names:
+            return None, 'The object name %s already exists. Enter a new name.' % name
+        item_id = str(uuid.uuid4())
+        item_path = '%s/%s' % (path, item_id)
+        new_object = dict(json_dict, id=item_id, links={'self': _MOCK_ORIGIN + item_path})
+        domain_match = _DOMAIN_REGEX.search(path)
+        new_object['metadata'] = {'timestamp': int(time.time() * 1000), 'lastUser': {'name': 'mock'}}
+        if domain_match:
+            new_object['metadata']['domain'] = {'id': domain_match.group(1),
+                                                'name': snapshot.domains.get(domain_match.group(1), 'Global')}
+        snapshot.objects[item_path] = new_object
+        collection[item_id] = {key: new_object[key] for key in _SUMMARY_KEYS if key in new_object}
+        names.add((new_object.get('type'), name))
+        self.mock_server.count('created')
+        return new_object, None
+
+    def _post(self, path, query, body):
+        if query.get('bulk') == 'true' and isinstance(body, list):
+            # Bulk posts are all or nothing, validate every record first...
+            names = set(self.mock_server.snapshot.get_collection_names(path))
+            for json_dict in body:
+                if not isinstance(json_dict, dict):
+                    self._send(400, _error_body('Invalid request body.'))
+                    return
+                name_key = (json_dict.get('type'), json_dict.get('name'))
+                if json_dict.get('name') is not None and name_key in names:
+                    self._send(400, _error_body('The object name %s already exists. Enter a new name.' %
+                                                json_dict['name']))
+                    return
+                names.add(name_key)
+            created = [self._create(path, json_dict)[0] for json_dict in body]
+            self._send(201, {'items': created})
+            return
+        if not isinstance(body, dict):
+            self._send(400, _error_body('Invalid request body.'))
+            return
+        new_object, error = self._create(path, body)
+        if error:
+            self._send(400, _error_body(error))
+        else:
+            self._send(201, new_object)
+
+    def _update(self, path, json_dict):
+        snapshot = self.mock_server.snapshot
+        parent_path, item_id = path.rsplit('/', 1)
+        updated = dict(json_dict, id=snapshot.objects[path].get('id', item_id),
+                       links=snapshot.objects[path].get('links', {'self': _MOCK_ORIGIN + path}))
+        updated['metadata'] = dict(snapshot.objects[path].get('metadata', {}), timestamp=int(time.time() * 1000))
+        snapshot.objects[path] = updated
+        collection = snapshot.collections.get(parent_path)
+        if collection is not None and item_id in collection:
+            collection[item_id] = {key: updated[key] for key in _SUMMARY_KEYS if key in updated}
+            snapshot.forget_collection_names(parent_path)
+        self.mock_server.count('updated')
+        return updated
+
+    def _remove(self, path):
+        snapshot = self.mock_server.snapshot
+        deleted = snapshot.objects.pop(path)
+        parent_path, item_id = path.rsplit('/', 1)
+        snapshot.collections.get(parent_path, {}).pop(item_id, None)
+        snapshot.forget_collection_names(parent_path)
+        self.mock_server.count('deleted')
+        return deleted
+
+    def _send_not_found(self, path):
+        self.mock_server.count('not_found')
+        self._send(404, _error_body('The requested resource %s was not found.' % path))
+
+    def _put(self, path, query, body):
+        snapshot = self.mock_server.snapshot
+        if query.get('bulk') == 'true' and isinstance(body, list):
+            # Bulk puts are all or nothing, every record must name an existing object...
+            for json_dict in body:
+                if not isinstance(json_dict, dict) or '%s/%s' % (path, json_dict.get('id')) not in snapshot.objects:
+                    self._send_not_found('%s/%s' % (path, json_dict.get('id') if isinstance(json_dict, dict) else ''))
+                    return
+            self._send(200, {'items': [self._update('%s/%s' % (path, json_dict['id']), json_dict)
+                                       for json_dict in body]})
+            return
+        if path not in snapshot.objects or not isinstance(body, dict):
+            self._send_not_found(path)
+            return
+        self._send(200, self._update(path, body))
+
+    def _delete(self, path, query):
+        snapshot = self.mock_server.snapshot
+        filter_value = query.get('filter', '').strip('"')
+        if query.get('bulk') == 'true' and filter_value.startswith('ids:'):
+            # Bulk deletes are all or nothing...
+            item_paths = ['%s/%s' % (path, item_id) for item_id in filter_value[len('ids:'):].split(',') if item_id]
+            for item_path in item_paths:
+                if item_path not in snapshot.objects:
+                    self._send_not_found(item_path)
+                    return
+            self._send(200, {'items': [self._remove(item_path) for item_path in item_paths]})
+            return
+        if path not in snapshot.objects:
+            self._send_not_found(path)
+            return
+        self._send(200, self._remove(path))
+
+    def do_GET(self):
+        self._handle('get')
+
+    def do_POST(self):
+        self._handle('post')
+
+    def do_PUT(self):
+        self._handle('put')
+
+    def do_DELETE(self):
+        self._handle('delete')
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Serves a persisted or recorded FMC snapshot over HTTP.')
+    arg_parser.add_argument('snapshot', help='a leaf directory of persisted responses or a cassette file')
+    arg_parser.add_argument('-host', default='127.0.0.1', help='the address to listen on')
+    arg_parser.add_argument('-port', type=int, default=8443, help='the port to listen on')
+    arg_parser.add_argument('-requests_per_minute', type=float, default=None,
+                            help='answer requests above this rate with a 429')
+    arg_parser.add_argument('-latency', type=float, default=0.0, help='seconds added to every response')
+    arg_parser.add_argument('-latency_jitter', type=float, default=0.0,
+                            help='up to this many random seconds added to every response')
+    arg_parser.add_argument('-no_retry_after', action='store_true', help='omit the Retry-After header from 429s')
+    arg_parser.add_argument('-certfile', default=None, help='PEM certificate, enables https')
+    arg_parser.add_argument('-keyfile', default=None, help='PEM private key for certfile')
+    args = arg_parser.parse_args()
+
+    mock_server = MockFMCServer(FMCSnapshot.load(args.snapshot), host=args.host, port=args.port,
+                                requests_per_minute=args.requests_per_minute, latency=args.latency,
+                                latency_jitter=args.latency_jitter, retry_after=not args.no_retry_after,
+                                certfile=args.certfile, keyfile=args.keyfile)
+    print('Serving %s at %s, press Ctrl-C to stop...' % (args.snapshot, mock_server.base_url), file=sys.stderr)
+    try:
+        mock_server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock_server.httpd.server_close()
+        print(json.dumps(mock_server.get_stats()), file=sys.stderr)
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+model_cache.py implements the compiled FMC API model cache.  Compiling
+the reference dictionaries from an api-docs-fmcwithll.json model is
+slow, so the result is written once to a compiled model file keyed by
+the sha256 of the model file content and the compiled format version.
+
+The compiled file holds only the reference dictionaries the FMC leaf
+uses, each pickled in its own section.  It is memory mapped and each
+section is decoded on first use, so a cold load reads no more than the
+header and dictionaries which are rarely used (the model properties,
+the operations) cost nothing until needed.  Decoding unpickles a section
+into dictionaries private to the process: only the raw mapped bytes are
+shared by processes reading the same compiled model, not the decoded
+dictionaries.  Leafs of one process using the same model share one
+loaded CompiledModel.
+
+Layout: the 8 byte magic, a 4 byte little endian header length, the
+json header ({'version', 'sha256', 'sections': {name: [offset,
+length]}}) and the section data, offsets counted from its start.
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import re
+import json
+import mmap
+import struct
+import hashlib
+import pickle
+import tempfile
+import threading
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+# Define global variables...
+# Bump when the compiled sections change, compiled files of other versions are rebuilt...
+MODEL_CACHE_VERSION = 1
+_MAGIC = b'CMAPLEM\x00'
+_HEADER_LENGTH = struct.Struct('<I')
+# The reference dictionaries held by a compiled model...
+MODEL_SECTIONS = ('_resources_path_dict', '_operations_dict', '_models_path_dict', '_paths_hierarchy',
+                  '_API_path_keywords_list', '_all_API_paths_list', '_path_models_dict', '_models_dict')
+# The per user directory of compiled models, under $XDG_CACHE_HOME (or ~/.cache)...
+_CACHE_DIR_NAME = os.path.join('cmaple', 'models')
+# Loaded models by (sha256, version), shared by the leafs of this process...
+_loaded_models = {}
+_loaded_models_lock = threading.Lock()
+
+
+@logged(logger)
+@traced(logger)
+def get_file_sha256(file_path):
+    """Returns the hex sha256 of the content of file_path.
+
+    """
+
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as model_file:
+        for block in iter(lambda: model_file.read(1048576), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+@logged(logger)
+@traced(logger)
+def get_default_cache_dir():
+    """Returns the per user directory of compiled models, $XDG_CACHE_HOME/cmaple/models or
+    ~/.cache/cmaple/models, so compiled models are never written into the installed package.
+
+    """
+
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, _CACHE_DIR_NAME)
+
+
+@logged(logger)
+@traced(logger)
+def get_compiled_model_path(model_file_path, sha256, cache_dir=None):
+    """Returns the path of the compiled model of model_file_path: <model file name>.<sha256 prefix>.v<version>.cmodel
+    in cache_dir, or in the per user cache directory (see get_default_cache_dir).
+
+    """
+
+    if cache_dir is None:
+        cache_dir = get_default_cache_dir()
+    return os.path.join(cache_dir, '%s.%s.v%s.cmodel' % (os.path.basename(model_file_path), sha256[:16],
+                                                         MODEL_CACHE_VERSION))
+
+
+@logged(logger)
+@traced(logger)
+def compact_operations_dict(operations_dict):
+    """Returns operations_dict with each operation reduced to the names and types of its parameters, which is all
+    the FMC leaf reads from it (see fmc_helpers.get_bulk_path_regexes).
+
+    """
+
+    compact_dict = type(operations_dict)()
+    for path, path_operations in operations_dict.items():
+        methods = {}
+        for method, operation in path_operations['methods'].items():
+            parameters = [{'name': parameter.get('name'), 'paramType': parameter.get('paramType')}
+                          for parameter in operation.get('parameters') or [] if isinstance(parameter, dict)]
+            methods[method] = {'parameters': parameters}
+        compact_dict[path] = {'methods': methods, 'operation_path': path_operations['operation_path']}
+    return compact_dict
+
+
+@logged(logger)
+@traced(logger)
+def write_compiled_model(compiled_model_path, sha256, sections):
+    """Writes sections, a dictionary of reference dictionaries by name, to compiled_model_path.  The file is
+    written to a temporary file and renamed, so concurrent readers never see a partial file.
+
+    """
+
+    header = {'version': MODEL_CACHE_VERSION, 'sha256': sha256, 'sections': {}}
+    blobs = []
+    offset = 0
+    for name in MODEL_SECTIONS:
+        blob = pickle.dumps(sections[name], protocol=pickle.HIGHEST_PROTOCOL)
+        header['sections'][name] = [offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+    header_bytes = json.dumps(header).encode('utf-8')
+    file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(compiled_model_path) or '.',
+                                                  suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as compiled_file:
+            compiled_file.write(_MAGIC)
+            compiled_file.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            compiled_file.write(header_bytes)
+            for blob in blobs:
+                compiled_file.write(blob)
+        # mkstemp creates the file private, other users' processes read the compiled model too...
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, compiled_model_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+# Not traced, get is called for every reference dictionary access of a leaf...
+@logged(logger)
+class CompiledModel(object):
+    """The reference dictionaries of a compiled model, decoded on first use from a memory mapped compiled file or
+    held in memory when the file could not be written.  The dictionaries are shared, callers must not modify them.
+
+    """
+
+    def __init__(self, compiled_model_path=None, sha256=None, sections=None):
+
+        """__init__ maps compiled_model_path, or holds sections if no path is given.
+
+        Raises ValueError if the file is not a compiled model of this version for sha256.
+
+        *Parameters*
+
+        compiled_model_path: string, keyword, default=None
+            The compiled model file.
+        sha256: string, keyword, default=None
+            The sha256 of the model file the compiled model must have been built from.
+        sections: dictionary, keyword, default=None
+            The reference dictionaries by name, for a model which is not backed by a file.
+        """
+
+        self.compiled_model_path = compiled_model_path
+        self.sha256 = sha256
+        self._decoded = dict(sections or {})
+        self._sections = {}
+        self._mmap = None
+        self._lock = threading.Lock()
+        if compiled_model_path is None:
+            return
+        with open(compiled_model_path, 'rb') as compiled_file:
+            self._mmap = mmap.mmap(compiled_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mmap[:len(_MAGIC)] != _MAGIC:
+                raise ValueError('%s is not a compiled model...' % compiled_model_path)
+            header_start = len(_MAGIC) + _HEADER_LENGTH.size
+            header_length = _HEADER_LENGTH.unpack(self._mmap[len(_MAGIC):header_start])[0]
+            header = json.loads(self._mmap[header_start:header_start + header_length].decode('utf-8'))
+            if header['version'] != MODEL_CACHE_VERSION or header['sha256'] != sha256 or \
+                    set(header['sections']) != set(MODEL_SECTIONS):
+                raise ValueError('%s is stale, version %s for model %s...' % (compiled_model_path, header['version'],
+                                                                            header['sha256']))
+            data_start = header_start + header_length
+            for name, (offset, length) in header['sections'].items():
+                if data_start + offset + length > len(self._mmap):
+                    raise ValueError('%s is truncated...' % compiled_model_path)
+                self._sections[name] = (data_start + offset, length)
+        except (ValueError, KeyError, struct.error):
+            self._mmap.close()
+            raise
+
+    def get(self, name):
+        """Returns the reference dictionary name, decoding it on first use.
+
+        """
+
+        value = self._decoded.get(name)
+        if value is not None:
+            return value
+        with self._lock:
+            if name not in self._decoded:
+                offset, length = self._sections[name]
+                # A private copy for this process, only the mapped bytes it is decoded from are shared...
+                self._decoded[name] = pickle.loads(memoryview(self._mmap)[offset:offset + length])
+            return self._decoded[name]
+
+    def get_stats(self):
+        """Returns the compiled model path, the model sha256 and the names of the decoded sections.
+
+        """
+
+        with self._lock:
+            return {'compiled_model_path': self.compiled_model_path, 'sha256': self.sha256,
+                    'decoded_sections': sorted(self._decoded)}
+
+
+@logged(logger)
+@traced(logger)
+def load_model(model_file_path, build_function, cache_dir=None):
+    """Returns the CompiledModel of model_file_path: the one already loaded by this process, the compiled model file
+    if it matches the model content and version, or a new compiled model built with build_function.
+
+    *Parameters*
+
+    model_file_path: string
+        The path to the json model file.
+    build_function: function
+        Called with no arguments when the model must be compiled, returns the reference dictionaries by name (see
+        MODEL_SECTIONS).
+    cache_dir: string, keyword, default=None
+        The directory of the compiled model files.  Defaults to the per user cache directory (see
+        get_default_cache_dir).
+    """
+
+    sha256 = get_file_sha256(model_file_path)
+    key = (sha256, MODEL_CACHE_VERSION)
+    with _loaded_models_lock:
+        model = _loaded_models.get(key)
+        if model is not None:
+            return model
+        compiled_model_path = get_compiled_model_path(model_file_path, sha256, cache_dir)
+        try:
+            model = CompiledModel(compiled_model_path, sha256)
+            logger.debug('Loaded compiled model %s...' % compiled_model_path)
+        except (OSError, ValueError) as err:
+            logger.info('Compiling model %s (%s)...' % (model_file_path, err))
+            sections = build_function()
+            sections['_operations_dict'] = compact_operations_dict(sections['_operations_dict'])
+            try:
+                os.makedirs(os.path.dirname(compiled_model_path), exist_ok=True)
+                write_compiled_model(compiled_model_path, sha256, sections)
+                model = CompiledModel(compiled_model_path, sha256)
+            except (OSError, ValueError) as err:
+                logger.warning('Unable to write compiled model %s, keeping it in memory: %s' %
+                               (compiled_model_path, err))
+                model = CompiledModel(sha256=sha256, sections=sections)
+        _loaded_models[key] = model
+    return model
@@ -345,14 +345,32 @@ def csv_to_post_json(file_path=None):
 @traced(logger)
 def csv_to_post_list(file_path=None):
 
-    csv_list = create_list_from_csv(file_path)
     post_body_list = []
-    flatlined_list = csv_to_flatlined(csv_list)
-    for flatlined in flatlined_list:
+    for row_number, flatlined in iter_csv_records(file_path):
         post_body_list.append(expand_flattened_json(flatlined))
     return post_body_list
 
 
+@logged(logger)
+@traced(logger)
+def iter_csv_records(file_path=None):
+    """Yields a (row number, flatlined record dictionary) tuple for each record of a csv file whose first line holds
+    the field names.  The file is read as it is iterated, blank lines are skipped.
+
+    """
+
+    with open(file_path, 'r', newline='') as csv_file:
+        csv_reader = csv.reader(csv_file, dialect='excel')
+        keys = None
+        for csv_record in csv_reader:
+            if not csv_record:
+                continue
+            if keys is None:
+                keys = [key.strip() for key in csv_record]
+                continue
+            yield csv_reader.line_num, dict(zip(keys, csv_record))
+
+
 @logged(logger)
 @traced(logger)
 def create_list_from_csv(file_path=None):
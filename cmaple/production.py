@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+production.py implements the production mode selected with
+CMapleTree(production_mode=True).  Production mode removes the
+autologging @traced wrappers from every loaded cmaple function and class,
+installs the autologging no-op @traced for cmaple modules imported later
+and rate limits the per request progress output.
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import sys
+import re
+import inspect
+import autologging
+import cmaple.tree_helpers as tree_helpers
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+
+def _is_traced(obj):
+    return callable(obj) and hasattr(obj, '_tracing_proxy') and hasattr(obj, '__wrapped__')
+
+
+def _untraced(function):
+    original = function.__wrapped__
+    if hasattr(function, '_log') and not hasattr(original, '_log'):
+        original._log = function._log
+    return original
+
+
+def _strip_class(class_):
+    stripped = 0
+    for name, attr in list(class_.__dict__.items()):
+        if _is_traced(attr):
+            setattr(class_, name, _untraced(attr))
+            stripped += 1
+        elif isinstance(attr, (classmethod, staticmethod)) and _is_traced(attr.__func__):
+            setattr(class_, name, type(attr)(_untraced(attr.__func__)))
+            stripped += 1
+    return stripped
+
+
+@logged(logger)
+def strip_tracing(package='cmaple'):
+    """Replaces the @traced wrappers of the functions and methods defined in the loaded package modules with the
+    original functions, also where they were imported into other modules (e.g. from cmaple.tree_helpers import *).
+    Modules imported afterwards get the autologging no-op @traced.
+
+    Returns - The number of wrappers removed.
+
+    *Parameters*
+
+    package: string, keyword, default='cmaple'
+        The package whose modules are stripped.
+    """
+
+    autologging.install_traced_noop()
+    stripped = 0
+    package_modules = [module for name, module in list(sys.modules.items())
+                       if module is not None and (name == package or name.startswith(package + '.'))]
+    for module in package_modules:
+        for name, attr in list(vars(module).items()):
+            if inspect.isclass(attr) and attr.__module__ == module.__name__:
+                stripped += _strip_class(attr)
+    # Rebind module level functions wherever they are referenced...
+    for module in list(sys.modules.values()):
+        if module is None:
+            continue
+        try:
+            module_vars = vars(module)
+        except TypeError:
+            continue
+        for name, attr in list(module_vars.items()):
+            if _is_traced(attr) and getattr(attr.__wrapped__, '__module__', '').startswith(package):
+                setattr(module, name, _untraced(attr))
+                stripped += 1
+    logger.info('Production mode removed %s tracing wrappers' % stripped)
+    return stripped
+
+
+@logged(logger)
+def enable_production_mode(progress_interval=10):
+    """Strips tracing (see strip_tracing) and limits progress output to one line every progress_interval seconds.
+
+    *Parameters*
+
+    progress_interval: number, keyword, default=10
+        The minimum number of seconds between progress lines.  None writes a line per url.
+    """
+
+    strip_tracing()
+    tree_helpers.set_progress_reporter(tree_helpers.ProgressReporter(interval=progress_interval))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+rate_limiter.py implements the token bucket used to pace REST requests
+so leafs stay under the target API's requests per minute limit.  Leafs
+talking to the same host with the same credentials share one bucket.
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import re
+import time
+import threading
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+# Buckets shared by all leafs in this process, keyed by (host, username)...
+_shared_buckets = {}
+_shared_buckets_lock = threading.Lock()
+
+
+# Not traced, acquire is called for every request...
+@logged(logger)
+class TokenBucket(object):
+    """Thread safe token bucket.
+
+    Tokens are added at requests_per_minute / 60 per second up to burst tokens.  Each request takes one token,
+    waiting for the next token when the bucket is empty.
+    """
+
+    def __init__(self, requests_per_minute=120, burst=1):
+
+        """__init__ creates a full bucket.
+
+        *Parameters*
+
+        requests_per_minute: number, keyword, default=120
+            The sustained request rate.
+        burst: integer, keyword, default=1
+            The number of requests which may be sent back to back when the bucket is full.
+        """
+
+        self.requests_per_minute = float(requests_per_minute)
+        self.rate = self.requests_per_minute / 60.0
+        self.burst = max(float(burst), 1.0)
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'acquired': 0, 'waits': 0, 'wait_seconds': 0.0, 'backoffs': 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens=1):
+        """Takes tokens from the bucket, sleeping until they are available.
+
+        Returns - The number of seconds waited.
+        """
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                delay = self._paused_until - now
+                if delay <= 0:
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        self.stats['acquired'] += 1
+                        if waited:
+                            self.stats['waits'] += 1
+                            self.stats['wait_seconds'] += waited
+                        return waited
+                    delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def backoff(self, seconds):
+        """Empties the bucket and holds every caller of acquire for seconds.  Used when the host reports a 429.
+
+        """
+
+        with self._lock:
+            self._tokens = 0.0
+            self._last_refill = time.monotonic()
+            self._paused_until = max(self._paused_until, self._last_refill + seconds)
+            self.stats['backoffs'] += 1
+
+    def get_stats(self):
+        """Returns a copy of the bucket counters.
+
+        """
+
+        with self._lock:
+            stats = dict(self.stats)
+        stats['requests_per_minute'] = self.requests_per_minute
+        stats['burst'] = self.burst
+        return stats
+
+
+@logged(logger)
+@traced(logger)
+def get_shared_token_bucket(host, username, requests_per_minute=120, burst=1):
+    """Returns the TokenBucket shared by all leafs for host and username, creating it if required.
+
+    The rate and burst of the first caller are used for the bucket.
+    """
+
+    key = (host, username)
+    with _shared_buckets_lock:
+        if key not in _shared_buckets:
+            logger.info('Creating token bucket for host %s with %s requests per minute and burst %s' %
+                        (host, requests_per_minute, burst))
+            _shared_buckets[key] = TokenBucket(requests_per_minute=requests_per_minute, burst=burst)
+        return _shared_buckets[key]
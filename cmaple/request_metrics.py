@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+request_metrics.py implements the per endpoint request metrics kept by
+each REST leaf.  Requests are grouped by method and path template (the
+url path with object ids replaced by {id}).  For each group the request
+count, status codes, bytes sent and received, a latency histogram,
+retries, 429 responses, cache hits, coalesced requests and time spent
+sleeping are recorded.
+The metrics can be written as JSON or in the Prometheus text exposition
+format (for the node exporter textfile collector).
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import re
+import json
+import time
+import bisect
+import threading
+import urllib.parse
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+# Define global variables...
+# Latency histogram bucket upper bounds in seconds, +Inf is implied...
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_ID_SEGMENT_REGEX = re.compile(r'^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|'
+                               r'[0-9a-fA-F]{24,}|\d+)$')
+_METRICS_JSON_FILE_NAME = 'metrics.json'
+_METRICS_PROM_FILE_NAME = 'metrics.prom'
+_PROM_PREFIX = 'cmaple_http_'
+
+
+def get_path_template(url):
+    """Returns the path of url with object id segments (uuids, long hex ids and numbers) replaced by {id}.
+
+    """
+
+    path = urllib.parse.urlsplit(url).path
+    return '/'.join(['{id}' if _ID_SEGMENT_REGEX.match(segment) else segment for segment in path.split('/')])
+
+
+def _new_endpoint():
+    return {'requests': 0, 'status_codes': {}, 'errors': 0, 'bytes_in': 0, 'bytes_out': 0, 'retries': 0,
+            'throttled': 0, 'cache_hits': 0, 'coalesced': 0, 'filtered': 0, 'sleep_seconds': 0.0, 'latency_seconds': 0.0,
+            'latency_max_seconds': 0.0, 'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+
+
+# Not traced, the record methods are called for every request...
+@logged(logger)
+class RequestMetrics(object):
+    """Thread safe per endpoint request metrics.
+
+    Endpoints are keyed by (method, path template).  Latency is the time spent waiting on the host, excluding rate
+    limiter waits, which are counted as sleep time.
+    """
+
+    def __init__(self, leaf_name=''):
+
+        """__init__ creates an empty set of metrics.
+
+        *Parameters*
+
+        leaf_name: string, keyword, default=''
+            The leaf name, used as the leaf label of the Prometheus metrics.
+        """
+
+        self.leaf_name = leaf_name
+        self._endpoints = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._start_time = time.time()
+
+    def _get_endpoint(self, method, url):
+        key = (method.upper(), get_path_template(url))
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = _new_endpoint()
+        return endpoint
+
+    def record_request(self, method, url, status_code=None, seconds=0.0, bytes_in=0, bytes_out=0):
+        """Records a request sent to the host.  A status_code of None records a request which raised an error.
+
+        """
+
+        with self._lock:
+            endpoint = self._get_endpoint(method, url)
+            endpoint['requests'] += 1
+            if status_code is None:
+                endpoint['errors'] += 1
+            else:
+                status = str(status_code)
+                endpoint['status_codes'][status] = endpoint['status_codes'].get(status, 0) + 1
+                if status_code == 429:
+                    endpoint['throttled'] += 1
+            endpoint['bytes_in'] += bytes_in
+            endpoint['bytes_out'] += bytes_out
+            endpoint['latency_seconds'] += seconds
+            endpoint['latency_max_seconds'] = max(endpoint['latency_max_seconds'], seconds)
+            endpoint['latency_buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def record_cache_hit(self, method, url):
+        """Records a request answered from a cache.
+
+        """
+
+        with self._lock:
+            self._get_endpoint(method, url)['cache_hits'] += 1
+
+    def record_coalesced(self, method, url):
+        """Records a request answered with the response of an identical request already in flight.
+
+        """
+
+        with self._lock:
+            self._get_endpoint(method, url)['coalesced'] += 1
+
+    def record_filtered(self, method, url):
+        """Records a request skipped by the include or exclude filter regexes.
+
+        """
+
+        with self._lock:
+            self._get_endpoint(method, url)['filtered'] += 1
+
+    def record_retry(self, method, url):
+        """Records a request which will be sent again.
+
+        """
+
+        with self._lock:
+            self._get_endpoint(method, url)['retries'] += 1
+
+    def record_sleep(self, method, url, seconds):
+        """Records time spent waiting before a request could be sent.
+
+        """
+
+        if seconds:
+            with self._lock:
+                self._get_endpoint(method, url)['sleep_seconds'] += seconds
+
+    def set_gauge(self, name, value):
+        """Sets a leaf wide gauge (e.g. a concurrency window) reported with the metrics.
+
+        """
+
+        with self._lock:
+            self._gauges[name] = value
+
+    def get_metrics(self):
+        """Returns a copy of the metrics.
+
+        Returns - A dictionary with the totals, the gauges and a list of endpoint dictionaries.  The latency buckets
+        are cumulative counts keyed by upper bound, as in Prometheus.
+        """
+
+        with self._lock:
+            endpoints = [(key, dict(endpoint, status_codes=dict(endpoint['status_codes']),
+                                    latency_buckets=list(endpoint['latency_buckets'])))
+                         for key, endpoint in sorted(self._endpoints.items())]
+            gauges = dict(self._gauges)
+        totals = _new_endpoint()
+        del totals['latency_buckets']
+        endpoint_list = []
+        for (method, path_template), endpoint in endpoints:
+            cumulative = 0
+            buckets = {}
+            for upper_bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], endpoint['latency_buckets']):
+                cumulative += count
+                buckets[str(upper_bound)] = cumulative
+            endpoint['latency_buckets'] = buckets
+            sent = endpoint['requests']
+            endpoint['latency_mean_seconds'] = endpoint['latency_seconds'] / sent if sent else 0.0
+            for key in totals:
+                if key == 'status_codes':
+                    for status, count in endpoint['status_codes'].items():
+                        totals['status_codes'][status] = totals['status_codes'].get(status, 0) + count
+                elif key == 'latency_max_seconds':
+                    totals[key] = max(totals[key], endpoint[key])
+                else:
+                    totals[key] += endpoint[key]
+            endpoint_list.append(dict(endpoint, method=method, path_template=path_template))
+        return {'leaf': self.leaf_name, 'start_time': self._start_time, 'end_time': time.time(), 'totals': totals,
+                'gauges': gauges, 'endpoints': endpoint_list}
+
+    def to_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format.
+
+        """
+
+        metrics = self.get_metrics()
+        leaf_label = metrics['leaf']
+        lines = []
+
+        def add_family(name, metric_type, help_text, samples):
+            lines.append('# HELP %s%s %s' % (_PROM_PREFIX, name, help_text))
+            lines.append('# TYPE %s%s %s' % (_PROM_PREFIX, name, metric_type))
+            for labels, value in samples:
+                label_text = ','.join(['%s="%s"' % (label, _escape_label(label_value))
+                                       for label, label_value in labels])
+                lines.append('%s%s{%s} %s' % (_PROM_PREFIX, name, label_text, _format_value(value)))
+
+        endpoints = metrics['endpoints']
+
+        def labels(endpoint, *extra):
+            return (('leaf', leaf_label), ('method', endpoint['method']),
+                    ('path', endpoint['path_template'])) + extra
+
+        add_family('requests_total', 'counter', 'Requests sent to the host.',
+                   [(labels(e), e['requests']) for e in endpoints])
+        add_family('responses_total', 'counter', 'Responses by status code.',
+                   [(labels(e, ('code', status)), count) for e in endpoints
+                    for status, count in sorted(e['status_codes'].items())])
+        for name, key, help_text in (('request_errors_total', 'errors', 'Requests which raised an error.'),
+                                     ('retries_total', 'retries', 'Requests sent again.'),
+                                     ('throttled_total', 'throttled', 'Responses with status code 429.'),
+                                     ('cache_hits_total', 'cache_hits', 'Requests answered from a cache.'),
+                                     ('coalesced_total', 'coalesced',
+                                      'Requests answered by an identical request in flight.'),
+                                     ('filtered_total', 'filtered', 'Requests skipped by the url filters.'),
+                                     ('received_bytes_total', 'bytes_in', 'Response body bytes received.'),
+                                     ('sent_bytes_total', 'bytes_out', 'Request body bytes sent.'),
+                                     ('sleep_seconds_total', 'sleep_seconds',
+                                      'Seconds spent waiting on rate limits and backoffs.')):
+            add_family(name, 'counter', help_text, [(labels(e), e[key]) for e in endpoints])
+        lines.append('# HELP %srequest_duration_seconds Request latency.' % _PROM_PREFIX)
+        lines.append('# TYPE %srequest_duration_seconds histogram' % _PROM_PREFIX)
+        for e in endpoints:
+            label_text = ','.join(['%s="%s"' % (label, _escape_label(value)) for label, value in labels(e)])
+            for upper_bound, count in e['latency_buckets'].items():
+                lines.append('%srequest_duration_seconds_bucket{%s,le="%s"} %s' % (_PROM_PREFIX, label_text,
+                                                                                   upper_bound, count))
+            lines.append('%srequest_duration_seconds_sum{%s} %s' % (_PROM_PREFIX, label_text,
+                                                                    _format_value(e['latency_seconds'])))
+            lines.append('%srequest_duration_seconds_count{%s} %s' % (_PROM_PREFIX, label_text, e['requests']))
+        for name, value in sorted(metrics['gauges'].items()):
+            gauge_name = re.sub(r'[^a-zA-Z0-9_]', '_', name)
+            add_family(gauge_name, 'gauge', name, [((('leaf', leaf_label),), value)])
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, leaf_dir):
+        """Writes metrics.json and metrics.prom to leaf_dir.  Each file is written to a temporary file first and
+        renamed, so a collector never reads a partial file.
+
+        Returns - The list of files written.
+        """
+
+        files_written = []
+        for file_name, content in ((_METRICS_JSON_FILE_NAME, json.dumps(self.get_metrics(), indent=2)),
+                                   (_METRICS_PROM_FILE_NAME, self.to_prometheus())):
+            file_path = os.path.join(leaf_dir, file_name)
+            with open(file_path + '.tmp', 'w') as f:
+                f.write(content)
+            os.replace(file_path + '.tmp', file_path)
+            files_written.append(file_path)
+        return files_written
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
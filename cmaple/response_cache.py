@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+response_cache.py implements the TTL + LRU cache of GET responses kept by
+each REST leaf in front of the transport.  Entries are keyed by canonical
+url (see tree_helpers.canonicalize_url), expire after a per path TTL and
+are evicted least recently used first once the entry or byte cap is
+reached.
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import re
+import time
+import threading
+import _pickle
+from collections import OrderedDict
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+
+# Not traced, get and put are called for every request...
+@logged(logger)
+class ResponseCache(object):
+    """Thread safe TTL + LRU cache of response dictionaries keyed by canonical url.
+
+    Responses are stored pickled and each get returns a new copy, so callers annotating their response (child urls,
+    migration state) never change the cached entry or another caller's copy.  The size of an entry is the size of its
+    pickled response.  A TTL of None never expires, a TTL of 0 disables
+    caching for the matching paths.
+    """
+
+    def __init__(self, default_ttl=300, path_ttls=None, max_entries=10000, max_bytes=64 * 1024 * 1024):
+
+        """__init__ creates an empty cache.
+
+        *Parameters*
+
+        default_ttl: number, keyword, default=300
+            The number of seconds an entry is served for when no path_ttls regex matches its url.
+        path_ttls: dictionary, keyword, default=None
+            Maps url regexes to TTLs.  The first regex found in the url sets the entry's TTL.
+        max_entries: integer, keyword, default=10000
+            The maximum number of entries kept.
+        max_bytes: integer, keyword, default=67108864
+            The maximum total size of the entries kept.
+        """
+
+        self.default_ttl = default_ttl
+        self.path_ttls = [(re.compile(regex), ttl) for regex, ttl in (path_ttls or {}).items()]
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'puts': 0, 'invalidations': 0}
+
+    def get_ttl(self, key):
+        """Returns the TTL for key.
+
+        """
+
+        for regex, ttl in self.path_ttls:
+            if regex.search(key):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key):
+        """Returns a copy of the response cached under key, or None if it is missing or expired.
+
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            snapshot, expires, size = entry
+            if expires is not None and expires <= time.monotonic():
+                self._remove(key)
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        return _pickle.loads(snapshot)
+
+    def put(self, key, response_dict):
+        """Caches a snapshot of response_dict under key unless the TTL for key is 0 or the response alone exceeds
+        max_bytes.
+
+        """
+
+        ttl = self.get_ttl(key)
+        if ttl == 0:
+            return
+        snapshot = _pickle.dumps(response_dict, protocol=-1)
+        size = len(snapshot)
+        if size > self.max_bytes:
+            return
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (snapshot, expires, size)
+            self._bytes += size
+            self.stats['puts'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    def _remove(self, key):
+        snapshot, expires, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, url_prefix=None):
+        """Removes the entries for url_prefix and the paths below it, or all entries if url_prefix is None.
+
+        Returns - The number of entries removed.
+        """
+
+        with self._lock:
+            if url_prefix is None:
+                keys = list(self._entries.keys())
+            else:
+                keys = [key for key in self._entries
+                        if key == url_prefix or key.startswith((url_prefix + '/', url_prefix + '?'))]
+            for key in keys:
+                self._remove(key)
+            self.stats['invalidations'] += len(keys)
+        return len(keys)
+
+    def get_stats(self):
+        """Returns a copy of the cache counters.
+
+        """
+
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+response_index.py implements the secondary indexes a REST leaf keeps
+over the objects in the responses it receives.  Objects are indexed by
+type, id, (type, name) and parent url as responses are stored (see
+tree_helpers.store_json_response_by_url), so finding an object by name
+or id, or the objects below a parent object, does not need a scan of a
+responses dictionary.
+
+An object is any dictionary with an id found either as the json_dict of
+a response or in the items list of a page.  Its url is the response url
+without the query, with /<id> appended for page items.  Its parent is
+its url without the last two path parts (the id and the collection),
+e.g. the device record url for a physical interface.
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import re
+import threading
+from collections import OrderedDict
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+
+def _get_parent_url(url):
+    parts = url.rsplit('/', 2)
+    return parts[0] if len(parts) == 3 else None
+
+
+# Not traced, add_response is called for every response...
+@logged(logger)
+class ResponseIndex(object):
+    """Thread safe indexes of the objects in stored responses: type to ids, id to url, (type, name) to id and parent
+    url to child urls.
+
+    """
+
+    def __init__(self):
+
+        """__init__ creates empty indexes.
+
+        """
+
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Removes every object from the indexes.
+
+        """
+
+        with self._lock:
+            # id -> (url, type, name)...
+            self._objects = {}
+            self._ids_by_url = {}
+            # type -> ordered set of ids...
+            self._ids_by_type = {}
+            self._ids_by_name = {}
+            # parent url -> OrderedDict of child url -> type...
+            self._children = {}
+
+    def add_response(self, response_dict):
+        """Indexes the objects in a stored response.
+
+        Returns - The number of objects indexed.
+        """
+
+        json_dict = response_dict.get('json_dict')
+        if not isinstance(json_dict, dict) or not response_dict.get('url'):
+            return 0
+        url = re.sub(r'\?.*$', '', response_dict['url']).rstrip('/')
+        objects = []
+        if 'id' in json_dict:
+            object_id = str(json_dict['id'])
+            object_url = url if url.endswith('/' + object_id) else url + '/' + object_id
+            objects.append((object_id, object_url, json_dict))
+        items = json_dict.get('items')
+        if isinstance(items, list):
+            for item in items:
+                if isinstance(item, dict) and 'id' in item:
+                    object_id = str(item['id'])
+                    objects.append((object_id, url + '/' + object_id, item))
+        if objects:
+            with self._lock:
+                for object_id, object_url, object_dict in objects:
+                    self._add_object(object_id, object_url, object_dict.get('type'), object_dict.get('name'))
+        return len(objects)
+
+    def _add_object(self, object_id, url, type, name):
+        previous = self._objects.get(object_id)
+        if previous is not None:
+            previous_url, previous_type, previous_name = previous
+            if previous == (url, type, name):
+                return
+            # Renamed or moved, drop the stale entries...
+            if self._ids_by_name.get((previous_type, previous_name)) == object_id:
+                del self._ids_by_name[(previous_type, previous_name)]
+            if previous_url != url:
+                self._unlink_url(previous_url)
+            if previous_type != type:
+                self._ids_by_type.get(previous_type, {}).pop(object_id, None)
+        self._objects[object_id] = (url, type, name)
+        self._ids_by_url[url] = object_id
+        self._ids_by_type.setdefault(type, OrderedDict())[object_id] = None
+        if name is not None:
+            self._ids_by_name[(type, name)] = object_id
+        parent_url = _get_parent_url(url)
+        if parent_url is not None:
+            self._children.setdefault(parent_url, OrderedDict())[url] = type
+
+    def _unlink_url(self, url):
+        self._ids_by_url.pop(url, None)
+        parent_url = _get_parent_url(url)
+        children = self._children.get(parent_url)
+        if children is not None:
+            children.pop(url, None)
+            if not children:
+                del self._children[parent_url]
+
+    def remove_url(self, url):
+        """Removes the object at url, and the objects below it, from the indexes.  Used when an object is deleted.
+
+        Returns - The number of objects removed.
+        """
+
+        url = re.sub(r'\?.*$', '', url).rstrip('/')
+        removed = 0
+        with self._lock:
+            urls = [url]
+            while urls:
+                url = urls.pop()
+                urls.extend(self._children.pop(url, {}).keys())
+                object_id = self._ids_by_url.get(url)
+                self._unlink_url(url)
+                if object_id is None:
+                    continue
+                object_url, type, name = self._objects.pop(object_id)
+                self._ids_by_type.get(type, {}).pop(object_id, None)
+                if self._ids_by_name.get((type, name)) == object_id:
+                    del self._ids_by_name[(type, name)]
+                removed += 1
+        return removed
+
+    def get_ids_by_type(self, type):
+        """Returns the list of ids of the objects of type.
+
+        """
+
+        with self._lock:
+            return list(self._ids_by_type.get(type, ()))
+
+    def get_url_by_id(self, id):
+        """Returns the url of the object with id, or None.
+
+        """
+
+        entry = self._objects.get(str(id))
+        return entry[0] if entry is not None else None
+
+    def get_type_by_id(self, id):
+        """Returns the type of the object with id, or None.
+
+        """
+
+        entry = self._objects.get(str(id))
+        return entry[1] if entry is not None else None
+
+    def get_id_by_name(self, type, name):
+        """Returns the id of the object of type named name, or None.
+
+        """
+
+        return self._ids_by_name.get((type, name))
+
+    def get_parent_url(self, url):
+        """Returns the url of the object url is below, or None if url is not indexed.
+
+        """
+
+        url = re.sub(r'\?.*$', '', url).rstrip('/')
+        if url not in self._ids_by_url:
+            return None
+        return _get_parent_url(url)
+
+    def get_child_urls(self, parent_url, type=None):
+        """Returns the urls of the indexed objects directly below parent_url, optionally only those of type.
+
+        """
+
+        parent_url = re.sub(r'\?.*$', '', parent_url).rstrip('/')
+        with self._lock:
+            children = list(self._children.get(parent_url, {}).items())
+        return [url for url, child_type in children if type is None or child_type == type]
+
+    def get_stats(self):
+        """Returns the number of indexed objects, types, names and parents.
+
+        """
+
+        with self._lock:
+            return {'objects': len(self._objects), 'types': len(self._ids_by_type), 'names': len(self._ids_by_name),
+                    'parents': len(self._children)}
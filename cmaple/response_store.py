@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+response_store.py implements the single file response store used to
+persist leaf responses.  Responses are pickled into one SQLite file per
+leaf working directory, indexed by url (or cmd id for terminal leafs).
+Writes are batched into one transaction per batch.  LazyResponsesDict
+presents a store as a responses_dict which decodes responses on first
+access.
+
+The module can also be run to migrate a leaf working directory holding
+the older one pickle file per response layout:
+
+    python -m cmaple.response_store <leaf_dir> [<leaf_dir> ...]
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import re
+import sys
+import sqlite3
+import threading
+import atexit
+import argparse
+import _pickle
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+# Define global variables...
+_STORE_FILE_NAME = 'responses.sqlite'
+_LEGACY_PICKLE_SUFFIX = '.response_pickle'
+_DEFAULT_BATCH_SIZE = 500
+_FETCH_SIZE = 500
+
+# Open stores by leaf directory, closed (and flushed) at exit...
+_open_stores = {}
+_open_stores_lock = threading.Lock()
+
+
+@logged(logger)
+class ResponseStore(object):
+    """Indexed single file store of pickled response dictionaries.
+
+    put() buffers responses and writes them batch_size at a time.  Reads flush the buffer first, so a store always
+    returns what was put into it.  Iteration is in write order; a key written again moves to the end.
+    """
+
+    def __init__(self, store_path, batch_size=_DEFAULT_BATCH_SIZE):
+
+        """__init__ opens or creates the store file.
+
+        *Parameters*
+
+        store_path: string
+            The path to the SQLite store file.
+        batch_size: integer, keyword, default=500
+            The number of buffered responses which triggers a write.
+        """
+
+        self.store_path = store_path
+        self.batch_size = int(batch_size)
+        self._pending = OrderedDict()
+        self._updates = OrderedDict()
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(store_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS responses '
+                                 '(key TEXT PRIMARY KEY, counter INTEGER, data BLOB)')
+        self._connection.commit()
+
+    def put(self, key, response_dict, counter=0):
+        """Buffers response_dict under key.  The response is pickled immediately so later changes to it are not
+        stored.
+
+        """
+
+        data = _pickle.dumps(response_dict, protocol=-1)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = (counter, data)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def update(self, key, response_dict):
+        """Buffers a new response_dict for a stored key.  Unlike put, the counter and the write order of the key
+        are kept.  The response is pickled immediately so later changes to it are not stored.
+
+        """
+
+        data = _pickle.dumps(response_dict, protocol=-1)
+        with self._lock:
+            if key in self._pending:
+                self._pending[key] = (self._pending[key][0], data)
+            else:
+                self._updates[key] = data
+            if len(self._pending) + len(self._updates) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Writes all buffered responses in one transaction.
+
+        """
+
+        with self._lock:
+            if not self._pending and not self._updates:
+                return
+            rows = [(key, counter, data) for key, (counter, data) in self._pending.items()]
+            with self._connection:
+                self._connection.executemany('INSERT OR REPLACE INTO responses (key, counter, data) VALUES (?, ?, ?)',
+                                             rows)
+                self._connection.executemany('UPDATE responses SET data = ? WHERE key = ?',
+                                             [(data, key) for key, data in self._updates.items()])
+            self._pending.clear()
+            self._updates.clear()
+
+    def delete(self, keys):
+        """Removes the responses stored under keys.
+
+        """
+
+        with self._lock:
+            for key in keys:
+                self._pending.pop(key, None)
+                self._updates.pop(key, None)
+            with self._connection:
+                self._connection.executemany('DELETE FROM responses WHERE key = ?', [(key,) for key in keys])
+
+    def get(self, key, default=None):
+        """Returns the response stored under key, or default.
+
+        """
+
+        with self._lock:
+            self.flush()
+            row = self._connection.execute('SELECT data FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return default
+        return _pickle.loads(row[0])
+
+    def _iter_rows(self, query):
+        with self._lock:
+            self.flush()
+            cursor = self._connection.execute(query)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
+    def keys(self):
+        """Returns a generator of the stored keys in write order.
+
+        """
+
+        for row in self._iter_rows('SELECT key FROM responses ORDER BY rowid'):
+            yield row[0]
+
+    def items(self):
+        """Returns a generator of (key, response_dict) tuples in write order.
+
+        """
+
+        for row in self._iter_rows('SELECT key, data FROM responses ORDER BY rowid'):
+            yield row[0], _pickle.loads(row[1])
+
+    def __iter__(self):
+        return self.keys()
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._pending or key in self._updates:
+                return True
+            row = self._connection.execute('SELECT 1 FROM responses WHERE key = ?', (key,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            self.flush()
+            return self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        """Flushes and closes the store.
+
+        """
+
+        with self._lock:
+            if self._connection is None:
+                return
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+
+# Not traced, items are looked up for every cache check...
+@logged(logger)
+class LazyResponsesDict(MutableMapping):
+    """responses_dict backed by a ResponseStore.
+
+    The keys are read from the store index when the mapping is created.  Values are decoded on first access and
+    the most recently used max_cached values are kept in memory.  Responses set on the mapping stay in memory.
+
+    Changes made to a restored response are lost when it is evicted unless writeback is True, in which case evicted
+    responses are written back to the store (see ResponseStore.update) and decoded from it again on next access.
+    """
+
+    def __init__(self, store, max_cached=1024, writeback=False):
+
+        """__init__ loads the key index from store.
+
+        *Parameters*
+
+        store: ResponseStore
+            The store holding the restored responses.
+        max_cached: integer, keyword, default=1024
+            The number of decoded responses kept in memory.
+        writeback: boolean, keyword, default=False
+            If True, changes to restored responses survive eviction, evicted responses are written back to store.
+        """
+
+        self._store = store
+        self.max_cached = max(int(max_cached), 1)
+        self.writeback = writeback
+        self._keys = OrderedDict.fromkeys(store.keys())
+        self._cache = OrderedDict()
+        self._overlay = {}
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'decodes': 0, 'evictions': 0}
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in self._overlay:
+                return self._overlay[key]
+            if key not in self._keys:
+                raise KeyError(key)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._cache[key]
+            value = self._store.get(key)
+            self.stats['decodes'] += 1
+            self._cache[key] = value
+            if len(self._cache) > self.max_cached:
+                evicted_key, evicted_value = self._cache.popitem(last=False)
+                self.stats['evictions'] += 1
+                if self.writeback:
+                    self._store.update(evicted_key, evicted_value)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._keys[key] = None
+            self._overlay[key] = value
+            self._cache.pop(key, None)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._keys[key]
+            self._overlay.pop(key, None)
+            self._cache.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        with self._lock:
+            keys = list(self._keys)
+        return iter(keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get_stats(self):
+        """Returns a copy of the cache counters.
+
+        """
+
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached'] = len(self._cache)
+        stats['keys'] = len(self._keys)
+        return stats
+
+
+@logged(logger)
+@traced(logger)
+def get_store_path(leaf_dir):
+    """Returns the path of the store file for leaf_dir.
+
+    """
+
+    return os.path.join(leaf_dir, _STORE_FILE_NAME)
+
+
+@logged(logger)
+@traced(logger)
+def store_exists(leaf_dir):
+    """Returns True if leaf_dir holds a response store.
+
+    """
+
+    return os.path.exists(get_store_path(leaf_dir))
+
+
+@logged(logger)
+@traced(logger)
+def get_response_store(leaf_dir):
+    """Returns the open ResponseStore for leaf_dir, opening it if required.  All callers share one store per
+    directory.
+
+    """
+
+    store_path = os.path.abspath(get_store_path(leaf_dir))
+    with _open_stores_lock:
+        if store_path not in _open_stores:
+            _open_stores[store_path] = ResponseStore(store_path)
+        return _open_stores[store_path]
+
+
+@logged(logger)
+@traced(logger)
+def close_response_stores():
+    """Flushes and closes every open store.  Registered to run at exit.
+
+    """
+
+    with _open_stores_lock:
+        for store in _open_stores.values():
+            store.close()
+        _open_stores.clear()
+
+
+atexit.register(close_response_stores)
+
+
+@logged(logger)
+@traced(logger)
+def get_legacy_pickle_files(leaf_dir):
+    """Returns the sorted list of one file per response pickles in leaf_dir.
+
+    """
+
+    return sorted([file_name for file_name in os.listdir(leaf_dir) if file_name.endswith(_LEGACY_PICKLE_SUFFIX)])
+
+
+@logged(logger)
+@traced(logger)
+def migrate_pickle_dir(leaf_dir, remove_pickles=False):
+    """Copies the one file per response pickles in leaf_dir into the leaf_dir response store.
+
+    Returns - The number of responses migrated.
+
+    *Parameters*
+
+    leaf_dir: string
+        The leaf working directory.
+    remove_pickles: boolean, keyword, default=False
+        If True, each pickle file is deleted once the store has been written.
+    """
+
+    store = get_response_store(leaf_dir)
+    pickle_files = get_legacy_pickle_files(leaf_dir)
+    for pickle_file in pickle_files:
+        counter_match = re.match(r'^(\d+)_', pickle_file)
+        counter = int(counter_match.group(1)) if counter_match else 0
+        with open(os.path.join(leaf_dir, pickle_file), 'rb') as f:
+            response_dict = _pickle.load(f)
+        key = response_dict['url'] if 'url' in response_dict else response_dict['cmd_id']
+        store.put(key, response_dict, counter=counter)
+    store.flush()
+    if remove_pickles:
+        for pickle_file in pickle_files:
+            os.remove(os.path.join(leaf_dir, pickle_file))
+    logger.info('Migrated %s responses from %s to %s' % (len(pickle_files), leaf_dir, store.store_path))
+    return len(pickle_files)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Migrates leaf working directories from one pickle file per '
+                                                     'response to the single file response store.')
+    arg_parser.add_argument('leaf_dirs', nargs='+', metavar='leaf_dir', help='a leaf working directory')
+    arg_parser.add_argument('-remove_pickles', action='store_true',
+                            help='delete the pickle files once they have been migrated')
+    args = arg_parser.parse_args()
+    for leaf_dir in args.leaf_dirs:
+        migrated = migrate_pickle_dir(leaf_dir, remove_pickles=args.remove_pickles)
+        print('%s: migrated %s responses to %s' % (leaf_dir, migrated, get_store_path(leaf_dir)), file=sys.stderr)
+    close_response_stores()
@@ -32,6 +32,14 @@ import cmaple.tree_helpers as tree_helpers
 from cmaple.tree_helpers import set_default as sd
 import cmaple.input_validations as input_validations
 import cmaple.output_transforms as output_transforms
+import cmaple.rate_limiter as rate_limiter
+import cmaple.response_cache as response_cache
+import cmaple.request_metrics as request_metrics
+import cmaple.concurrency_controller as concurrency_controller
+import cmaple.single_flight as single_flight
+import cmaple.response_index as response_index
+import cmaple.csv_import as csv_import
+import cmaple.transport as transport
 import json
 import urllib3
 import shelve
@@ -41,11 +49,37 @@ import logging
 from autologging import logged, traced
 from autologging import TRACE
 import time
+import threading
+import atexit
+import concurrent.futures
+from collections import deque
 from objectpath import *
 
 # Create a logger...
 logger = logging.getLogger(re.sub('\.[^.]+$','',__name__))
 # Define global variables
+# Defaults for RestBase attributes which may be overridden by the leaf kwargs...
+_REST_BASE_DEFAULTS = {'pool_connections': 10, 'pool_maxsize': 10, 'pool_block': True,
+                       'default_max_concurrency': 1, 'requests_per_minute': None, 'rate_limit_burst': 1,
+                       'lazy_restore': False, 'lazy_restore_cache_size': 1024, 'response_cache_ttl': 0,
+                       'response_cache_path_ttls': None, 'response_cache_max_entries': 10000,
+                       'response_cache_max_bytes': 64 * 1024 * 1024, 'dump_metrics_at_exit': True,
+                       'transport': None, 'cassette_path': None, 'adaptive_concurrency': True,
+                       'adaptive_initial_concurrency': 1, 'adaptive_latency_tolerance': 2.0, 'coalesce_gets': True}
+# Leaves whose metrics are dumped at exit by the process's single atexit hook...
+_METRICS_AT_EXIT_LEAVES = []
+
+
+def _dump_metrics_at_exit():
+    # The one atexit hook for the process, see RestBase.dump_metrics...
+    for leaf in list(_METRICS_AT_EXIT_LEAVES):
+        try:
+            leaf.dump_metrics()
+        except Exception as e:
+            logger.warning('Metrics for leaf %s not written: %s' % (getattr(leaf, 'name', ''), e))
+
+
+atexit.register(_dump_metrics_at_exit)
 
 @logged(logger)
 @traced(logger)
@@ -65,18 +99,113 @@ class RestBase(object):
 
         """__init__ RestBase inherits arguments from the parent class.  All argument validation is
         performed by the parent class.
+
+        The following optional leaf kwargs are handled by RestBase.
+
+        *Parameters*
+
+        pool_connections: integer, keyword, default=10
+            The number of per host connection pools kept by the leaf's session.
+        pool_maxsize: integer, keyword, default=10
+            The number of keep-alive connections kept per host.
+        pool_block: boolean, keyword, default=True
+            If True, pool_maxsize is a hard per host connection limit.
+        default_max_concurrency: integer, keyword, default=1
+            The default number of concurrent requests used by the walk methods.  1 selects the sequential depth
+            first walk.
+        requests_per_minute: number, keyword, default=None
+            If set, requests are paced with a token bucket to stay under this rate.  Leafs connecting to the same
+            host with the same username share one bucket.  None disables pacing.
+        rate_limit_burst: integer, keyword, default=1
+            The number of requests the token bucket allows back to back.  requests_per_minute + rate_limit_burst
+            should not exceed the host's per minute limit.
+        lazy_restore: boolean, keyword, default=False
+            If True, restore_responses loads only the index of persisted responses and decodes each response on
+            first access.
+        lazy_restore_cache_size: integer, keyword, default=1024
+            The number of decoded responses kept in memory when lazy_restore is True.
+        response_cache_ttl: number, keyword, default=0
+            The number of seconds successful GET responses are served from the leaf's response cache to requests
+            made with use_cache=True, whichever responses_dict they use.  PUT, POST and DELETE requests invalidate
+            the cached responses for their path.  None never expires, 0 (the default) disables the cache so
+            requests are only answered from their own responses_dict.
+        response_cache_path_ttls: dictionary, keyword, default=None
+            Maps url regexes to TTLs overriding response_cache_ttl.  The first regex found in the url is used.  Also
+            enables the cache for the matching paths when response_cache_ttl is 0.
+        response_cache_max_entries: integer, keyword, default=10000
+            The maximum number of responses kept in the response cache.
+        response_cache_max_bytes: integer, keyword, default=67108864
+            The maximum total size of the responses kept in the response cache.
+        dump_metrics_at_exit: boolean, keyword, default=True
+            If True, the leaf's request metrics are written to metrics.json and metrics.prom in the leaf directory
+            when the process exits.  See get_metrics.
+        transport: string or object, keyword, default=None
+            'record' sends requests through the leaf's session and records every request and response to a
+            cassette.  'replay' answers requests from a cassette without network access.  Any other object with
+            get, post, put and delete methods (see cmaple.transport) is used in place of the session.  None sends
+            requests through the leaf's session.
+        cassette_path: string, keyword, default=None
+            The cassette file used by the 'record' and 'replay' transports.  Defaults to cassette.jsonl in the
+            leaf directory.
+        adaptive_concurrency: boolean, keyword, default=True
+            If True, the number of requests the concurrent walks and bulk operations keep in flight adapts to the
+            host (see cmaple.concurrency_controller).  It grows while responses are healthy and is halved on 429s,
+            5xxs or rising latency, never exceeding max_concurrency.  If False, max_concurrency requests are kept in
+            flight.
+        adaptive_initial_concurrency: integer, keyword, default=1
+            The number of requests in flight when the leaf starts sending requests.
+        adaptive_latency_tolerance: number, keyword, default=2.0
+            The smoothed latency, as a multiple of the latency seen at low load, treated as a sign of overload.
+            None ignores latency.
+        coalesce_gets: boolean, keyword, default=True
+            If True, GETs of the same canonical url issued while an identical GET is in flight wait for it and
+            share its response instead of sending their own (see cmaple.single_flight).
         """
 
+        for key, val in _REST_BASE_DEFAULTS.items():
+            if key not in self.__dict__:
+                self.__dict__[key] = val
+
         self.response_counter = 0
+        self._rate_limiters = {}
         self.credentials_dict = {}  # Need to supply this in the parent class...
         self.next_link_query = ''  # Need to supply this in the parent class...
 
         if not self.verify:  # Disables insecure warning for self signed certs...
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        # Serializes token refreshes when requests are issued from several threads...
+        self._auth_lock = threading.RLock()
+        # All requests for this leaf share one pooled keep-alive session...
+        self._session = tree_helpers.get_pooled_session(pool_connections=self.pool_connections,
+                                                        pool_maxsize=self.pool_maxsize,
+                                                        pool_block=self.pool_block)
+        if self.transport is not None:
+            cassette_path = self.cassette_path or transport.get_cassette_path(self.leaf_dir)
+            self._session = transport.get_transport(self.transport, self._session, cassette_path)
+        self._response_cache = None
+        if self.response_cache_ttl != 0 or self.response_cache_path_ttls:
+            self._response_cache = response_cache.ResponseCache(default_ttl=self.response_cache_ttl,
+                                                                path_ttls=self.response_cache_path_ttls,
+                                                                max_entries=self.response_cache_max_entries,
+                                                                max_bytes=self.response_cache_max_bytes)
+        self._metrics = request_metrics.RequestMetrics(leaf_name=getattr(self, 'name', ''))
+        if self.dump_metrics_at_exit:
+            _METRICS_AT_EXIT_LEAVES.append(self)
+        self._concurrency_controller = None
+        if self.adaptive_concurrency:
+            self._concurrency_controller = concurrency_controller.AIMDController(
+                max_window=self.default_max_concurrency, initial_window=self.adaptive_initial_concurrency,
+                latency_tolerance=self.adaptive_latency_tolerance, metrics=self._metrics)
+        self._single_flight = single_flight.SingleFlight() if self.coalesce_gets else None
         self.responses_dict = {}
-        self.response_index = {}
+        # Indexes the objects in the responses received by this leaf, see the find_* methods...
+        self.response_index = response_index.ResponseIndex()
         if self.restore_responses:
-            tree_helpers.restore_responses(self.leaf_dir, self.responses_dict)
+            if self.lazy_restore:
+                self.responses_dict = tree_helpers.restore_lazy_responses(self.leaf_dir,
+                                                                          max_cached=self.lazy_restore_cache_size)
+            else:
+                tree_helpers.restore_responses(self.leaf_dir, self.responses_dict)
 
     def _request_wrapper(self):
         """Must override in parent class
@@ -87,6 +216,440 @@ class RestBase(object):
 
         pass
 
+    def _process_json_request(self, **kwargs):
+        """Sends a request through the leaf's pooled session.  Called by the parent class _request_wrapper.
+
+        *****Inherited from RestBase...*****
+
+        When the response cache is enabled (see response_cache_ttl, off by default), GET requests made with
+        use_cache=True are answered from it when the url is not already in responses_dict.  use_response_cache=True
+        consults the response cache without serving responses_dict entries.  Successful GET responses are added to
+        the cache and other methods invalidate it.  When coalesce_gets is True, a GET of a canonical url already
+        being requested by another thread, with the same filters, waits for that request and stores a copy of its
+        response dictionary (sharing the decoded json_dict) in its own responses_dict.
+
+        *Parameters*
+
+        use_response_cache: boolean, keyword, default=use_cache
+            If set to True, a GET is answered from the response cache when a fresh response is cached.
+        \*\*kwargs: dictionary
+            Used to pass through arguments to tree_helpers.process_json_request.
+        """
+
+        url = kwargs['url']
+        method = kwargs['method']
+        use_response_cache = kwargs.pop('use_response_cache', kwargs.get('use_cache'))
+        cache_key = None
+        if self._response_cache is not None and method == 'get':
+            cache_key = self._get_response_cache_key(url, kwargs.get('get_item_limit'))
+            if use_response_cache and not (kwargs.get('use_cache') and url in kwargs['responses_dict']):
+                cached_response = self._response_cache.get(cache_key)
+                if cached_response is not None:
+                    # A new copy for this caller, see response_cache.ResponseCache...
+                    kwargs['responses_dict'][url] = cached_response
+                    kwargs['use_cache'] = True
+                    self.response_index.add_response(cached_response)
+
+        if self._single_flight is not None and method == 'get' and \
+                not (kwargs.get('use_cache') and url in kwargs['responses_dict']):
+            # Requests sent with different headers (e.g. auth tokens) may get different responses...
+            flight_key = (cache_key or self._get_response_cache_key(url, kwargs.get('get_item_limit')),
+                          kwargs.get('include_filter_regex'), kwargs.get('exclude_filter_regex'),
+                          tuple(sorted((kwargs.get('headers') or {}).items())))
+            result, shared = self._single_flight.do(flight_key, lambda: self._send_json_request(cache_key, **kwargs))
+            if shared:
+                self._metrics.record_coalesced(method, url)
+                result = self._get_shared_result(result, url, kwargs)
+            return result
+
+        return self._send_json_request(cache_key, **kwargs)
+
+    def _send_json_request(self, cache_key, **kwargs):
+        """Sends a request with tree_helpers.process_json_request and updates the response cache.  Called by
+        _process_json_request.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        cache_key: string
+            The response cache key of a GET, None for other methods.
+        \*\*kwargs: dictionary
+            Used to pass through arguments to tree_helpers.process_json_request.
+        """
+
+        result = tree_helpers.process_json_request(session=self._session,
+                                                   rate_limiter=self._get_rate_limiter(kwargs['url']),
+                                                   metrics=self._metrics,
+                                                   concurrency_controller=self._concurrency_controller,
+                                                   response_index=self.response_index, **kwargs)
+
+        if kwargs['method'] == 'delete' and result[1]:
+            self.response_index.remove_url(kwargs['url'])
+        if self._response_cache is not None:
+            if cache_key is not None:
+                if result[1]:
+                    self._response_cache.put(cache_key, result[0])
+            else:
+                self._invalidate_response_cache(kwargs['url'], kwargs['method'])
+        return result
+
+    def _get_shared_result(self, result, url, kwargs):
+        """Returns the result of a coalesced GET for a caller which did not send it.  The response dictionary is
+        stored in the caller's responses_dict under the url process_json_request would have used.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        result: tuple
+            The tree_helpers.process_json_request result of the request which was sent.
+        url: string
+            The caller's request url.
+        kwargs: dictionary
+            The caller's tree_helpers.process_json_request arguments.
+        """
+
+        response_dict = result[0]
+        responses_dict = kwargs['responses_dict']
+        request_url = url
+        include_filtered, exclude_filtered = result[2], result[3]
+        if include_filtered and not exclude_filtered:
+            request_url = tree_helpers.get_limited_url(url, kwargs.get('API_path_keywords_list', []),
+                                                       kwargs.get('get_item_limit', 25))
+        if responses_dict.get(request_url) is not response_dict:
+            # Copy, callers annotate their responses with child urls...
+            response_dict = dict(response_dict, url=request_url)
+            responses_dict[request_url] = response_dict
+        return (response_dict,) + tuple(result[1:])
+
+    def _get_response_cache_key(self, url, get_item_limit=None):
+        """Returns the response cache key for a GET of url.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        url: string
+            The request url.
+        get_item_limit: integer, keyword, default=None
+            The item limit the request will be sent with.
+        """
+
+        default_limit = getattr(self, 'default_get_item_limit', None)
+        if get_item_limit is not None and str(get_item_limit) != str(default_limit) and \
+                not re.search(r'[?&]limit=', url):
+            url = tree_helpers.set_url_parameter(url, 'limit', get_item_limit)
+        return tree_helpers.canonicalize_url(url, default_limit=default_limit)
+
+    def _invalidate_response_cache(self, url, method='get'):
+        """Removes the cached responses made stale by a request to url.  PUT, PATCH and DELETE requests invalidate
+        the parent collection of url, other methods invalidate url and the paths below it.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        url: string
+            The request url.
+        method: string, keyword, default='get'
+            The request method.
+        """
+
+        if self._response_cache is None:
+            return
+        url_prefix = tree_helpers.canonicalize_url(re.sub(r'\?.*$', '', url))
+        if method in ('put', 'patch', 'delete'):
+            url_prefix = re.sub(r'/[^/]+$', '', url_prefix)
+        self._response_cache.invalidate(url_prefix)
+
+    def get_response_cache_stats(self):
+        """Returns the response cache counters.
+
+        *****Inherited from RestBase...*****
+
+        Returns - A dictionary with the hits, misses, expired, evictions, puts, invalidations, entries, bytes and
+        hit_ratio of the cache, or None if the cache is disabled.
+        """
+
+        if self._response_cache is None:
+            return None
+        return self._response_cache.get_stats()
+
+    def clear_response_cache(self):
+        """Removes every response from the response cache.
+
+        *****Inherited from RestBase...*****
+
+        """
+
+        if self._response_cache is not None:
+            self._response_cache.invalidate()
+
+    def _get_rate_limiter(self, url):
+        """Returns the shared token bucket for the host in url, or None if requests_per_minute is not set.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        url: string
+            The request url.
+        """
+
+        if self.requests_per_minute is None:
+            return None
+        host = re.sub(r'^https?://([^/]+).*$', r'\1', url)
+        if host not in self._rate_limiters:
+            username = ''
+            if self.credentials_dict and 'username' in self.credentials_dict:
+                username = self.credentials_dict['username']
+            self._rate_limiters[host] = rate_limiter.get_shared_token_bucket(
+                host, username, requests_per_minute=self.requests_per_minute, burst=self.rate_limit_burst)
+        return self._rate_limiters[host]
+
+    def _rate_limit_backoff(self, response_dict, method='get'):
+        """Waits out a 429 response.  Called by the parent class _request_wrapper.
+
+        *****Inherited from RestBase...*****
+
+        Uses the Retry-After header if the host sent one, otherwise backoff_timer.  If the leaf has a token bucket,
+        the bucket is paused so every leaf and thread sharing it waits, instead of sleeping this thread only.
+
+        *Parameters*
+
+        response_dict: dictionary
+            The 429 response.
+        method: string, keyword, default='get'
+            The method of the request which will be retried.
+        """
+
+        delay = float(self.backoff_timer)
+        headers = response_dict['headers']
+        if headers and 'Retry-After' in headers:
+            try:
+                delay = float(headers['Retry-After'])
+            except ValueError:
+                pass
+        self._metrics.record_retry(method, response_dict['url'])
+        bucket = self._get_rate_limiter(response_dict['url'])
+        if bucket is not None:
+            # The wait is recorded when the retry acquires its token...
+            bucket.backoff(delay)
+        else:
+            time.sleep(delay)
+            self._metrics.record_sleep(method, response_dict['url'], delay)
+        return delay
+
+    def find_ids_by_type(self, type):
+        """Returns the ids of the objects of type found in the responses received by this leaf.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        type: string
+            The object type, e.g. Network.
+        """
+
+        return self.response_index.get_ids_by_type(type)
+
+    def find_url_by_id(self, id):
+        """Returns the url of the object with id found in the responses received by this leaf, or None.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        id: string
+            The object id.
+        """
+
+        return self.response_index.get_url_by_id(id)
+
+    def find_id_by_name(self, type, name):
+        """Returns the id of the object of type named name found in the responses received by this leaf, or None.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        type: string
+            The object type, e.g. Network.
+        name: string
+            The object name.
+        """
+
+        return self.response_index.get_id_by_name(type, name)
+
+    def find_child_urls(self, parent_url, type=None):
+        """Returns the urls of the objects directly below parent_url (e.g. the interfaces of a device record) found in
+        the responses received by this leaf.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        parent_url: string
+            The url of the parent object.  If the host prefix is missing, it will be added automatically.
+        type: string, keyword, default=None
+            If set, only the urls of objects of type are returned.
+        """
+
+        if self.path_root not in parent_url:
+            parent_url = self.path_root + parent_url
+        return self.response_index.get_child_urls(parent_url, type=type)
+
+    def rebuild_response_index(self, responses_dict=None):
+        """Clears the response index and indexes the successful responses in responses_dict.  The index normally
+        holds only responses received from the host, use this to index restored responses.
+
+        *****Inherited from RestBase...*****
+
+        Returns - The number of objects indexed.
+
+        *Parameters*
+
+        responses_dict: dictionary, keyword, default=None
+            The responses to index.  Defaults to self.responses_dict.
+        """
+
+        if responses_dict is None:
+            responses_dict = self.responses_dict
+        self.response_index.clear()
+        indexed = 0
+        for response_dict in responses_dict.values():
+            if response_dict.get('json_dict') and not response_dict.get('error'):
+                indexed += self.response_index.add_response(response_dict)
+        return indexed
+
+    def get_rate_limiter_stats(self):
+        """Returns the token bucket counters for each host this leaf has sent requests to.
+
+        *****Inherited from RestBase...*****
+
+        Returns - A dictionary of counters by host.
+        """
+
+        return {host: bucket.get_stats() for host, bucket in self._rate_limiters.items()}
+
+    def _get_concurrency_window(self, max_concurrency):
+        """Returns the number of requests a concurrent walk or bulk operation may keep in flight.
+
+        *****Inherited from RestBase...*****
+
+        *Parameters*
+
+        max_concurrency: integer
+            The caller's maximum.  When adaptive_concurrency is True it becomes the ceiling of the adaptive window.
+        """
+
+        if self._concurrency_controller is None:
+            return max_concurrency
+        if self._concurrency_controller.max_window != max_concurrency:
+            self._concurrency_controller.set_max_window(max_concurrency)
+        return self._concurrency_controller.window
+
+    def _map_concurrent(self, function, items, max_concurrency):
+        """Calls function for each of items from a pool of max_concurrency threads, keeping at most the concurrency
+        window (see _get_concurrency_window) of calls in flight.
+
+        *****Inherited from RestBase...*****
+
+        items is consumed lazily, an item is taken only when a call can start, so a generator can size each item
+        from the results seen so far.
+
+        Returns - The list of results in items order.
+
+        *Parameters*
+
+        function: function
+            Called with one item.  Exceptions are raised to the caller.
+        items: iterable
+            The items to call function with.
+        max_concurrency: integer
+            The maximum number of calls in flight.
+        """
+
+        items = iter(items)
+        results = []
+        exhausted = False
+        in_flight = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(max_concurrency, 1)) as executor:
+            while not exhausted or in_flight:
+                while not exhausted and len(in_flight) < self._get_concurrency_window(max_concurrency):
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    in_flight[executor.submit(function, item)] = len(results)
+                    results.append(None)
+                if not in_flight:
+                    continue
+                done, not_done = concurrent.futures.wait(list(in_flight.keys()),
+                                                         return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    results[in_flight.pop(future)] = future.result()
+        return results
+
+    def get_concurrency_stats(self):
+        """Returns the adaptive concurrency counters for this leaf.
+
+        *****Inherited from RestBase...*****
+
+        Returns - A dictionary with the current window, its limits, the smoothed and baseline latencies and the
+        number of increases, decreases and congestion signals, or None if adaptive_concurrency is False.
+        """
+
+        if self._concurrency_controller is None:
+            return None
+        return self._concurrency_controller.get_stats()
+
+    def get_metrics(self):
+        """Returns the request metrics for this leaf.
+
+        *****Inherited from RestBase...*****
+
+        Returns - A dictionary with the totals, the gauges and, for each method and path template (the url path with
+        object ids replaced by {id}), the request count, status codes, bytes in and out, a cumulative latency
+        histogram, retries, 429s, cache hits, coalesced requests, filtered requests and seconds spent sleeping.
+        """
+
+        return self._metrics.get_metrics()
+
+    def dump_metrics(self, metrics_dir=None):
+        """Writes the request metrics to metrics.json and metrics.prom (Prometheus text format).
+
+        *****Inherited from RestBase...*****
+
+        Returns - The list of files written.
+
+        *Parameters*
+
+        metrics_dir: string, keyword, default=None
+            The directory to write the files to.  Defaults to the leaf directory, no files are written if the leaf
+            has none.
+        """
+
+        metrics_dir = metrics_dir or getattr(self, 'leaf_dir', None)
+        if not metrics_dir:
+            return []
+        if not os.path.isdir(metrics_dir):
+            logger.warning('Metrics directory %s does not exist, metrics not written...' % metrics_dir)
+            return []
+        return self._metrics.dump(metrics_dir)
+
+    def get_connection_stats(self):
+        """Returns the connection reuse counters for this leaf's pooled session.
+
+        *****Inherited from RestBase...*****
+
+        Returns - A dictionary with the request, connections opened and connections reused counts.
+        """
+
+        return tree_helpers.get_session_stats(self._session)
+
     def _get_child_urls(self):
         """Must override in parent class
 
@@ -300,7 +863,109 @@ class RestBase(object):
                                   success_status_code=success_status_code)
         return response_dict
 
-    def get_json_request(self, url, responses_dict=None):
+    def delete_json_request(self, url, responses_dict=None):
+
+        """Generic wrapper for a REST API Delete request.
+
+        *****Inherited from RestBase...*****
+
+        Returns a Python dictionary object containing the response results for the Delete.
+
+        By default stores all responses in self.responses_dict unless a dictionary is passed in using the
+        responses_dict parameter.
+
+        *Parameters*
+
+        url: string
+            The url of the object to DELETE.  url can include the host prefix or start from the resource path.  If
+            the host prefix is missing, it will be added automatically.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.  Useful
+            if caller would like to keep the responses isolated.
+        """
+
+        if responses_dict is None:
+            responses_dict = self.responses_dict
+
+        if self.path_root not in url:
+            url = self.path_root + url
+
+        response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url = \
+            self._request_wrapper(recursed=False, url=url,
+                                  responses_dict=responses_dict, headers=self.request_headers,
+                                  method='delete', credentials_dict=self.credentials_dict, verify=self.verify,
+                                  success_status_code=200)
+        return response_dict
+
+    def bulk_put(self, url=None, put_list=None, responses_dict=None, max_concurrency=None):
+
+        """Updates the objects in put_list, each with a PUT to url/<id>.  Up to max_concurrency PUTs are in flight,
+        limited by the adaptive concurrency window and paced by the leaf's rate limiter.
+
+        *****Inherited from RestBase...*****
+
+        Returns - An OrderedDict of result dictionaries by object id, in put_list order.  Each result holds the
+        status ('updated' or 'failed'), the status_code and the error text.
+
+        *Parameters*
+
+        url: string, keyword, default=None
+            The url of the collection holding the objects.
+        put_list: list, keyword, default=None
+            The object dictionaries to PUT.  Each must hold the id of the object it updates.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of PUTs in flight.  Defaults to the leaf's default_max_concurrency.
+        """
+
+        for put_dict in put_list:
+            if not put_dict.get('id'):
+                raise ValueError('bulk_put: every record of put_list must have an id, found %s...' % put_dict)
+
+        def put_object(put_dict):
+            response_dict = self.put_json_request(url.rstrip('/') + '/' + str(put_dict['id']), put_dict,
+                                                  responses_dict=responses_dict)
+            return tree_helpers.get_bulk_result(response_dict, 'updated', 200)
+
+        max_concurrency = int(sd(locals(), 'max_concurrency', self))
+        results = self._map_concurrent(put_object, put_list, max_concurrency)
+        return tree_helpers.get_bulk_results_by_id([str(put_dict['id']) for put_dict in put_list], results,
+                                                   'bulk_put', url)
+
+    def bulk_delete(self, url=None, id_list=None, responses_dict=None, max_concurrency=None):
+
+        """Deletes the objects in id_list, each with a DELETE of url/<id>.  Up to max_concurrency DELETEs are in
+        flight, limited by the adaptive concurrency window and paced by the leaf's rate limiter.
+
+        *****Inherited from RestBase...*****
+
+        Returns - An OrderedDict of result dictionaries by object id, in id_list order.  Each result holds the
+        status ('deleted' or 'failed'), the status_code and the error text.
+
+        *Parameters*
+
+        url: string, keyword, default=None
+            The url of the collection holding the objects.
+        id_list: list, keyword, default=None
+            The ids of the objects to DELETE.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of DELETEs in flight.  Defaults to the leaf's default_max_concurrency.
+        """
+
+        def delete_object(object_id):
+            response_dict = self.delete_json_request(url.rstrip('/') + '/' + str(object_id),
+                                                     responses_dict=responses_dict)
+            return tree_helpers.get_bulk_result(response_dict, 'deleted', 200)
+
+        max_concurrency = int(sd(locals(), 'max_concurrency', self))
+        results = self._map_concurrent(delete_object, id_list, max_concurrency)
+        return tree_helpers.get_bulk_results_by_id([str(object_id) for object_id in id_list], results,
+                                                   'bulk_delete', url)
+
+    def get_json_request(self, url, responses_dict=None, use_response_cache=False):
 
         """Generic wrapper for a REST API GET request.
 
@@ -320,6 +985,8 @@ class RestBase(object):
         responses_dict: dictionary, keyword, default=None
             Allows the caller to override the default behavior to store responses in the self.responses_dict.  Useful
             if caller would like to keep the responses isolated.
+        use_response_cache: boolean, keyword, default=False
+            If set to True, a fresh response in the leaf's response cache is returned without a new request.
         """
 
         if responses_dict is None:
@@ -332,12 +999,12 @@ class RestBase(object):
             self._request_wrapper(recursed=False, url=url,
                                   responses_dict=responses_dict, headers=self.request_headers,
                                   method='get', credentials_dict=self.credentials_dict, verify=self.verify,
-                                  success_status_code=200)
+                                  success_status_code=200, use_response_cache=use_response_cache)
         return response_dict
 
     def get_all_items(self, url, use_cache=True, end_path_regex=None, include_filter_regex=None,
                       exclude_filter_regex=None, stop_on_error=False, filtered=False, cache_hit=False,
-                      get_item_limit=None, responses_dict=None):
+                      get_item_limit=None, responses_dict=None, parallel_pages=False, max_concurrency=None):
 
         """Performs a get to retrieve the "Items" listing for the url.
 
@@ -367,6 +1034,12 @@ class RestBase(object):
         responses_dict: dictionary, keyword, default=None
             Allows the caller to override the default behavior to store responses in the self.responses_dict.  Useful
             if caller would like to keep the responses isolated.
+        parallel_pages: boolean, keyword, default=False
+            If set to True and the first response carries paging metadata (see _get_paging_info), the urls of all
+            remaining pages are computed from it and requested concurrently.  Responses are stored in page order.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of page requests in flight when parallel_pages is True.  Defaults to the leaf's
+            default_max_concurrency.
         """
 
         if responses_dict is None:
@@ -388,12 +1061,24 @@ class RestBase(object):
                                       API_path_keywords_list=self._API_path_keywords_list,
                                       get_item_limit=sd(locals(), 'get_item_limit', self))
 
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             if status and self.persist_responses:
                 self.response_counter += 1
                 tree_helpers.persist_response(self.leaf_dir, self.path_root, self.response_counter, response_dict)
 
+            if parallel_pages and next_url is not None:
+                # Only the first page is used to plan the remaining pages...
+                parallel_pages = False
+                page_urls = self._get_remaining_page_urls(response_dict)
+                if page_urls:
+                    next_url = self._get_pages_concurrent(page_urls, responses_dict=responses_dict,
+                                                          include_filter_regex=include_filter_regex,
+                                                          exclude_filter_regex=exclude_filter_regex,
+                                                          use_cache=use_cache, stop_on_error=stop_on_error,
+                                                          get_item_limit=sd(locals(), 'get_item_limit', self),
+                                                          max_concurrency=sd(locals(), 'max_concurrency', self))
+
             if next_url is not None:
                 url = next_url
             else:
@@ -401,6 +1086,194 @@ class RestBase(object):
 
         return responses_dict
 
+    def iter_items(self, url, use_cache=False, include_filter_regex=None, exclude_filter_regex=None,
+                   stop_on_error=False, get_item_limit=None, responses_dict=None, store_responses=False):
+
+        """Generator yielding the decoded items of the url listing page by page.
+
+        *****Inherited from RestBase...*****
+
+        Unlike get_all_items, pages are requested as the caller consumes the items and, unless store_responses is
+        True, page responses are discarded once their items have been yielded.  Memory use stays constant no matter
+        how large the collection is.
+
+        Returns - A generator of item dictionaries (see _get_page_items).
+
+        *Parameters*
+
+        url : string
+            The url for which to retrieve the items list.  url can include the host prefix or start from the resource
+            path.  If the host prefix is missing, it will be added automatically.
+        use_cache: boolean, keyword, default=False
+            If set to True, any path that has already been requested will not generate a new request.  Only used
+            when store_responses is True.
+        include_filter_regex: string, keyword, default=None
+            A regex string defining which urls to include.
+        exclude_filter_regex: string, keyword, default=None
+            A regex string defining which urls to exclude.
+        stop_on_error: boolean, keyword, default=False
+            If set to True, halt when a non positive status code response is received.
+        get_item_limit: integer, keyword, default=25
+            Specifies the number of items to return for each GET request.
+        responses_dict: dictionary, keyword, default=None
+            The dictionary to store responses in when store_responses is True.  Defaults to self.responses_dict.
+        store_responses: boolean, keyword, default=False
+            If set to True, page responses are stored in responses_dict and persisted like get_all_items.
+        """
+
+        if store_responses and responses_dict is None:
+            responses_dict = self.responses_dict
+
+        if self.path_root not in url:
+            url = self.path_root + url
+
+        while url is not None:
+            logger.debug('iter_items: requesting url %s' % (url))
+            page_responses = responses_dict if store_responses else {}
+            response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url = \
+                self._request_wrapper(recursed=False, url=url, responses_dict=page_responses,
+                                      headers=self.request_headers,
+                                      method='get', credentials_dict=self.credentials_dict,
+                                      verify=self.verify, success_status_code=200,
+                                      include_filter_regex=include_filter_regex,
+                                      exclude_filter_regex=exclude_filter_regex,
+                                      use_cache=use_cache and store_responses, stop_on_error=stop_on_error,
+                                      API_path_keywords_list=self._API_path_keywords_list,
+                                      get_item_limit=sd(locals(), 'get_item_limit', self))
+
+            if store_responses and status and self.persist_responses:
+                self.response_counter += 1
+                tree_helpers.persist_response(self.leaf_dir, self.path_root, self.response_counter, response_dict)
+
+            for item in self._get_page_items(response_dict):
+                yield item
+
+            url = next_url
+
+    def _get_page_items(self, response_dict):
+        """Optional override in parent class.  Returns the list of items in a list response.
+
+        *****Inherited from RestBase...*****
+
+        The default implementation handles the 'items' list (FMC, FDM, ASA), the 'data' list (AMP) and the
+        'data'/'items' list (ThreatGrid).
+
+        *Parameters*
+
+        response_dict: dictionary
+            The page response.
+        """
+
+        json_dict = response_dict['json_dict']
+        if isinstance(json_dict, list):
+            return json_dict
+        if not isinstance(json_dict, dict):
+            return []
+        if isinstance(json_dict.get('items'), list):
+            return json_dict['items']
+        data = json_dict.get('data')
+        if isinstance(data, list):
+            return data
+        if isinstance(data, dict) and isinstance(data.get('items'), list):
+            return data['items']
+        return []
+
+    def _get_paging_info(self, response_dict):
+        """Optional override in parent class.  Returns the paging metadata of a list response.
+
+        *****Inherited from RestBase...*****
+
+        Returns - An (offset, limit, total) tuple, or None if the response has no usable paging metadata.  The default
+        implementation reads the FMC/FDM style 'paging' node (offset, limit and count).
+
+        *Parameters*
+
+        response_dict: dictionary
+            The response to read.
+        """
+
+        json_dict = response_dict['json_dict']
+        if not isinstance(json_dict, dict) or not isinstance(json_dict.get('paging'), dict):
+            return None
+        paging = json_dict['paging']
+        try:
+            return int(paging['offset']), int(paging['limit']), int(paging['count'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _get_remaining_page_urls(self, response_dict):
+        """Computes the urls of all pages after response_dict from its paging metadata.
+
+        *****Inherited from RestBase...*****
+
+        Returns - A list of page urls in offset order, or None if the paging metadata is missing.
+
+        *Parameters*
+
+        response_dict: dictionary
+            The first page response.
+        """
+
+        paging_info = self._get_paging_info(response_dict)
+        if paging_info is None:
+            return None
+        offset, limit, total = paging_info
+        if limit <= 0:
+            return None
+        page_url = tree_helpers.set_url_parameter(response_dict['url'], 'limit', limit)
+        page_urls = []
+        for page_offset in range(offset + limit, total, limit):
+            page_urls.append(tree_helpers.set_url_parameter(page_url, 'offset', page_offset))
+        return page_urls
+
+    def _get_pages_concurrent(self, page_urls, responses_dict=None, include_filter_regex=None,
+                              exclude_filter_regex=None, use_cache=True, stop_on_error=False, get_item_limit=None,
+                              max_concurrency=None):
+        """Requests page_urls concurrently and stores the responses in responses_dict in page order.
+
+        *****Inherited from RestBase...*****
+
+        Each page goes through the leaf's _request_wrapper, so pages are paced by the leaf's rate limiter.  The number
+        of pages in flight follows the adaptive concurrency window.
+
+        Returns - The next url reported by the last page.  Normally None, but set if items were added after the first
+        page was read.
+
+        *Parameters*
+
+        page_urls: list
+            The page urls in offset order.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of page requests in flight.  Defaults to the leaf's default_max_concurrency.
+        """
+
+        max_concurrency = max(int(sd(locals(), 'max_concurrency', self)), 1)
+
+        def get_page(page_url):
+            page_result = self._request_wrapper(recursed=False, url=page_url, responses_dict=responses_dict,
+                                                headers=self.request_headers,
+                                                method='get', credentials_dict=self.credentials_dict,
+                                                verify=self.verify, success_status_code=200,
+                                                include_filter_regex=include_filter_regex,
+                                                exclude_filter_regex=exclude_filter_regex,
+                                                use_cache=use_cache, stop_on_error=stop_on_error,
+                                                API_path_keywords_list=self._API_path_keywords_list,
+                                                get_item_limit=get_item_limit)
+            return page_result
+
+        logger.debug('get_pages_concurrent: requesting %s pages' % len(page_urls))
+        next_url = None
+        # _map_concurrent returns the results in page order...
+        for page_result in self._map_concurrent(get_page, page_urls, max_concurrency):
+            response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url = page_result
+            # Pages complete in any order, move each one to the end so responses_dict is in page order...
+            responses_dict[response_dict['url']] = responses_dict.pop(response_dict['url'])
+            if status and self.persist_responses:
+                self.response_counter += 1
+                tree_helpers.persist_response(self.leaf_dir, self.path_root, self.response_counter,
+                                              response_dict)
+        return next_url
+
     def _recurse_API_child_gets(self, url, use_cache=True, end_path_regex=None, include_filter_regex=None,
                                 exclude_filter_regex=None, stop_on_error=False, filtered=False, cache_hit=False,
                                 get_item_limit=None, responses_dict=None, parent_url='', parent_recursion_stack=[]):
@@ -459,7 +1332,7 @@ class RestBase(object):
                                       API_path_keywords_list=self._API_path_keywords_list,
                                       get_item_limit=sd(locals(), 'get_item_limit', self))
 
-            logger.debug(pformat(response_dict))
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
 
             child_urls = []
             child_types = []
@@ -492,9 +1365,115 @@ class RestBase(object):
             else:
                 break
 
+    def _walk_API_child_gets_concurrent(self, urls, use_cache=True, include_filter_regex=None,
+                                        exclude_filter_regex=None, stop_on_error=False, get_item_limit=None,
+                                        responses_dict=None, max_concurrency=None):
+
+        """Breadth first, concurrent alternative to _recurse_API_child_gets.  Normally not called directly but from a
+        wrapper method.  Begins at the given API url paths and GET walks the paths and child paths until complete.
+
+        *****Inherited from RestBase...*****
+
+        Urls waiting to be requested are held in a work queue and every url is requested once.  Up to max_concurrency
+        GETs, or the adaptive concurrency window when adaptive_concurrency is True, are in flight at a time, each
+        through the leaf's _request_wrapper so rate limit handling and token refresh still apply.  Child url discovery
+        and response persistence run in the calling thread.  The responses_dict produced, including the child_urls
+        and child_types annotations, is the same as the one produced by _recurse_API_child_gets.
+
+        Returns a Python dictionary object containing the response results for all url path GETs.
+
+        *Parameters*
+
+        urls : list
+            The starting urls of the paths to walk.  If the host prefix is missing, it will be added automatically.
+        use_cache: boolean, keyword, default=False
+            If set to True, any path that has already been requested will not generate a new request
+        include_filter_regex: string, keyword, default=None
+            A regex string defining which urls to include in walk.
+        exclude_filter_regex: string, keyword, default=None
+            A regex string defining which urls to exclude from walk.
+        stop_on_error: boolean, keyword, default=False
+            If set to True, walk will halt when a non positive status code response is received.
+        get_item_limit: integer, keyword, default=25
+            Specifies the number of items to return for each GET request.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.  Useful
+            if caller would like to keep the responses isolated.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of GET requests in flight.  Defaults to the leaf's default_max_concurrency.
+        """
+
+        if responses_dict is None:
+            responses_dict = self.responses_dict
+
+        get_item_limit = sd(locals(), 'get_item_limit', self)
+        max_concurrency = max(int(sd(locals(), 'max_concurrency', self)), 1)
+
+        # Work queue of (url, parent_url) tuples...
+        frontier = deque()
+        for url in urls:
+            if self.path_root not in url:
+                url = self.path_root + url
+            frontier.append((url, ''))
+        visited = set()
+        in_flight = {}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while frontier or in_flight:
+                while frontier and len(in_flight) < self._get_concurrency_window(max_concurrency):
+                    url, parent_url = frontier.popleft()
+                    if url in visited:
+                        continue
+                    visited.add(url)
+                    logger.debug('walk_API_child_gets_concurrent: requesting url %s' % (url))
+                    future = executor.submit(self._request_wrapper, recursed=False, url=url,
+                                             responses_dict=responses_dict, headers=self.request_headers,
+                                             method='get', credentials_dict=self.credentials_dict,
+                                             verify=self.verify, success_status_code=200,
+                                             include_filter_regex=include_filter_regex,
+                                             exclude_filter_regex=exclude_filter_regex,
+                                             use_cache=use_cache, stop_on_error=stop_on_error,
+                                             API_path_keywords_list=self._API_path_keywords_list,
+                                             get_item_limit=get_item_limit)
+                    in_flight[future] = (url, parent_url)
+
+                if not in_flight:
+                    continue
+
+                done, not_done = concurrent.futures.wait(list(in_flight.keys()),
+                                                         return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    url, parent_url = in_flight.pop(future)
+                    response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url = future.result()
+
+                    child_urls = []
+                    child_types = []
+                    if response_dict['json_dict']:
+                        child_urls, child_types = self._get_child_urls(response_dict, url)
+                    response_dict['child_urls'] = child_urls
+                    response_dict['child_types'] = child_types
+
+                    if status and self.persist_responses:
+                        self.response_counter += 1
+                        tree_helpers.persist_response(self.leaf_dir, self.path_root, self.response_counter,
+                                                      response_dict)
+
+                    for child_url in child_urls:
+                        if child_url:
+                            # Check to make sure we aren't in a circular reference situation...
+                            if child_url == parent_url:
+                                logger.warning('Circular reference detected for url %s' % url)
+                                continue
+                            frontier.append((child_url, url))
+
+                    if next_url is not None:
+                        frontier.append((next_url, parent_url))
+
+        return responses_dict
+
     def walk_API_path_gets(self, url, end_path_regex=None, include_filter_regex=None, exclude_filter_regex=None,
                            use_cache=True, stop_on_error=False, get_item_limit=None,
-                           responses_dict=None):
+                           responses_dict=None, max_concurrency=None):
 
         """Begins at given API url path and recursively GET walks path and child paths until complete.
 
@@ -524,6 +1503,9 @@ class RestBase(object):
         responses_dict: dictionary, keyword, default=None
             Allows the caller to override the default behavior to store responses in the self.responses_dict.  Useful
             if caller would like to keep the responses isolated.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of GET requests in flight.  Values above 1 select the concurrent breadth first walk.
+            Defaults to the leaf's default_max_concurrency.
         """
 
         logger.debug('walk_API_path_gets calling recurse_API_child_gets with url %s...' % (url))
@@ -533,6 +1515,16 @@ class RestBase(object):
 
         if self.path_root not in url:
             url = self.path_root + url
+
+        max_concurrency = int(sd(locals(), 'max_concurrency', self))
+        if max_concurrency > 1:
+            return self._walk_API_child_gets_concurrent([url], include_filter_regex=include_filter_regex,
+                                                        exclude_filter_regex=exclude_filter_regex,
+                                                        use_cache=use_cache, stop_on_error=stop_on_error,
+                                                        get_item_limit=sd(locals(), 'get_item_limit', self),
+                                                        responses_dict=responses_dict,
+                                                        max_concurrency=max_concurrency)
+
         self._recurse_API_child_gets(url, include_filter_regex=include_filter_regex,
                                      exclude_filter_regex=exclude_filter_regex,
                                      use_cache=use_cache, stop_on_error=stop_on_error,
@@ -541,7 +1533,7 @@ class RestBase(object):
 
         return responses_dict
 
-    def _collect_responses(self, url, response_dict, responses_dict):
+    def _collect_responses(self, url, response_dict, responses_dict, use_response_cache=False):
 
         """Utility method called by wrappers to request all pages for a given url.  Normally not called directly.
 
@@ -561,11 +1553,14 @@ class RestBase(object):
         responses_dict: dictionary, keyword, default=None
             Allows the caller to override the default behavior to store responses in the self.responses_dict.  Useful
             if caller would like to keep the responses isolated.
+        use_response_cache: boolean, keyword, default=False
+            If set to True, pages found in the leaf's response cache are not requested again.
         """
 
         while True:
-            response_struct = self.get_json_request(url, responses_dict=responses_dict)
-            logger.debug(pformat(response_struct))
+            response_struct = self.get_json_request(url, responses_dict=responses_dict,
+                                                    use_response_cache=use_response_cache)
+            logger.debug('%s', tree_helpers.LazyPformat(response_struct))
             response_dict.update({url: response_struct})
             next_link = tree_helpers.get_objectpath_values(self.next_link_query,
                                                            response_struct['json_dict'])
@@ -576,14 +1571,20 @@ class RestBase(object):
                 break
         return response_dict
 
-    def post_csv_template(self, url=None, file_path=None):
+    def post_csv_template(self, url=None, file_path=None, responses_dict=None, batch_size=1000, max_concurrency=None,
+                          validate_function=None, progress_callback=None):
 
         """Reads a csv file containing flatlined records (flattened with output_transforms.flatten_json(json_dict) and
         posts each record individually to the target.
 
         *****Inherited from RestBase...*****
 
-        Returns - No return value.
+        The file is streamed (see cmaple.csv_import): records are read, expanded, validated and serialized on a
+        reader thread while the previous batch is posted, so memory stays flat for large files.  The records of a
+        batch are posted with up to max_concurrency POSTs in flight.
+
+        Returns - The import statistics: rows read, records invalid, posted and failed, batches, seconds, rows and
+        records per second and the failed rows with their errors.
 
         *Parameters*
 
@@ -591,24 +1592,80 @@ class RestBase(object):
             The target url to post records.
         file_path: string, keyword, default=None
             The full path to the file containing the csv records.
+        responses_dict: dictionary, keyword, default=None
+            Allows the caller to override the default behavior to store responses in the self.responses_dict.  The
+            last response is stored.
+        batch_size: integer, keyword, default=1000
+            The number of records read ahead and posted as one batch.
+        max_concurrency: integer, keyword, default=None
+            The maximum number of POSTs in flight.  Defaults to the leaf's default_max_concurrency.
+        validate_function: function, keyword, default=None
+            Called with each expanded record, returns None if it is valid or an error string.  Invalid records are
+            not posted.
+        progress_callback: function, keyword, default=None
+            Called with the import statistics after each batch.
         """
 
-        csv_file = open(file_path,'r')
-        csv_list = []
-        for line in csv_file.readlines():
-            if not line == '\n':
-                csv_list.append(line.strip())
-        flatlined_list = output_transforms.csv_to_flatlined(csv_list)
-        for flatlined in flatlined_list:
-            expanded = output_transforms.expand_flattened_json(flatlined)
-            expanded_json = json.dumps(expanded)
-            response_dict, status, include_filtered, exclude_filtered, cache_hit, next_url = \
-                self._request_wrapper(recursed=False, url=url, json_body=expanded_json,
-                                      responses_dict=self.responses_dict, headers=self.request_headers,
-                                      method='post', credentials_dict=self.credentials_dict, verify=self.verify,
-                                      success_status_code=201)
+        if responses_dict is None:
+            responses_dict = self.responses_dict
+
+        if self.path_root not in url:
+            url = self.path_root + url
+        max_concurrency = int(sd(locals(), 'max_concurrency', self))
+
+        def post_record(json_body):
+            # Each record gets its own responses dictionary, records in flight share the url...
+            response_dict = self._request_wrapper(recursed=False, url=url, json_body=json_body, responses_dict={},
+                                                  headers=self.request_headers, method='post',
+                                                  credentials_dict=self.credentials_dict, verify=self.verify,
+                                                  success_status_code=201)[0]
+            responses_dict[url] = response_dict
+            logger.debug('%s', tree_helpers.LazyPformat(response_dict))
+            return tree_helpers.get_bulk_result(response_dict, 'created', 201)
+
+        def post_batch(json_bodies):
+            return self._map_concurrent(post_record, json_bodies, max_concurrency)
+
+        return self._stream_csv_post(url, file_path, post_batch, batch_size, validate_function, progress_callback)
+
+    def _stream_csv_post(self, url, file_path, post_batch, batch_size, validate_function, progress_callback):
+        """Streams the records of a csv template to post_batch in batches of batch_size.  Used by post_csv_template.
+
+        *****Inherited from RestBase...*****
+
+        Returns - The import statistics, see csv_import.ImportProgress.get_stats.
+
+        *Parameters*
+
+        url: string
+            The target url, for logging.
+        file_path: string
+            The full path to the file containing the csv records.
+        post_batch: function
+            Called with a list of post body json strings, returns a result dictionary for each (see
+            tree_helpers.get_bulk_result).
+        batch_size: integer
+            The number of records in a batch.
+        validate_function: function
+            Called with each expanded record, returns None if it is valid or an error string.
+        progress_callback: function
+            Called with the import statistics after each batch.
+        """
 
-            logger.debug(pformat(response_dict))
+        progress = csv_import.ImportProgress(progress_callback=progress_callback)
+        batches = csv_import.iter_csv_batches(file_path, batch_size=batch_size, validate_function=validate_function,
+                                              progress=progress)
+        for batch in csv_import.prefetch(batches):
+            results = post_batch([json_body for row_number, json_body in batch])
+            progress.record_batch([row_number for row_number, json_body in batch], results)
+
+        stats = progress.get_stats()
+        if stats['records_failed'] or stats['records_invalid']:
+            logger.warning('post_csv_template: %s records failed and %s were invalid for url %s' %
+                           (stats['records_failed'], stats['records_invalid'], url))
+        logger.info('post_csv_template: posted %s of %s rows from %s to url %s in %.1f seconds' %
+                    (stats['records_posted'], stats['rows_read'], file_path, url, stats['seconds']))
+        return stats
 
     def write_csv_template_from_response(self, response_dict=None, field_filter_regex=None, file=sys.stdout):
 
@@ -708,7 +1765,7 @@ class RestBase(object):
             self.response_counter += 1
             tree_helpers.persist_response(self.leaf_dir, self.path_root, self.response_counter, response_dict)
 
-        logger.debug(pformat(responses_dict))
+        logger.debug('%s', tree_helpers.LazyPformat(responses_dict))
         return responses_dict
 
     def query_json_field_from_url(self, query_url=None, json_to_query=None):
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+single_flight.py implements request coalescing for the REST leafs.  When
+several threads ask for the same key at the same time only the first
+(the leader) runs the request; the others wait for it and share its
+result.  Nothing is kept once the leader finishes, so a later request for
+the key is sent again (see response_cache.py for reuse over time).
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import re
+import threading
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.completed = False
+        self.followers = 0
+
+
+# Not traced, do is called for every request...
+@logged(logger)
+class SingleFlight(object):
+    """Thread safe coalescing of concurrent calls with the same key.
+
+    """
+
+    def __init__(self):
+
+        """__init__ creates a SingleFlight with no calls in flight.
+
+        """
+
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0}
+
+    def do(self, key, function):
+        """Returns function() for key, or the result of the call already in flight for key.  An Exception raised by
+        the leader is raised in every caller.  If the leader is interrupted by anything else (KeyboardInterrupt,
+        SystemExit, ...) it propagates in the leader only and each waiting caller runs function() itself.
+
+        Returns - A tuple of the result and True if it was shared from another caller's call.
+        """
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.stats['leaders'] += 1
+                leader = True
+            else:
+                call.followers += 1
+                self.stats['followers'] += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if not call.completed:
+                return function(), False
+            return call.result, True
+
+        try:
+            call.result = function()
+            call.completed = True
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def get_stats(self):
+        """Returns a copy of the counters with the number of calls in flight.
+
+        """
+
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
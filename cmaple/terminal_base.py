@@ -38,13 +38,15 @@ from pprint import pprint, pformat
 import logging
 from autologging import logged, traced
 from autologging import TRACE
-# fabric and invoke imports...
+# fabric is imported on connect, it is slow to import...
 import time
 
 
 # Create a logger...
 logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
 # Define global variables
+# Defaults for the optional leaf kwargs handled by TerminalBase...
+_TERMINAL_BASE_DEFAULTS = {'lazy_restore': False, 'lazy_restore_cache_size': 1024}
 
 
 @logged(logger)
@@ -65,8 +67,22 @@ class TerminalBase(object):
 
         """__init__ TerminalBase inherits arguments from the parent class.  All argument validation is
         performed by the parent class.
+
+        The following optional leaf kwargs are handled by TerminalBase.
+
+        *Parameters*
+
+        lazy_restore: boolean, keyword, default=False
+            If True, restore_responses loads only the index of persisted responses and decodes each response on
+            first access.
+        lazy_restore_cache_size: integer, keyword, default=1024
+            The number of decoded responses kept in memory when lazy_restore is True.
         """
 
+        for key, val in _TERMINAL_BASE_DEFAULTS.items():
+            if key not in self.__dict__:
+                self.__dict__[key] = val
+
         # Override these in the parent class...
         self.credentials_dict = {}
 
@@ -78,7 +94,11 @@ class TerminalBase(object):
 
         self.response_counter = 0
         if self.restore_responses:
-            tree_helpers.restore_responses(self.leaf_dir, self.responses_dict)
+            if self.lazy_restore:
+                self.responses_dict = tree_helpers.restore_lazy_responses(self.leaf_dir,
+                                                                          max_cached=self.lazy_restore_cache_size)
+            else:
+                tree_helpers.restore_responses(self.leaf_dir, self.responses_dict)
 
     def _connection_wrapper(self):
         """Must override in parent class
@@ -118,6 +138,8 @@ class TerminalBase(object):
             The parameters passed through by fabric to paramiko ssh.
         """
 
+        from fabric import Connection
+
         connect_kwargs = {'password': kwargs['ssh_password'],
                           }
 
@@ -37,10 +37,8 @@ from pprint import pprint, pformat
 import logging
 from autologging import logged, traced
 from autologging import TRACE
-# paramiko imports...
+# paramiko, paramiko_expect and multissh are imported by the methods using them...
 import traceback
-import paramiko
-from paramiko_expect import SSHClientInteraction
 
 import time
 
@@ -172,6 +170,8 @@ class ThreadingServerGroup(SerialServerGroup):
 
     def run_cmd(self, cmd):
 
+        from multissh import MultiSSHRunner
+
         if self.multissh_runner is None:
             self.multissh_runner = MultiSSHRunner(processes=len(self.group))
         for server in self.group:
@@ -251,6 +251,9 @@ class CMD(object):
         return new_string
 
     def run_cmd(self, group):
+        # paramiko is imported on first connect, it is slow to import...
+        import paramiko
+        from paramiko_expect import SSHClientInteraction
         # Use SSH client to login
         results = {}
         error_encountered = False
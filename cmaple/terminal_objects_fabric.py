@@ -37,11 +37,7 @@ from pprint import pprint, pformat
 import logging
 from autologging import logged, traced
 from autologging import TRACE
-# fabric and invoke imports...
-from fabric import Connection
-from fabric.tasks import task, Task
-from fabric.group import SerialGroup, ThreadingGroup
-from invoke import Responder
+# fabric and invoke are imported by the methods using them, they are slow to import...
 
 import time
 
@@ -142,11 +138,14 @@ class SerialServerGroup(object):
         """
 
         # Override these in the parent class...
+        from fabric.group import SerialGroup
+
         self.name = name
         self.group = SerialGroup()
         self.connections = []
 
     def add_server(self, server, user, credential):
+        from fabric import Connection
 
         connection = Connection(server.host, user=user.user, connect_kwargs=credential.connect_kwargs)
         self.group.append(connection)
@@ -297,6 +296,7 @@ class CMDWatcher(object):
         self.name = name
         self.pattern = pattern
         self.response = response
+        from invoke import Responder
         self.responder = Responder(pattern=pattern, response=response)
 
 
@@ -314,6 +314,7 @@ class CMDResponder(object):
 
         # Override these in the parent class...
         self.name = name
+        from invoke import Responder
         self.responder = Responder(pattern=pattern, response=response)
 
 
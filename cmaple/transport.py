@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+"""
+Created on May 20, 2018
+
+@author: rhindere@cisco.com
+
+transport.py implements the pluggable transports a REST leaf can send
+its requests through (see the RestBase transport kwarg).  A transport is
+any object with get, post, put and delete methods taking the
+requests.Session keyword arguments and returning an object with
+status_code, headers, text, content and close.
+
+RecordingTransport sends requests through a pooled session and appends
+every request and response to a cassette file.  ReplayTransport answers
+requests from a cassette without any network access.  The cassette is a
+JSON lines file, one interaction per line, so it can be inspected,
+edited and concatenated with standard tools.  fmc/mock_fmc_server.py
+can also serve a cassette over HTTP.
+
+Copyright (c) 2018 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.0 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied."""
+
+__author__ = "Ron Hinderer (rhindere@cisco.com)"
+__version__ = "0.1"
+__copyright__ = "Copyright (c) 2018 Cisco and/or its affiliates."
+__license__ = "Cisco DEVNET"
+
+import os
+import re
+import json
+import atexit
+import threading
+import urllib.parse
+from collections import OrderedDict
+import logging
+from autologging import logged, traced
+
+# Create a logger...
+logger = logging.getLogger(re.sub('\.[^.]+$', '', __name__))
+
+# Define global variables...
+_CASSETTE_FILE_NAME = 'cassette.jsonl'
+# Headers whose values are never written to a cassette...
+_REDACTED_HEADERS = ('authorization', 'x-auth-access-token', 'x-auth-refresh-token')
+# Written in place of a redacted header value, the header is kept so replayed authentication still finds it...
+_REDACTED_VALUE = 'REDACTED'
+
+
+@logged(logger)
+@traced(logger)
+def get_cassette_path(leaf_dir):
+    """Returns the default cassette path for leaf_dir.
+
+    """
+
+    return os.path.join(leaf_dir, _CASSETTE_FILE_NAME)
+
+
+@logged(logger)
+@traced(logger)
+def redact_headers(headers):
+    """Returns a copy of the headers dictionary with the values of the _REDACTED_HEADERS replaced.
+
+    """
+
+    return {key: _REDACTED_VALUE if key.lower() in _REDACTED_HEADERS else value
+            for key, value in (headers or {}).items()}
+
+
+def get_interaction_key(method, url):
+    """Returns the key interactions are matched on: the lower case method and the url path and sorted query.  The
+    scheme and host are ignored so a cassette can be replayed against any host.
+
+    """
+
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path.rstrip('/') if len(parts.path) > 1 else parts.path
+    return method.lower(), path + ('?' + query if query else '')
+
+
+@logged(logger)
+@traced(logger)
+def read_cassette(cassette_path):
+    """Returns the list of interaction dictionaries in cassette_path.
+
+    """
+
+    interactions = []
+    with open(cassette_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                interactions.append(json.loads(line))
+    return interactions
+
+
+class CassetteResponse(object):
+    """A response read from a cassette, with the parts of requests.Response used by cmaple.
+
+    """
+
+    def __init__(self, url, status_code, headers, text):
+        # Imported here, requests is only needed once a cassette is replayed...
+        from requests.structures import CaseInsensitiveDict
+
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.ok = status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def close(self):
+        pass
+
+
+# Not traced, the request methods are called for every request...
+@logged(logger)
+class RecordingTransport(object):
+    """Sends requests through session and appends each interaction to a cassette.
+
+    """
+
+    def __init__(self, session, cassette_path, append=False):
+
+        """__init__ opens the cassette for writing.
+
+        *Parameters*
+
+        session: requests.Session
+            The session requests are sent through (see tree_helpers.get_pooled_session).
+        cassette_path: string
+            The path of the cassette file.
+        append: boolean, keyword, default=False
+            If True, interactions are added to an existing cassette, otherwise the cassette is replaced.
+        """
+
+        self.session = session
+        self.cassette_path = cassette_path
+        self.interactions = 0
+        self._lock = threading.Lock()
+        self._file = open(cassette_path, 'a' if append else 'w')
+        atexit.register(self.close)
+
+    @property
+    def adapters(self):
+        return self.session.adapters
+
+    def request(self, method, url=None, headers=None, data=None, **kwargs):
+        r = getattr(self.session, method)(url=url, headers=headers, data=data, **kwargs)
+        interaction = {'method': method, 'url': url,
+                       'request_headers': redact_headers(headers),
+                       'request_body': data if isinstance(data, str) else None,
+                       'status_code': r.status_code, 'headers': redact_headers(r.headers), 'body': r.text}
+        line = json.dumps(interaction) + '\n'
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+                self._file.flush()
+                self.interactions += 1
+        return r
+
+    def get(self, url=None, **kwargs):
+        return self.request('get', url=url, **kwargs)
+
+    def post(self, url=None, **kwargs):
+        return self.request('post', url=url, **kwargs)
+
+    def put(self, url=None, **kwargs):
+        return self.request('put', url=url, **kwargs)
+
+    def delete(self, url=None, **kwargs):
+        return self.request('delete', url=url, **kwargs)
+
+    def close(self):
+        """Closes the cassette file.
+
+        """
+
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# Not traced, the request methods are called for every request...
+@logged(logger)
+class ReplayTransport(object):
+    """Answers requests from a cassette.
+
+    Interactions are matched on method, path and query (see get_interaction_key).  When a request was recorded
+    several times the responses are replayed in recorded order and the last one is repeated.  Requests missing from
+    the cassette are answered with a 404.
+    """
+
+    adapters = {}
+
+    def __init__(self, cassette_path):
+
+        """__init__ loads the cassette.
+
+        *Parameters*
+
+        cassette_path: string
+            The path of the cassette file.
+        """
+
+        self.cassette_path = cassette_path
+        self.stats = {'replayed': 0, 'missing': 0}
+        self._interactions = OrderedDict()
+        self._positions = {}
+        self._lock = threading.Lock()
+        for interaction in read_cassette(cassette_path):
+            key = get_interaction_key(interaction['method'], interaction['url'])
+            self._interactions.setdefault(key, []).append(interaction)
+
+    def request(self, method, url=None, **kwargs):
+        key = get_interaction_key(method, url)
+        with self._lock:
+            interactions = self._interactions.get(key)
+            if not interactions:
+                self.stats['missing'] += 1
+                logger.warning('No %s interaction for url %s in cassette %s' % (method, url, self.cassette_path))
+                return CassetteResponse(url, 404, {'Content-Type': 'application/json'},
+                                        json.dumps({'error': 'Not found in cassette'}))
+            position = self._positions.get(key, 0)
+            self._positions[key] = min(position + 1, len(interactions) - 1)
+            self.stats['replayed'] += 1
+        interaction = interactions[position]
+        return CassetteResponse(url, interaction['status_code'], interaction['headers'], interaction['body'])
+
+    def get(self, url=None, **kwargs):
+        return self.request('get', url=url, **kwargs)
+
+    def post(self, url=None, **kwargs):
+        return self.request('post', url=url, **kwargs)
+
+    def put(self, url=None, **kwargs):
+        return self.request('put', url=url, **kwargs)
+
+    def delete(self, url=None, **kwargs):
+        return self.request('delete', url=url, **kwargs)
+
+
+@logged(logger)
+@traced(logger)
+def get_transport(transport, session, cassette_path):
+    """Returns the transport selected by the RestBase transport kwarg.
+
+    *Parameters*
+
+    transport: string or object
+        'record', 'replay' or a transport object, which is returned unchanged.
+    session: requests.Session
+        The leaf's pooled session, used by 'record'.
+    cassette_path: string
+        The cassette file for 'record' and 'replay'.
+    """
+
+    if transport == 'record':
+        logger.info('Recording requests to cassette %s' % cassette_path)
+        return RecordingTransport(session, cassette_path)
+    if transport == 'replay':
+        logger.info('Replaying requests from cassette %s' % cassette_path)
+        return ReplayTransport(cassette_path)
+    if isinstance(transport, str):
+        raise ValueError('Unknown transport "%s", expected "record", "replay" or a transport object' % transport)
+    return transport
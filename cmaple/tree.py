@@ -59,6 +59,8 @@ class CMapleTree:
                  logging_level='INFO',
                  log_file_mode='w',
                  log_file_name='cmaple.log',
+                 production_mode=False,
+                 progress_interval=10,
                  ):
 
         """__init__ receives a kwargs dict to define parameters.  This allows __init__ to pass these parameters
@@ -78,6 +80,11 @@ class CMapleTree:
             The desired logging level for the tree object (inherited by all leaf objects
         log_file_mode: string, keyword, default='w'
             The file mode for the log file.  Default is 'w' for write mode.
+        production_mode: boolean, keyword, default=False
+            If True, removes the @traced wrappers from all cmaple functions and methods and limits progress output to
+            one line every progress_interval seconds.  See cmaple.production.
+        progress_interval: number, keyword, default=10
+            The minimum number of seconds between progress lines in production mode.
         """
 
         # Setup the tree working directory
@@ -130,6 +137,11 @@ class CMapleTree:
         self.logging_level = logging_level
         self.log_file_mode = log_file_mode
         self.maple_tree_dir = maple_tree_dir
+        self.production_mode = production_mode
+
+        if production_mode:
+            import cmaple.production
+            cmaple.production.enable_production_mode(progress_interval=progress_interval)
 
     def add_leaf_instance(self, leaf_type=None, **kwargs):
 
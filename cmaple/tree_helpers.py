@@ -29,33 +29,127 @@ __license__ = "Cisco DEVNET"
 
 import ipaddress
 import socket
-import requests
+import urllib.parse
 import sys
 import os
 import json
-from pprint import pprint
+from pprint import pprint, pformat
 import re
 import logging
 import collections
 from collections import OrderedDict
 from autologging import logged, traced
 from autologging import TRACE
-from jsonpath_ng import jsonpath
-from jsonpath_ng.ext import parse
-import xmltodict
-import objectpath
+# requests, jsonpath_ng, objectpath, xmltodict and pytz are imported by the functions using them, importing them
+# here would add them to the startup of every cmaple script...
 import shelve
 from time import gmtime,strftime
+import time
+import threading
 from datetime import datetime, timedelta
 import calendar
-import pytz
 import _pickle
+import cmaple.response_store as response_store
 from functools import reduce  # forward compatibility for Python 3
+import functools
 import operator
 
 # Create a logger for this module...
 logger = logging.getLogger(re.sub('\.[^.]+$','',__name__))
 
+# Define global variables...
+# Compiled jsonpath queries and fast path lookups kept per query string...
+_QUERY_CACHE_SIZE = 512
+# $..field and $..field[*].field are evaluated without a query engine...
+_FAST_PATH_QUERY_REGEX = re.compile(r'^\$\.\.([A-Za-z_][A-Za-z0-9_]*)(?:\[\*\]\.([A-Za-z_][A-Za-z0-9_]*))?$')
+_JSONPATH_RESERVED_WORDS = {'where', 'wherenot', 'true', 'false'}
+_NOT_SET = object()
+_SCALAR_TYPES = frozenset([str, int, float, bool, type(None)])
+
+
+# Not traced, report is called for every request...
+@logged(logger)
+class ProgressReporter(object):
+    """Writes request progress to stderr.
+
+    With interval None every url is written as it is processed.  Otherwise a summary line with the request count, rate
+    and last url is written at most once every interval seconds.
+    """
+
+    def __init__(self, interval=None):
+
+        """__init__ creates a reporter.
+
+        *Parameters*
+
+        interval: number, keyword, default=None
+            The minimum number of seconds between progress lines.  None writes a line per url.
+        """
+
+        self.interval = interval
+        self.count = 0
+        self._start_time = time.monotonic()
+        self._last_report_time = self._start_time
+        self._lock = threading.Lock()
+
+    def report(self, url):
+        """Counts a processed url and writes progress if due.
+
+        """
+
+        if self.interval is None:
+            print('Processing url %s...' % url, file=sys.stderr)
+            return
+        with self._lock:
+            self.count += 1
+            now = time.monotonic()
+            if now - self._last_report_time < self.interval:
+                return
+            self._last_report_time = now
+            count = self.count
+            rate = count / max(now - self._start_time, 1e-9)
+        print('Processed %s urls (%.1f/s), last url %s' % (count, rate, url), file=sys.stderr)
+
+
+_progress_reporter = ProgressReporter()
+
+
+@logged(logger)
+@traced(logger)
+def set_progress_reporter(progress_reporter):
+    """Sets the ProgressReporter used by process_json_request.
+
+    """
+
+    global _progress_reporter
+    _progress_reporter = progress_reporter
+
+
+@logged(logger)
+@traced(logger)
+def get_progress_reporter():
+    """Returns the ProgressReporter used by process_json_request.
+
+    """
+
+    return _progress_reporter
+
+
+@logged(logger)
+class LazyPformat(object):
+    """Defers pformat(obj) until the log record is emitted.  Use as a logging argument, e.g.
+    logger.debug("%s", LazyPformat(response_dict)), so payloads are not formatted when DEBUG is disabled.
+
+    """
+
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        return pformat(self.obj)
+
 
 @logged(logger)
 @traced(logger)
@@ -240,6 +334,7 @@ def get_strftime_delta(_strftime=get_strftime(), days=0, seconds=0, microseconds
 @traced(logger)
 def get_utc_timestamp(year=2018, month=1, day=1, hour=0, minute=0, second=0, tz_str='Etc/GMT-0'):
 
+    import pytz
     mytz = pytz.timezone(tz_str)
     dt = datetime(year, month, day, hour, minute, second)
     dt = mytz.normalize(mytz.localize(dt, is_dst=True))
@@ -250,6 +345,7 @@ def get_utc_timestamp(year=2018, month=1, day=1, hour=0, minute=0, second=0, tz_
 @traced(logger)
 def get_datetime(year=2018, month=1, day=1, hour=0, minute=0, second=0, tz_str='Etc/GMT-0'):
 
+    import pytz
     mytz = pytz.timezone(tz_str)
     dt = datetime(year, month, day, hour, minute, second)
     dt = mytz.normalize(mytz.localize(dt, is_dst=True))
@@ -259,41 +355,75 @@ def get_datetime(year=2018, month=1, day=1, hour=0, minute=0, second=0, tz_str='
 @logged(logger)
 @traced(logger)
 def persist_response(leaf_dir, path_root, response_counter, response_dict):
-    """Pickles the response to the leaf working directory.
+    """Stores the response in the leaf working directory response store.  path_root is no longer used and is kept
+    for existing callers.
 
     """
-    url = response_dict['url'].replace(path_root, '')
-    pickle_file_name = ('%06d' % response_counter) + '_' + re.sub('[^a-zA-Z0-9]', '~', url) + '.response_pickle'
-    with open(os.path.join(leaf_dir, pickle_file_name), 'wb') as f:
-        _pickle.dump(response_dict, f)
+    response_store.get_response_store(leaf_dir).put(response_dict['url'], response_dict, counter=response_counter)
 
 
 @logged(logger)
 @traced(logger)
 def persist_terminal_response(leaf_dir, response_counter, response_dict):
-    """Pickles the response to the leaf working directory.
+    """Stores the response in the leaf working directory response store.
+
+    """
+    response_store.get_response_store(leaf_dir).put(response_dict['cmd_id'], response_dict, counter=response_counter)
+
+
+@logged(logger)
+@traced(logger)
+def remove_persisted_responses(leaf_dir, keys):
+    """Removes the responses stored under keys (urls or cmd ids) from the leaf working directory response store.
 
     """
-    cmd = response_dict['cmd_id']
-    pickle_file_name = ('%06d' % response_counter) + '_' + re.sub('[^a-zA-Z0-9]', '~', cmd) + '.response_pickle'
-    with open(os.path.join(leaf_dir, pickle_file_name), 'wb') as f:
-        _pickle.dump(response_dict, f)
+    response_store.get_response_store(leaf_dir).delete(keys)
 
 
 @logged(logger)
 @traced(logger)
 def restore_responses(leaf_dir, responses_dict):
-    """Restores pickled responses from the leaf working directory to the leaf's responses_dict.
+    """Restores persisted responses from the leaf working directory to the leaf's responses_dict.  Directories
+    persisted as one pickle file per response are read as before until they are migrated with
+    response_store.migrate_pickle_dir.
 
     """
     print(leaf_dir, file=sys.stderr)
-    leaf_dir_files = os.listdir(leaf_dir)
-    for leaf_dir_file in leaf_dir_files:
-        if '.response_pickle' in leaf_dir_file:
-            with open(os.path.join(leaf_dir,leaf_dir_file), "rb") as f:
-                response_dict = _pickle.load(f)
-                url = response_dict['url']
-                responses_dict[url] = response_dict
+    if response_store.store_exists(leaf_dir):
+        for key, response_dict in response_store.get_response_store(leaf_dir).items():
+            responses_dict[key] = response_dict
+        return
+    pickle_files = response_store.get_legacy_pickle_files(leaf_dir)
+    if pickle_files:
+        logger.warning('%s holds %s pickle files and no response store, run python -m cmaple.response_store to '
+                       'migrate it' % (leaf_dir, len(pickle_files)))
+    for leaf_dir_file in pickle_files:
+        with open(os.path.join(leaf_dir,leaf_dir_file), "rb") as f:
+            response_dict = _pickle.load(f)
+            key = response_dict['url'] if 'url' in response_dict else response_dict['cmd_id']
+            responses_dict[key] = response_dict
+
+@logged(logger)
+@traced(logger)
+def restore_lazy_responses(leaf_dir, max_cached=1024, writeback=False):
+    """Returns a responses_dict which decodes the persisted responses in the leaf working directory on first access.
+    Directories persisted as one pickle file per response are restored eagerly.
+
+    *Parameters*
+
+    leaf_dir: string
+        The leaf working directory.
+    max_cached: integer, keyword, default=1024
+        The number of decoded responses kept in memory.
+    writeback: boolean, keyword, default=False
+        If True, changes made to restored responses are kept when they are evicted.
+    """
+    if response_store.store_exists(leaf_dir):
+        return response_store.LazyResponsesDict(response_store.get_response_store(leaf_dir), max_cached=max_cached,
+                                                writeback=writeback)
+    responses_dict = OrderedDict()
+    restore_responses(leaf_dir, responses_dict)
+    return responses_dict
 
 @logged(logger)
 @traced(logger)
@@ -362,8 +492,9 @@ def deep_update(d, u):
 @traced(logger)
 def store_json_response_by_url(r, url, good_status_code, responses_dict,
                                include_filter_regex=None, exclude_filter_regex=None,
-                               include_filtered=False, exclude_filtered=False, cache_hit=False):
-    """Stores the REST response to the leafs responses_dict.
+                               include_filtered=False, exclude_filtered=False, cache_hit=False, response_index=None):
+    """Stores the REST response to the leafs responses_dict.  If response_index is provided (see
+    response_index.ResponseIndex) the objects in a successful response are indexed.
 
     """
     if not url in responses_dict:
@@ -388,8 +519,9 @@ def store_json_response_by_url(r, url, good_status_code, responses_dict,
         if r.status_code == good_status_code:
             if r.text:
                 if not re.match(r'.+?\.xml$',url):
-                    responses_dict[url]['json_dict'] = json.loads(r.text, encoding='UTF-8')
+                    responses_dict[url]['json_dict'] = json.loads(r.text)
                 else:
+                    import xmltodict
                     responses_dict[url]['json_dict'] = xmltodict.parse(r.text)
         else:
             if r.text:
@@ -397,7 +529,8 @@ def store_json_response_by_url(r, url, good_status_code, responses_dict,
     else:
         responses_dict[url]['null_response'] = True
 
-    # add_response_to_index(responses_dict[url], responses_dict)
+    if response_index is not None and r is not None and r.status_code == good_status_code:
+        response_index.add_response(responses_dict[url])
 
     if not include_filtered or exclude_filtered or cache_hit or r.status_code != good_status_code:
         return False
@@ -405,6 +538,37 @@ def store_json_response_by_url(r, url, good_status_code, responses_dict,
         return True
 
 
+@logged(logger)
+@traced(logger)
+def set_url_parameter(url, name, value):
+    """Returns url with the query parameter name set to value, replacing any existing value.
+
+    """
+
+    if re.search(r'[?&]' + re.escape(name) + '=', url):
+        return re.sub(r'([?&]' + re.escape(name) + '=)[^&]*', lambda match: match.group(1) + str(value), url)
+    delimiter = '&' if '?' in url else '?'
+    return '{}{}{}={}'.format(url, delimiter, name, str(value))
+
+
+# Not traced, called for every cached request...
+@logged(logger)
+def canonicalize_url(url, default_limit=None):
+    """Returns url in a canonical form for use as a cache key.  The scheme and host are lower cased, a trailing slash
+    is removed, query parameters are sorted and offset=0 and limit=default_limit are dropped.
+
+    """
+
+    parts = urllib.parse.urlsplit(url)
+    params = [(name, value) for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+              if not (name == 'offset' and value == '0') and
+              not (name == 'limit' and default_limit is not None and value == str(default_limit))]
+    params.sort()
+    path = parts.path.rstrip('/') if len(parts.path) > 1 else parts.path
+    return urllib.parse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path,
+                                    urllib.parse.urlencode(params), ''))
+
+
 @logged(logger)
 @traced(logger)
 def get_empty_ordered_dict():
@@ -423,21 +587,76 @@ def get_empty_dict():
     return {}
 
 
+@logged(logger)
+@traced(logger)
+def get_pooled_session(pool_connections=10, pool_maxsize=10, pool_block=True):
+    """Returns a requests.Session with a keep-alive connection pool mounted for http and https.
+
+    pool_connections is the number of per host pools to keep, pool_maxsize is the number of connections kept per
+    host.  If pool_block is True, pool_maxsize is also the per host connection limit; requests wait for a free
+    connection rather than opening an extra one.
+    """
+
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                            pool_block=pool_block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
+
+@logged(logger)
+@traced(logger)
+def get_session_stats(session):
+    """Returns the connection reuse counters for a session created by get_pooled_session.
+
+    'requests' is the number of requests sent, 'connections_opened' the number of new TCP/TLS connections and
+    'connections_reused' the number of requests sent over an already open connection.
+    """
+
+    stats = {'requests': 0, 'connections_opened': 0, 'connections_reused': 0, 'host_pools': 0}
+    adapters_seen = []
+    for adapter in session.adapters.values():
+        if adapter in adapters_seen or not hasattr(adapter, 'poolmanager'):
+            continue
+        adapters_seen.append(adapter)
+        pools = adapter.poolmanager.pools
+        for pool_key in list(pools.keys()):
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            stats['host_pools'] += 1
+            stats['requests'] += pool.num_requests
+            stats['connections_opened'] += pool.num_connections
+    stats['connections_reused'] = max(stats['requests'] - stats['connections_opened'], 0)
+    return stats
+
+
 @logged(logger)
 @traced(logger)
 def process_json_request(url, responses_dict, headers, method, credentials_dict, json_body="",
                          verify=False, success_status_code=200, include_filter_regex=None,
                          exclude_filter_regex=None, use_cache=False,
-                         stop_on_error=False, API_path_keywords_list=[], get_item_limit=25):
+                         stop_on_error=False, API_path_keywords_list=[], get_item_limit=25, session=None,
+                         rate_limiter=None, metrics=None, concurrency_controller=None, response_index=None):
     """Generic request wrapper for all REST methods.
 
+    If session is provided (see get_pooled_session) the request is sent through the session's connection pool,
+    otherwise a new connection is opened for the request.  If rate_limiter is provided (see
+    rate_limiter.TokenBucket) a token is acquired before the request is sent.  Cache hits and filtered urls do not
+    use a token.  If metrics is provided (see request_metrics.RequestMetrics) the request is recorded.  If
+    concurrency_controller is provided (see concurrency_controller.AIMDController) the status code and latency of the
+    request are fed to it.  If response_index is provided (see response_index.ResponseIndex) the objects in a
+    successful response are indexed.
     """
 
-    print('Processing url %s...' % url, file=sys.stderr)
-    logger.debug('Entering process_json_request with url %s' % url)
-    logger.debug('Headers = %s' % headers)
-    logger.debug('Credentials = %s' % credentials_dict)
-    logger.debug('Json body = %s' % json_body)
+    _progress_reporter.report(url)
+    logger.debug('Entering process_json_request with url %s', url)
+    logger.debug('Headers = %s', headers)
+    logger.debug('Credentials = %s', credentials_dict)
+    logger.debug('Json body = %s', json_body)
     store_status = None
     logger.debug('Processing json request method %s for url %s...' % (method,url))
     exclude_filtered = False
@@ -452,39 +671,55 @@ def process_json_request(url, responses_dict, headers, method, credentials_dict,
     if use_cache and url in responses_dict:
         logger.debug('url %s was found in the cache...' % (url))
         cache_hit = True
+    if metrics is not None:
+        if exclude_filtered or not include_filtered:
+            metrics.record_filtered(method, url)
+        elif cache_hit:
+            metrics.record_cache_hit(method, url)
     r = None
     if not exclude_filtered and include_filtered and not cache_hit:
+        import requests
         if credentials_dict:
             auth = requests.auth.HTTPBasicAuth(credentials_dict['username'],credentials_dict['password'])
         else:
             auth = ''
         try:
             logger.debug('getting request method handle for method %s' % method)
-            request_method = getattr(requests, method)
+            if session is not None:
+                request_method = getattr(session, method)
+            else:
+                request_method = getattr(requests, method)
         except Exception as err:
             logger.error("Error getting method reference for method %s, error message--> "+str(err))
             sys.exit(str(err))
         try:
             logger.debug('Requesting url %s with method %s and expecting %s...' % (url, method, success_status_code))
             if method == 'get':
-                url_no_parameters = re.sub(r'\?[^?]+$','',url)
-                last_path_part = re.search('[^/]+$',url_no_parameters).group(0)
-                logger.debug('last_part_part = %s' % last_path_part)
-                if last_path_part in API_path_keywords_list:
-                    if 'limit=' in url:
-                        url = re.sub(r'limit=\d+','limit='+str(get_item_limit),url)
-                    else:
-                        delimiter = ''
-                        if '?' in url:
-                            delimiter = '&'
-                        else:
-                            delimiter = '?'
-                        url = url+delimiter+'limit='+str(get_item_limit)
-            r = request_method(url=url, headers=headers, auth=auth, verify=verify, data=json_body)
+                url = get_limited_url(url, API_path_keywords_list, get_item_limit)
+            if rate_limiter is not None:
+                waited = rate_limiter.acquire()
+                if metrics is not None:
+                    metrics.record_sleep(method, url, waited)
+            request_start = time.perf_counter()
+            try:
+                r = request_method(url=url, headers=headers, auth=auth, verify=verify, data=json_body)
+            except Exception:
+                request_seconds = time.perf_counter() - request_start
+                if metrics is not None:
+                    metrics.record_request(method, url, seconds=request_seconds, bytes_out=_get_body_size(json_body))
+                if concurrency_controller is not None:
+                    concurrency_controller.record_response(None, request_seconds)
+                raise
+            request_seconds = time.perf_counter() - request_start
+            if metrics is not None:
+                metrics.record_request(method, url, status_code=r.status_code, seconds=request_seconds,
+                                       bytes_in=len(r.content), bytes_out=_get_body_size(json_body))
+            if concurrency_controller is not None:
+                concurrency_controller.record_response(r.status_code, request_seconds)
             if (r.status_code == success_status_code):
                 logger.debug('Request for url %s with method %s was successful.  Return status = %s...' % (url,method,str(r.status_code)))
-                logger.debug('    Headers = %s' % (r.headers))
-                logger.debug('    Response text = %s' % (r.text))
+                logger.debug('    Headers = %s', r.headers)
+                logger.debug('    Response text = %s', r.text)
             else:
                 # sys.exit()
                 logger.warning('Request for url %s with method %s unsuccessful. Status code %s with response %s...' % (url,method, r.status_code, r.text))
@@ -501,21 +736,164 @@ def process_json_request(url, responses_dict, headers, method, credentials_dict,
                 sys.exit()
 
     store_status = store_json_response_by_url(r, url, success_status_code, responses_dict, include_filter_regex, exclude_filter_regex,
-                                              include_filtered, exclude_filtered, cache_hit)
+                                              include_filtered, exclude_filtered, cache_hit,
+                                              response_index=response_index)
     if r:
         r.close()
                 
     return responses_dict[url], store_status, include_filtered, exclude_filtered, cache_hit
 
 
+# Not traced, called for every GET...
+@logged(logger)
+def get_limited_url(url, API_path_keywords_list, get_item_limit):
+    """Returns the url a GET of url is sent with: collection urls (urls ending in one of API_path_keywords_list) get a
+    limit=get_item_limit parameter.
+
+    """
+
+    url_no_parameters = re.sub(r'\?[^?]+$','',url)
+    last_path_part = re.search('[^/]+$',url_no_parameters).group(0)
+    logger.debug('last_part_part = %s' % last_path_part)
+    if last_path_part in API_path_keywords_list:
+        if 'limit=' in url:
+            url = re.sub(r'limit=\d+','limit='+str(get_item_limit),url)
+        else:
+            delimiter = ''
+            if '?' in url:
+                delimiter = '&'
+            else:
+                delimiter = '?'
+            url = url+delimiter+'limit='+str(get_item_limit)
+    return url
+
+
+@logged(logger)
+@traced(logger)
+def get_bulk_result(response_dict, success_status, success_status_code):
+    """Returns the result dictionary of one object of a bulk operation: the status (success_status or 'failed'),
+    the status_code and the error text of response_dict.
+
+    """
+
+    status_code = response_dict.get('status_code')
+    if status_code == success_status_code:
+        return {'status': success_status, 'status_code': status_code, 'error': None}
+    return {'status': 'failed', 'status_code': status_code, 'error': response_dict.get('error')}
+
+
+@logged(logger)
+@traced(logger)
+def get_bulk_results_by_id(id_list, results, operation, url):
+    """Returns an OrderedDict of the results of a bulk operation by object id and logs the number of failures.
+
+    """
+
+    results_by_id = OrderedDict(zip(id_list, results))
+    failed = len([result for result in results if result['status'] == 'failed'])
+    if failed:
+        logger.warning('%s: %s of %s records failed for url %s' % (operation, failed, len(results), url))
+    logger.info('%s: completed %s records for url %s' % (operation, len(results) - failed, url))
+    return results_by_id
+
+
+def _get_body_size(json_body):
+    if not json_body:
+        return 0
+    if isinstance(json_body, str):
+        return len(json_body.encode('utf-8'))
+    return len(json_body)
+
+
+@functools.lru_cache(maxsize=_QUERY_CACHE_SIZE)
+def _compile_jsonpath(json_query):
+    from jsonpath_ng.ext import parse
+    return parse(json_query)
+
+
+@functools.lru_cache(maxsize=_QUERY_CACHE_SIZE)
+def _get_fast_path_query(json_query):
+    """Returns the field names of a $..field or $..field[*].field query, or None for any other query.
+
+    """
+
+    match = _FAST_PATH_QUERY_REGEX.match(json_query)
+    if match is None or _JSONPATH_RESERVED_WORDS.intersection(match.groups()):
+        return None
+    return match.groups()
+
+
+def _get_jsonpath_descendant_values(json_struct, field):
+    # Pre-order walk matching jsonpath_ng: any node with a get method is searched for field, dicts and lists are
+    # descended.  Scalars are never pushed...
+    values = []
+    stack = [json_struct]
+    while stack:
+        node = stack.pop()
+        node_type = type(node)
+        if node_type is dict:
+            value = node.get(field, _NOT_SET)
+            if value is not _NOT_SET:
+                values.append(value)
+            children = [child for child in node.values() if type(child) not in _SCALAR_TYPES]
+        elif node_type is list:
+            children = [child for child in node if type(child) not in _SCALAR_TYPES]
+        else:
+            get = getattr(node, 'get', None)
+            if get is not None:
+                try:
+                    value = get(field, _NOT_SET)
+                except TypeError:
+                    value = _NOT_SET
+                if value is not _NOT_SET:
+                    values.append(value)
+            if isinstance(node, list):
+                children = [child for child in node if type(child) not in _SCALAR_TYPES]
+            elif isinstance(node, dict):
+                children = [child for child in node.values() if type(child) not in _SCALAR_TYPES]
+            else:
+                continue
+        children.reverse()
+        stack.extend(children)
+    return values
+
+
+def _get_jsonpath_slice_values(list_values, field):
+    # Matches jsonpath_ng [*].field: scalars and dicts are treated as one element lists...
+    values = []
+    for list_value in list_values:
+        if list_value is None:
+            continue
+        if isinstance(list_value, (dict, int, float, str, bool)):
+            list_value = [list_value]
+        for i in range(0, len(list_value)):
+            get = getattr(list_value[i], 'get', None)
+            if get is not None:
+                try:
+                    value = get(field, _NOT_SET)
+                except TypeError:
+                    value = _NOT_SET
+                if value is not _NOT_SET:
+                    values.append(value)
+    return values
+
+
 # @traced(logger) #trace logging disabled due to jsonpath spewing...need to put this in a class
 @logged(logger)
 def get_jsonpath_values(json_query,json_struct):
     """Queries json_struct with json_query using jsonpath.
 
+    Compiled queries are cached.  $..field and $..field[*].field queries (e.g. $..next, $..links and
+    $..items[*].id) are evaluated directly without jsonpath_ng.
     """
 
-    jsonpath_query = parse(json_query)
+    fields = _get_fast_path_query(json_query)
+    if fields is not None:
+        values = _get_jsonpath_descendant_values(json_struct, fields[0])
+        if fields[1] is not None:
+            values = _get_jsonpath_slice_values(values, fields[1])
+        return values
+    jsonpath_query = _compile_jsonpath(json_query)
     return [match.value for match in jsonpath_query.find(json_struct)]
 
 
@@ -524,8 +902,32 @@ def get_jsonpath_values(json_query,json_struct):
 def get_objectpath_values(json_query, json_struct):
     """Queries json_struct with json_query using objectpath.
 
+    objectpath caches compiled queries itself.  $..field queries on a dict or list are evaluated directly without
+    objectpath.
     """
 
+    fields = _get_fast_path_query(json_query)
+    if fields is not None and fields[1] is None and type(json_struct) in (dict, list):
+        # Pre-order walk matching objectpath: only plain dicts are searched and non empty list values are flattened...
+        field = fields[0]
+        values = []
+        stack = [json_struct]
+        while stack:
+            node = stack.pop()
+            if type(node) is dict:
+                if field in node:
+                    value = node[field]
+                    if type(value) is list and value:
+                        values.extend(value)
+                    else:
+                        values.append(value)
+                children = [child for child in node.values() if type(child) is dict or type(child) is list]
+            else:
+                children = [child for child in node if type(child) is dict or type(child) is list]
+            children.reverse()
+            stack.extend(children)
+        return values
+    import objectpath
     return list(objectpath.Tree(json_struct).execute(json_query))
 
 
@@ -537,7 +939,7 @@ def get_jsonpath_full_paths_and_values(json_query,json_struct):
     Returns a list of tuples with the jsonpath path and the respective values.
     """
 
-    jsonpath_query = parse(json_query)
+    jsonpath_query = _compile_jsonpath(json_query)
     tuple_list = [(str(match.full_path),match.value) for match in jsonpath_query.find(json_struct)]
     return tuple_list
 
@@ -47,18 +47,12 @@ from autologging import TRACE
 #Global variables...
 this_module = sys.modules[__name__]
 logger = logging.getLogger(re.sub('\.[^.]+$','',__name__))
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.ERROR)
 formatter = logging.Formatter('%(asctime)s %(levelname)s:%(name)s:%(funcName)s:%(message)s')
-console_handler.setFormatter(formatter)
-logger.setLevel(logging.INFO)
-logger.addHandler(console_handler)
-file_handler = logging.FileHandler('cmaple_cli.log', mode='w')
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.info('Starting new maple_cli session...')
 
 run_results = {}
+# Set by main from the parsed arguments and the operations config...
+arg_dict = {}
+working_config = {}
 
 def str2bool(v):
     if v.lower() in ('yes', 'true', 't', 'y', '1'):
@@ -159,17 +153,16 @@ arg_parser.add_argument('-maple_working_dir', '-mwd', type=validate_dir_exists,
                               'operational files')
                         )
 
-# Gather the input arguments
-username = arg_parser.parse_args().rest_admin_user
-password = arg_parser.parse_args().rest_admin_password
-operations_config_file = arg_parser.parse_args().operations_config_file
-
-arg_dict = vars(arg_parser.parse_args())
-
-# Read the operations config
-operations_config = configparser.RawConfigParser(strict=False)
-operations_config.optionxform = lambda option: option
-operations_config.read(operations_config_file, encoding='utf-8')
+def configure_logging():
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.ERROR)
+    console_handler.setFormatter(formatter)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(console_handler)
+    file_handler = logging.FileHandler('cmaple_cli.log', mode='w')
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+    logger.info('Starting new maple_cli session...')
 
 def get_kwargs(kwargs_definition):
     logger.info('Processing kwargs %s' % str(kwargs_definition))
@@ -255,10 +248,25 @@ def process_place_holders(config_dict,key,val):
 def recurse_config(config_dict):
     for key, val in config_dict.items():
         logger.info('Recursing with key %s and val %s' % (str(key), str(val)))
-        if type(val) is collections.OrderedDict:
+        if isinstance(val, dict):
             recurse_config(val)
         if type(val) is str:
             process_place_holders(config_dict,key,val)
 
-working_config = operations_config._sections.copy()
-recurse_config(working_config)
+def main(argv=None):
+    global arg_dict, working_config
+
+    # Gather the input arguments, parsed once...
+    arg_dict = vars(arg_parser.parse_args(argv))
+    configure_logging()
+
+    # Read the operations config
+    operations_config = configparser.RawConfigParser(strict=False)
+    operations_config.optionxform = lambda option: option
+    operations_config.read(arg_dict['operations_config_file'], encoding='utf-8')
+
+    working_config = operations_config._sections.copy()
+    recurse_config(working_config)
+
+if __name__ == '__main__':
+    main()